@@ -3,11 +3,23 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-import json
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+import html
+import os
+import sys
 import re
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'script'))
+from warmth import SUBSTITUTIONS, analyze_text
+from rewrite_search import optimize_rewrite
+from sentence_scoring import IncrementalAnalyzer
+from embeddings import open_index
+from inference import client as inference
+from paths import EMBEDDING_IDS, EMBEDDINGS
+from threshold_sweep import best_threshold, sweep_frame
+from analysis_db import AnalysisDB, where_clause
+from shap_store import ShapStore
+
 
 st.set_page_config(
     page_title="The Language of Rejection",
@@ -125,74 +137,50 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-@st.cache_data
-def load_data():
-    df = pd.read_csv('data/rejection_analysis_extended.csv')
-    df_clean = df[df['status'] != 'ghosted'].copy()
-    
-    with open('data/shap_results_all.json', 'r') as f:
-        shap_data = json.load(f)
-    
-    return df_clean, shap_data
+@st.cache_resource
+def get_db():
+    """SQLite query layer over the pipeline outputs (built on first use)"""
+    return AnalysisDB()
 
-df, shap_results = load_data()
-vader = SentimentIntensityAnalyzer()
 
+@st.cache_resource
+def get_shap_store():
+    """Per-company SHAP results, read from the sharded store on demand"""
+    return ShapStore()
 
-@st.cache_data
-def process_all_shap():
-    """Extract all words with their impacts across companies"""
-    all_negative = []
-    all_positive = []
-    
-    for company, data in shap_results.items():
-        for word, score in data['words']:
-            if score < 0:
-                all_negative.append({
-                    'word': word,
-                    'score': score,
-                    'company': company,
-                    'vader': data['vader'],
-                    'roberta': data['roberta']
-                })
-            else:
-                all_positive.append({
-                    'word': word,
-                    'score': score,
-                    'company': company,
-                    'vader': data['vader'],
-                    'roberta': data['roberta']
-                })
-    
-    df_neg = pd.DataFrame(all_negative)
-    df_pos = pd.DataFrame(all_positive)
-    
-    return df_neg, df_pos
+db = get_db()
+shap_results = get_shap_store()
 
-df_negative, df_positive = process_all_shap()
+ZONES = ['❌ Danger (<4:1)', '⚠️ Minimum (4-6:1)', '✅ Safe (6:1+)']
 
 
-def analyze_text(text):
-    """Analyze email text"""
-    score = vader.polarity_scores(text)['compound']
-    words = text.lower().split()
-    
-    joy_keywords = ['hope', 'happy', 'good', 'luck', 'best', 'wish', 'encourage']
-    apology_keywords = ['sorry', 'unfortunately', 'regret', 'apologies', 'apologize']
-    positive_keywords = ['thank', 'appreciate', 'grateful', 'impressed', 'value', 
-                        'strong', 'excellent', 'great', 'pleased', 'interested']
-    
-    joy_count = sum(1 for w in words if any(j in w for j in joy_keywords))
-    apology_count = sum(1 for w in words if any(a in w for a in apology_keywords))
-    positive_count = sum(1 for w in words if any(p in w for p in positive_keywords))
-    
-    return {
-        'score': score,
-        'joy': joy_count,
-        'apology': apology_count,
-        'positive': positive_count,
-        'word_count': len(words)
-    }
+@st.cache_resource
+def get_incremental_analyzer():
+    """Sentence-cached analyzer shared across reruns"""
+    return IncrementalAnalyzer()
+
+
+@st.cache_resource
+def get_similarity_search():
+    """Embedding index, or None when embeddings haven't been built or nothing can embed the query"""
+    if not os.path.exists(EMBEDDINGS):
+        return None
+    try:
+        # The inference daemon when it is running, otherwise the encoder in this process
+        inference.prepare(['roberta'])
+    except (ImportError, OSError):
+        # No torch/transformers, or the model isn't cached and can't be downloaded
+        return None
+    company_ids = pd.read_csv(EMBEDDING_IDS)['company_id'].tolist()
+    return open_index(), company_ids
+
+
+@st.cache_data
+def most_similar_emails(text, k=3):
+    """(company, similarity) of the closest real rejections"""
+    index, company_ids = get_similarity_search()
+    ids, sims = index.search(inference.embed([text])[0], k)
+    return [(company_ids[i], float(sim)) for i, sim in zip(ids, sims)]
 
 
 st.sidebar.title("💔 Navigation")
@@ -357,6 +345,28 @@ elif page == "📊 The Data":
     st.title("📊 The Data Behind the Story")
     st.markdown("### Let's look at the numbers that prove these patterns are real")
     
+    # Filters and aggregations below run as SQL queries (see Query debug at the bottom)
+    queries = []
+    with st.expander("🔎 Slice the data"):
+        all_statuses = db.distinct('emails', 'status', log=queries)
+        statuses = st.multiselect("Status", all_statuses, default=[s for s in all_statuses if s != 'ghosted'])
+        position = st.text_input("Position contains", "")
+        days = db.query("SELECT MIN(days_since_application) AS lo, MAX(days_since_application) AS hi FROM emails",
+                        log=queries).iloc[0]
+        min_days = max_days = None
+        if pd.notna(days['lo']) and st.checkbox("Filter by days since application (ghosted applications only)"):
+            min_days, max_days = st.slider("Days since application", int(days['lo']), int(days['hi']),
+                                           (int(days['lo']), int(days['hi'])))
+    where, params = where_clause(statuses, position.strip() or None, min_days, max_days)
+    
+    data_df = db.query(f"""
+        SELECT company_id, vader_compound, afinn_positive_count, apology_words, pronoun_density,
+               emotion_joy, emotion_trust, emotion_anticipation, emotion_sadness, emotion_fear, emotion_anger
+        FROM emails {where}""", params, queries)
+    if data_df.empty:
+        st.warning("No emails match these filters.")
+        st.stop()
+    
     st.markdown("---")
     
     # Overview metrics
@@ -371,7 +381,10 @@ elif page == "📊 The Data":
     with metric_col3:
         st.metric("Coldest Score", "0.307", delta="-0.68 vs warmest", delta_color="inverse")
     with metric_col4:
-        st.metric("Average Score", f"{df['vader_compound'].mean():.3f}")
+        average = db.query(f"SELECT AVG(vader_compound) AS average FROM emails {where}", params, queries)
+        average = average['average'].iloc[0]
+        # Ghosted applications have no text, so no score to average
+        st.metric("Average Score", "n/a" if pd.isna(average) else f"{average:.3f}")
     
     st.markdown("---")
     
@@ -387,7 +400,7 @@ elif page == "📊 The Data":
     
     # Graph 1: Joy vs Warmth
     fig1 = px.scatter(
-        df,
+        data_df,
         x='emotion_joy',
         y='vader_compound',
         size='afinn_positive_count',
@@ -417,7 +430,7 @@ elif page == "📊 The Data":
     
     emotion_cols = ['emotion_joy', 'emotion_trust', 'emotion_anticipation', 
                    'emotion_sadness', 'emotion_fear', 'emotion_anger']
-    emotion_corr = df[emotion_cols].corrwith(df['vader_compound']).sort_values(ascending=False)
+    emotion_corr = data_df[emotion_cols].corrwith(data_df['vader_compound']).sort_values(ascending=False)
     
     fig2 = go.Figure(data=[
         go.Bar(
@@ -449,12 +462,16 @@ elif page == "📊 The Data":
     **The Answer:** At least **4 positive words per apology**. Here's how we proved it:
     """)
     
-    # Show the zones
-    df_with_ratio = df[df['apology_words'] > 0].copy()
-    df_with_ratio['ratio'] = df_with_ratio['afinn_positive_count'] / df_with_ratio['apology_words']
-    df_with_ratio['zone'] = pd.cut(df_with_ratio['ratio'], 
-                                    bins=[0, 4, 6, 20], 
-                                    labels=['❌ Danger (<4:1)', '⚠️ Minimum (4-6:1)', '✅ Safe (6:1+)'])
+    # Show the zones (same bins as pd.cut(ratio, [0, 4, 6, 20]))
+    zoned = f"""
+        SELECT company_id, vader_compound, ratio,
+               CASE WHEN ratio > 0 AND ratio <= 4 THEN '{ZONES[0]}'
+                    WHEN ratio > 4 AND ratio <= 6 THEN '{ZONES[1]}'
+                    WHEN ratio > 6 AND ratio <= 20 THEN '{ZONES[2]}' END AS zone
+        FROM (SELECT company_id, vader_compound, CAST(afinn_positive_count AS REAL) / apology_words AS ratio
+              FROM emails {where + ' AND' if where else 'WHERE'} apology_words > 0)"""
+    df_with_ratio = db.query(zoned, params, queries)
+    df_with_ratio['zone'] = pd.Categorical(df_with_ratio['zone'], categories=ZONES)
     
     fig3 = px.scatter(
         df_with_ratio,
@@ -485,18 +502,14 @@ elif page == "📊 The Data":
     st.plotly_chart(fig3, use_container_width=True)
     
     # Zone statistics
-    zone_stats = df_with_ratio.groupby('zone').agg({
-        'vader_compound': ['mean', 'count'],
-        'company_id': 'count'
-    }).round(3)
+    zone_stats = db.query(f"""
+        SELECT zone, COUNT(*) AS total, SUM(vader_compound >= 0.85) AS warm, AVG(vader_compound) AS mean_score
+        FROM ({zoned}) WHERE zone IS NOT NULL GROUP BY zone""", params, queries).set_index('zone')
+    zone_stats = zone_stats.reindex(ZONES, fill_value=0)
     
     st.markdown("### 📊 Success Rate by Zone")
     col1, col2, col3 = st.columns(3)
     
-    danger_zone = df_with_ratio[df_with_ratio['zone'] == '❌ Danger (<4:1)']
-    minimum_zone = df_with_ratio[df_with_ratio['zone'] == '⚠️ Minimum (4-6:1)']
-    safe_zone = df_with_ratio[df_with_ratio['zone'] == '✅ Safe (6:1+)']
-    
     with col1:
         st.markdown("""
         <div style="background-color: #ffebee; padding: 20px; border-radius: 10px;">
@@ -507,8 +520,8 @@ elif page == "📊 The Data":
         """, unsafe_allow_html=True)
     
     with col2:
-        warm_min = (minimum_zone['vader_compound'] >= 0.85).sum()
-        total_min = len(minimum_zone)
+        warm_min = int(zone_stats.loc[ZONES[1], 'warm'])
+        total_min = int(zone_stats.loc[ZONES[1], 'total'])
         pct_min = (warm_min / total_min * 100) if total_min > 0 else 0
         st.markdown(f"""
         <div style="background-color: #fff3e0; padding: 20px; border-radius: 10px;">
@@ -519,8 +532,8 @@ elif page == "📊 The Data":
         """, unsafe_allow_html=True)
     
     with col3:
-        warm_safe = (safe_zone['vader_compound'] >= 0.85).sum()
-        total_safe = len(safe_zone)
+        warm_safe = int(zone_stats.loc[ZONES[2], 'warm'])
+        total_safe = int(zone_stats.loc[ZONES[2], 'total'])
         pct_safe = (warm_safe / total_safe * 100) if total_safe > 0 else 0
         st.markdown(f"""
         <div style="background-color: #e8f5e9; padding: 20px; border-radius: 10px;">
@@ -532,49 +545,96 @@ elif page == "📊 The Data":
     
     st.success("**💡 Key Insight:** Below 4:1 ratio = 0% success rate. Above 4:1 = guaranteed warm. The threshold is empirically proven.")
     
+    # Every candidate threshold, not just 4:1
+    st.markdown("### 🔍 Threshold Sweep")
+    sweep_options = {
+        "Positives per apology": ('afinn_positive_count', 'apology_words'),
+        "Joy words per apology": ('emotion_joy', 'apology_words'),
+        "Pronoun density": ('pronoun_density', None),
+    }
+    sweep_choice = st.selectbox("Rule to test:", list(sweep_options))
+    numerator, denominator = sweep_options[sweep_choice]
+    sweep_table = sweep_frame(data_df, numerator, denominator)
+    best = best_threshold(sweep_table)
+    if best is None:
+        st.info("No scored emails under these filters fit this rule (e.g. none with an apology), "
+                "so there is no threshold to sweep.")
+    else:
+        fig_sweep = go.Figure()
+        for column, name, color in [('accuracy', 'Accuracy', '#3498db'),
+                                    ('warm_rate_above', 'Warm rate above threshold', '#2ecc71'),
+                                    ('sentiment_gap', 'Sentiment gap (above - below)', '#9b59b6')]:
+            fig_sweep.add_trace(go.Scatter(x=sweep_table['threshold'], y=sweep_table[column],
+                                           mode='lines+markers', name=name, line=dict(color=color, shape='hv')))
+        fig_sweep.add_vline(x=best['threshold'], line_dash="dash", line_color="red",
+                            annotation_text=f"Best: {best['threshold']:.2f}")
+        fig_sweep.update_layout(
+            title=f"{sweep_choice}: every threshold for \"warm if ratio ≥ t\"",
+            xaxis_title=sweep_choice,
+            yaxis_title="Rate / gap",
+            template='plotly_white',
+            height=450
+        )
+        st.plotly_chart(fig_sweep, use_container_width=True)
+        st.caption(f"Best threshold {best['threshold']:.2f}: {best['accuracy']:.0%} accuracy, "
+                   f"{best['warm_rate_above']:.0%} warm above it ({int(best['n_above'])} of {int(best['n_above'] + best['n_below'])} emails)")
+    
     st.markdown("---")
     
     # All companies ranked
     st.markdown("## 📊 All 14 Companies Ranked")
     st.markdown("From warmest to coldest rejection emails:")
     
-    df_sorted = df.sort_values('vader_compound', ascending=False)
-    
-    fig4 = go.Figure()
-    colors = ['#2ecc71' if score >= 0.95 else '#3498db' if score >= 0.85 else '#f39c12' if score >= 0.60 else '#e74c3c' 
-              for score in df_sorted['vader_compound']]
-    
-    fig4.add_trace(go.Bar(
-        x=df_sorted['company_id'],
-        y=df_sorted['vader_compound'],
-        marker_color=colors,
-        text=[f'{v:.3f}' for v in df_sorted['vader_compound']],
-        textposition='outside',
-        hovertemplate='<b>%{x}</b><br>Score: %{y:.3f}<br><extra></extra>'
-    ))
-    
-    fig4.add_hline(y=0.95, line_dash="dash", line_color="green", annotation_text="Very Warm (0.95+)")
-    fig4.add_hline(y=0.85, line_dash="dash", line_color="orange", annotation_text="Warm (0.85+)")
-    fig4.add_hline(y=0.60, line_dash="dash", line_color="gray", annotation_text="Neutral (0.60+)")
-    
-    fig4.update_layout(
-        title="Company Warmth Rankings",
-        xaxis_title="Company",
-        yaxis_title="Warmth Score (VADER)",
-        template='plotly_white',
-        height=500,
-        showlegend=False,
-        xaxis={'tickangle': -45}
-    )
-    
-    st.plotly_chart(fig4, use_container_width=True)
-    
-    # Summary table
-    st.markdown("### 📋 Detailed Breakdown")
-    summary_df = df_sorted[['company_id', 'vader_compound', 'emotion_joy', 'afinn_positive_count', 'apology_words']].copy()
-    summary_df.columns = ['Company', 'Warmth Score', 'Joy Words', 'Positive Words', 'Apologies']
-    summary_df = summary_df.round(3)
-    st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    df_sorted = db.query(f"""
+        SELECT company_id, vader_compound, emotion_joy, afinn_positive_count, apology_words
+        FROM emails {where} ORDER BY vader_compound DESC""", params, queries)
+    
+    # Ghosted applications have no score to rank
+    df_sorted = df_sorted[df_sorted['vader_compound'].notna()]
+    if df_sorted.empty:
+        st.info("None of the emails under these filters has a warmth score to rank.")
+    else:
+        fig4 = go.Figure()
+        colors = ['#2ecc71' if score >= 0.95 else '#3498db' if score >= 0.85 else '#f39c12' if score >= 0.60 else '#e74c3c' 
+                  for score in df_sorted['vader_compound']]
+
+        fig4.add_trace(go.Bar(
+            x=df_sorted['company_id'],
+            y=df_sorted['vader_compound'],
+            marker_color=colors,
+            text=[f'{v:.3f}' for v in df_sorted['vader_compound']],
+            textposition='outside',
+            hovertemplate='<b>%{x}</b><br>Score: %{y:.3f}<br><extra></extra>'
+        ))
+
+        fig4.add_hline(y=0.95, line_dash="dash", line_color="green", annotation_text="Very Warm (0.95+)")
+        fig4.add_hline(y=0.85, line_dash="dash", line_color="orange", annotation_text="Warm (0.85+)")
+        fig4.add_hline(y=0.60, line_dash="dash", line_color="gray", annotation_text="Neutral (0.60+)")
+
+        fig4.update_layout(
+            title="Company Warmth Rankings",
+            xaxis_title="Company",
+            yaxis_title="Warmth Score (VADER)",
+            template='plotly_white',
+            height=500,
+            showlegend=False,
+            xaxis={'tickangle': -45}
+        )
+
+        st.plotly_chart(fig4, use_container_width=True)
+
+        # Summary table
+        st.markdown("### 📋 Detailed Breakdown")
+        summary_df = df_sorted[['company_id', 'vader_compound', 'emotion_joy', 'afinn_positive_count', 'apology_words']].copy()
+        summary_df.columns = ['Company', 'Warmth Score', 'Joy Words', 'Positive Words', 'Apologies']
+        summary_df = summary_df.round(3)
+        st.dataframe(summary_df, use_container_width=True, hide_index=True)
+    
+    with st.expander(f"🛠️ Query debug ({len(queries)} queries, {sum(q['ms'] for q in queries):.1f} ms)"):
+        for q in queries:
+            st.code(q['sql'], language='sql')
+            st.caption(f"{q['rows']} rows in {q['ms']:.2f} ms, params {q['params']}")
+            st.text('\n'.join(q['plan']))
 
 
 elif page == "🔬 Deep Dive: SHAP":
@@ -603,7 +663,9 @@ elif page == "🔬 Deep Dive: SHAP":
         st.markdown("These words carry the most negative weight across all emails:")
         
         # Get top 15 most negative
-        top_negative = df_negative.nsmallest(15, 'score')
+        top_negative = db.query("""
+            SELECT word, attribution AS score, company FROM shap_words
+            WHERE direction = 'negative' ORDER BY attribution, rowid LIMIT 15""")
         
         fig_neg = go.Figure(data=[
             go.Bar(
@@ -662,11 +724,10 @@ elif page == "🔬 Deep Dive: SHAP":
         st.markdown("### 📊 Word Frequency Analysis")
         
         # Count how many times each negative word appears
-        neg_word_counts = df_negative.groupby('word').agg({
-            'score': ['mean', 'count', 'min']
-        }).round(3)
-        neg_word_counts.columns = ['avg_impact', 'frequency', 'worst_impact']
-        neg_word_counts = neg_word_counts.sort_values('avg_impact').head(10)
+        neg_word_counts = db.query("""
+            SELECT word, AVG(attribution) AS avg_impact, COUNT(*) AS frequency, MIN(attribution) AS worst_impact
+            FROM shap_words WHERE direction = 'negative'
+            GROUP BY word ORDER BY avg_impact, word LIMIT 10""").set_index('word').round(3)
         
         st.dataframe(
             neg_word_counts.reset_index().rename(columns={
@@ -694,7 +755,9 @@ elif page == "🔬 Deep Dive: SHAP":
         st.markdown("These words consistently boost warmth:")
         
         # Get top 15 most positive
-        top_positive = df_positive.nlargest(15, 'score')
+        top_positive = db.query("""
+            SELECT word, attribution AS score, company FROM shap_words
+            WHERE direction = 'positive' ORDER BY attribution DESC, rowid LIMIT 15""")
         
         fig_pos = go.Figure(data=[
             go.Bar(
@@ -760,11 +823,10 @@ elif page == "🔬 Deep Dive: SHAP":
         # Word frequency
         st.markdown("### 📊 Positive Word Frequency")
         
-        pos_word_counts = df_positive.groupby('word').agg({
-            'score': ['mean', 'count', 'max']
-        }).round(3)
-        pos_word_counts.columns = ['avg_impact', 'frequency', 'best_impact']
-        pos_word_counts = pos_word_counts.sort_values('avg_impact', ascending=False).head(10)
+        pos_word_counts = db.query("""
+            SELECT word, AVG(attribution) AS avg_impact, COUNT(*) AS frequency, MAX(attribution) AS best_impact
+            FROM shap_words WHERE direction = 'positive'
+            GROUP BY word ORDER BY avg_impact DESC, word LIMIT 10""").set_index('word').round(3)
         
         st.dataframe(
             pos_word_counts.reset_index().rename(columns={
@@ -790,59 +852,8 @@ elif page == "🔬 Deep Dive: SHAP":
         st.markdown("## 🔄 Word Substitution Guide")
         st.markdown("### Simple swaps that make emails warmer:")
         
-        # Create substitution table
-        substitutions = [
-            {
-                'avoid': 'Sorry',
-                'avoid_impact': -0.47,
-                'use': 'Disappointed',
-                'use_impact': -0.17,
-                'improvement': '+64%',
-                'example': 'We\'re disappointed we can\'t move forward'
-            },
-            {
-                'avoid': 'Regret',
-                'avoid_impact': -0.73,
-                'use': 'Disappointing',
-                'use_impact': -0.17,
-                'improvement': '+77%',
-                'example': 'This is disappointing news to share'
-            },
-            {
-                'avoid': 'Unfortunately',
-                'avoid_impact': -0.77,
-                'use': '(Skip it!)',
-                'use_impact': 0.0,
-                'improvement': '+100%',
-                'example': 'We\'ve decided to move forward with another candidate'
-            },
-            {
-                'avoid': 'Thanks (generic)',
-                'avoid_impact': -0.16,
-                'use': 'Thank you + specific',
-                'use_impact': +0.42,
-                'improvement': '+163%',
-                'example': 'Thank you for your thoughtful approach to the case study'
-            },
-            {
-                'avoid': 'Thank (alone)',
-                'avoid_impact': +0.13,
-                'use': 'Appreciate',
-                'use_impact': +0.54,
-                'improvement': '+315%',
-                'example': 'We appreciate your interest in our team'
-            },
-            {
-                'avoid': 'Good luck',
-                'avoid_impact': +0.12,
-                'use': 'Wish you the best',
-                'use_impact': +0.23,
-                'improvement': '+92%',
-                'example': 'We wish you the best in your job search'
-            }
-        ]
-        
-        df_sub = pd.DataFrame(substitutions)
+        # Substitution table (shared with the rewrite optimizer)
+        df_sub = pd.DataFrame(SUBSTITUTIONS)
         
         # Display as formatted table
         st.markdown("### 🔄 Recommended Substitutions")
@@ -1130,11 +1141,14 @@ Warm regards,
             placeholder="Dear [Name],\n\nThank you for applying..."
         )
         
-        if st.button("🚀 Analyze Email", type="primary"):
+        live = st.toggle("⚡ Analyze as I type", help="Rescores only the sentences you changed")
+        analyze_clicked = st.button("🚀 Analyze Email", type="primary")
+        
+        if analyze_clicked or live:
             if len(text_input.strip()) < 10:
                 st.warning("Please paste an email first!")
             else:
-                results = analyze_text(text_input)
+                results = get_incremental_analyzer().analyze(text_input)
                 
                 # Results
                 st.markdown("---")
@@ -1161,6 +1175,24 @@ Warm regards,
                     st.metric("Positive Words", results['positive'])
                     st.metric("Apologies", results['apology'])
                 
+                # Sentence-level warmth
+                st.markdown("### 🌡️ Sentence Warmth")
+                sentences = results['sentences']
+                coldest = min(range(len(sentences)), key=lambda i: sentences[i]['warmth']) if sentences else None
+                highlighted = []
+                for i, sent in enumerate(sentences):
+                    w = sent['warmth']
+                    color = '#e8f5e9' if w >= 0.5 else '#fff9c4' if w >= 0 else '#ffebee'
+                    border = '2px solid #e74c3c' if i == coldest and w < 0.5 else 'none'
+                    highlighted.append(
+                        f'<span title="warmth {w:+.2f}" style="background-color: {color}; border: {border}; '
+                        f'padding: 2px 4px; border-radius: 4px; line-height: 2;">{html.escape(sent["sentence"])}</span>'
+                    )
+                st.markdown(" ".join(highlighted), unsafe_allow_html=True)
+                if coldest is not None and sentences[coldest]['warmth'] < 0.5:
+                    st.caption(f"❄️ Coldest sentence (warmth {sentences[coldest]['warmth']:+.2f}): "
+                               f"\"{sentences[coldest]['sentence']}\"")
+                
                 # Analysis
                 st.markdown("### 🔍 Analysis")
                 
@@ -1197,6 +1229,40 @@ Warm regards,
                     - Following the 4:1 rule (4 positives per apology)
                     - Avoiding "unfortunately" and "regret"
                     """)
+                
+                # Closest real rejection in the corpus
+                st.markdown("### 🪞 Most Similar Real Rejection")
+                if get_similarity_search() is None:
+                    st.caption("Run `python script/embeddings.py` to enable the similar-email lookup.")
+                else:
+                    matches = most_similar_emails(text_input)
+                    rows = db.query(f"""
+                        SELECT * FROM emails WHERE status != 'ghosted'
+                        AND company_id IN ({', '.join('?' * len(matches))})""", [c for c, _ in matches])
+                    matches = [(c, sim) for c, sim in matches if c in set(rows['company_id'])]
+                    if matches:
+                        company, sim = matches[0]
+                        match = rows[rows['company_id'] == company].iloc[0]
+                        col1, col2, col3 = st.columns(3)
+                        col1.metric("Closest Email", company, f"{sim:.0%} similar", delta_color="off")
+                        col2.metric("VADER", f"{match['vader_compound']:.3f}")
+                        col3.metric("RoBERTa", f"{match['hf_roberta_score']:.3f}")
+                        with st.expander(f"📧 Read {company}'s email"):
+                            st.write(match['email_text'])
+                        
+                        if company in shap_results:
+                            words = shap_results[company]['words']
+                            col1, col2 = st.columns(2)
+                            with col1:
+                                st.markdown("**🟢 Top words pushing positive**")
+                                for word, score in [w for w in words if w[1] > 0][:5]:
+                                    st.markdown(f"- {word} ({score:+.3f})")
+                            with col2:
+                                st.markdown("**🔴 Top words pushing negative**")
+                                for word, score in sorted([w for w in words if w[1] < 0], key=lambda w: w[1])[:5]:
+                                    st.markdown(f"- {word} ({score:+.3f})")
+                        if len(matches) > 1:
+                            st.caption("Also close: " + ", ".join(f"{c} ({s:.0%})" for c, s in matches[1:]))
     
     with tab2:
         st.markdown("## ✍️ Email Rewriter")
@@ -1214,44 +1280,8 @@ Warm regards,
             else:
                 original = analyze_text(rewrite_input)
                 
-                # Simple improvements
-                improved = rewrite_input
-                suggestions = []
-                
-                # Remove "unfortunately"
-                if 'unfortunately' in improved.lower():
-                    improved = re.sub(r'\b[Uu]nfortunately,?\s*', '', improved)
-                    suggestions.append("✅ Removed 'unfortunately' (saves up to -0.77 negative impact!)")
-                
-                # Replace "sorry" with "disappointed"
-                if 'sorry' in improved.lower():
-                    improved = re.sub(r"\bsorry\b", "disappointed", improved, flags=re.IGNORECASE)
-                    suggestions.append("✅ Changed 'sorry' to 'disappointed' (+64% less negative)")
-                
-                # Replace "regret" with "disappointing"
-                if 'regret' in improved.lower():
-                    improved = re.sub(r"\bregret\b", "find it disappointing", improved, flags=re.IGNORECASE)
-                    suggestions.append("✅ Changed 'regret' to 'disappointing' (+77% less negative)")
-                
-                # Add joy words
-                if original['joy'] == 0 and 'wish you' not in improved.lower():
-                    improved += "\n\nWe wish you the best in your job search!"
-                    suggestions.append("✅ Added joy words to closing (+0.23 impact)")
-                
-                # Add specific positive
-                if original['positive'] < 4 and 'impressed' not in improved.lower() and 'appreciate' not in improved.lower():
-                    lines = improved.split('\n')
-                    for i, line in enumerate(lines):
-                        if any(word in line.lower() for word in ['dear', 'hi ', 'hello']):
-                            lines.insert(i+1, "\nWe appreciate the time you invested in your application and were impressed by your background.\n")
-                            break
-                    improved = '\n'.join(lines)
-                    suggestions.append("✅ Added 'appreciate' and 'impressed' (+1.05 combined impact)")
-                
-                # Enhance "thank" to "appreciate"
-                if improved.count('thank') > 0 and 'appreciate' not in improved.lower():
-                    improved = improved.replace('Thank you', 'We appreciate your', 1)
-                    suggestions.append("✅ Enhanced 'thank' to 'appreciate' (+300% more impact)")
+                result = optimize_rewrite(rewrite_input)
+                improved, suggestions = result['text'], result['suggestions']
                 
                 improved_analysis = analyze_text(improved)
                 
@@ -1269,6 +1299,7 @@ Warm regards,
                     st.metric("Improvement", f"{change:+.3f}", delta=f"{change/abs(original['score'])*100:+.0f}%")
                 
                 st.markdown("### ✨ Changes Applied")
+                st.caption(f"Searched {result['candidates_scored']} candidate rewrites in {result['elapsed_ms']:.0f} ms")
                 if suggestions:
                     for s in suggestions:
                         st.markdown(f"- {s}")
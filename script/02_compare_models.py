@@ -1,233 +1,218 @@
+import argparse
 import json
+import os
+import numpy as np
 import pandas as pd
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-from textblob import TextBlob
-from afinn import Afinn
-import textstat
-import re
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
+
+import cascade
+from dedup import fan_out, text_hash
+from features import (FeatureStore, STATUSES, assemble_frame, build_features, extract_rows, init_worker, load_emails,
+                      load_nrc)
+from inference import client
+from memory import MemoryStage, print_memory_report
+from paths import CORRELATION_COMPARE, EMAILS, REJECTION_ANALYSIS_EXTENDED, REJECTION_SUMMARY, TEMPLATE_CLUSTERS
+from streaming import StreamStage, print_utilization, run_stream
+
+parser = argparse.ArgumentParser(description="Lexicon features, transformer scores and model comparison")
+parser.add_argument('--pipelined', action='store_true',
+                    help='overlap lexicon features and transformer inference through bounded queues')
+parser.add_argument('--lexicon-workers', type=int, default=2)
+parser.add_argument('--executor', choices=['thread', 'process'], default='process',
+                    help='executor for the lexicon workers in --pipelined mode')
+parser.add_argument('--batch-size', type=int, default=16, help='texts per transformer batch')
+parser.add_argument('--queue-size', type=int, default=64)
+parser.add_argument('--torch-threads', type=int, help='PyTorch intra-op threads when scoring in-process')
+parser.add_argument('--cascade', action='store_true',
+                    help='predict transformer scores from the lexicon features; run the transformers only where '
+                         'the prediction is uncertain (see script/cascade.py)')
+parser.add_argument('--band', type=float, default=cascade.BAND,
+                    help='--cascade: escalate when |predicted RoBERTa| is below this')
+parser.add_argument('--max-gap', type=float, default=cascade.MAX_GAP,
+                    help='--cascade: escalate when |VADER - predicted RoBERTa| is above this')
+parser.add_argument('--calibration', type=float, default=cascade.CALIBRATION,
+                    help='--cascade: share of template sources always scored, to fit the proxy')
+args = parser.parse_args()
+if args.cascade and args.pipelined:
+    parser.error("--cascade needs every email's lexicon features before scoring, so it can't be --pipelined")
+
+if args.torch_threads:
+    import torch
+    torch.set_num_threads(args.torch_threads)
 
 # Load data
-with open('data/email.json', 'r') as f:
+with open(EMAILS, 'r') as f:
     data = json.load(f)
 print("....load")
-vader = SentimentIntensityAnalyzer()
-afinn = Afinn()
 
 # Load NRC Emotion Lexicon
 print("Loading NRC Emotion Lexicon...")
-url = "https://raw.githubusercontent.com/dinbav/LeXmo/master/NRC-Emotion-Lexicon-Wordlevel-v0.92.txt"
-nrc = pd.read_csv(url, sep='\t', names=['word', 'emotion', 'score'])
-nrc = nrc[nrc['score'] == 1][['word', 'emotion']]
-
-nrc_dict = {}
-for word, emotion in nrc.values:
-    if word not in nrc_dict:
-        nrc_dict[word] = []
-    nrc_dict[word].append(emotion)
+nrc_dict = load_nrc()
 print(f"✅ Loaded {len(nrc_dict)} words with emotion labels")
 
-# Keywords
-empathy_keywords = ['thank', 'appreciate', 'grateful', 'hope', 'wish', 'impressed']
-apology_keywords = ['sorry', 'apologies', 'apologize', 'unfortunately', 'regret', 'regrettably']
-future_keywords = ['future', 'again', 'next', 'keep in touch', 'stay connected', 'opportunities']
-personal_pronouns = ['you', 'your', 'yours', "you're", "you've"]
-feedback_keywords = ['because', 'reason', 'based on', 'not convinced', 'stronger', 'more closely']
-
-def extract_features(text):
-    if not text or text.strip() == "":
-        return {
-            'email_length': 0,
-            'word_count': 0,
-            'sentence_count': 0,
-            'vader_compound': None,
-            'textblob_polarity': None,
-            'afinn_score': 0,
-            'afinn_positive_count': 0,
-            'afinn_negative_count': 0,
-            'empathy_words': 0,
-            'apology_words': 0,
-            'personal_pronouns': 0,
-            'pronoun_density': 0,
-            'empathy_density': 0,
-            'mentions_future': False,
-            'contains_feedback': False,
-            'flesch_reading': None,
-            # NRC Emotions
-            'emotion_joy': 0,
-            'emotion_trust': 0,
-            'emotion_anticipation': 0,
-            'emotion_sadness': 0,
-            'emotion_fear': 0,
-            'emotion_anger': 0,
-            'emotion_disgust': 0,
-            'emotion_surprise': 0,
-            'emotion_positive': 0,
-            'emotion_negative': 0
-        }
-
-    text_lower = text.lower()
-    words = re.findall(r'\b[a-z]+\b', text_lower)
-    word_count = len(words)
-
-    # Sentiment scores
-    vader_score = vader.polarity_scores(text)['compound']
-    textblob_score = TextBlob(text).sentiment.polarity
-
-    # AFINN
-    afinn_total = sum(afinn.score(word) for word in words)
-    afinn_pos_count = sum(1 for word in words if afinn.score(word) > 0)
-    afinn_neg_count = sum(1 for word in words if afinn.score(word) < 0)
-
-    # NRC Emotions
-    emotions = {
-        'joy': 0, 'trust': 0, 'anticipation': 0, 'sadness': 0,
-        'fear': 0, 'anger': 0, 'disgust': 0, 'surprise': 0,
-        'positive': 0, 'negative': 0
-    }
-    
-    for word in words:
-        if word in nrc_dict:
-            for emotion in nrc_dict[word]:
-                if emotion in emotions:
-                    emotions[emotion] += 1
-
-    # Manual keywords
-    empathy_count = sum(1 for word in words if word in empathy_keywords)
-    apology_count = sum(1 for word in words if word in apology_keywords)
-    pronoun_count = sum(1 for word in words if word in personal_pronouns)
-
-    # Densities
-    pronoun_density = pronoun_count / word_count if word_count else 0
-    empathy_density = empathy_count / word_count if word_count else 0
-
-    # Boolean features
-    mentions_future = any(keyword in text_lower for keyword in future_keywords)
-    contains_feedback = any(keyword in text_lower for keyword in feedback_keywords)
-
-    # Readability
-    flesch_score = textstat.flesch_reading_ease(text) if text else None
-
-    return {
-        'email_length': len(text),
-        'word_count': word_count,
-        'sentence_count': len(re.split(r'[.!?]+', text)),
-        'vader_compound': vader_score,
-        'textblob_polarity': textblob_score,
-        'afinn_score': afinn_total,
-        'afinn_positive_count': afinn_pos_count,
-        'afinn_negative_count': afinn_neg_count,
-        'empathy_words': empathy_count,
-        'apology_words': apology_count,
-        'personal_pronouns': pronoun_count,
-        'pronoun_density': pronoun_density,
-        'empathy_density': empathy_density,
-        'mentions_future': mentions_future,
-        'contains_feedback': contains_feedback,
-        'flesch_reading': flesch_score,
-        # NRC Emotions
-        'emotion_joy': emotions['joy'],
-        'emotion_trust': emotions['trust'],
-        'emotion_anticipation': emotions['anticipation'],
-        'emotion_sadness': emotions['sadness'],
-        'emotion_fear': emotions['fear'],
-        'emotion_anger': emotions['anger'],
-        'emotion_disgust': emotions['disgust'],
-        'emotion_surprise': emotions['surprise'],
-        'emotion_positive': emotions['positive'],
-        'emotion_negative': emotions['negative']
-    }
-
-# Process emails
-print("Processing emails...")
-all_emails = []
-
-for email in data.get('rejection_emails', []):
-    features = extract_features(email.get('email_text'))
-    email.update(features)
-    email['status'] = 'rejection'
-    all_emails.append(email)
-
-for email in data.get('feedback_rejection', []):
-    features = extract_features(email.get('email_text'))
-    email.update(features)
-    email['status'] = 'rejection_with_feedback'
-    all_emails.append(email)
-
-for email in data.get('ghosted_applications', []):
-    features = extract_features(email.get('email_text'))
-    email.update(features)
-    email['status'] = 'ghosted'
-    all_emails.append(email)
-
-df = pd.DataFrame(all_emails)
-print(f"✅ Processed {len(df)} emails")
-
-# Load transformer models
+# Template clusters: transformer scores are computed once per template_source
+emails = load_emails(data)
+clusters = pd.read_csv(TEMPLATE_CLUSTERS)
+if ('text_hash' not in clusters or 'template_source_row' not in clusters
+        or clusters['text_hash'].tolist() != [text_hash(email.get('email_text')) for email, _ in emails]):
+    raise SystemExit(f"❌ {TEMPLATE_CLUSTERS} is out of date, rerun script/dedup.py")
+source = clusters['template_source_row'].to_numpy()
+source_rows = np.unique(source)
+print(f"✅ Scoring {len(source_rows)} template sources for {len(emails)} emails")
+
+# Transformer models: served by script/inference_daemon.py when it is running, else loaded here
 print("\nLoading transformer models...")
-
-# RoBERTa - 3-class model
-MODEL_NAME_ROBERTA = "cardiffnlp/twitter-roberta-base-sentiment-latest"
-tokenizer_roberta = AutoTokenizer.from_pretrained(MODEL_NAME_ROBERTA)
-model_roberta = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME_ROBERTA)
-
-def roberta_sentiment_score(text, tokenizer, model):
-    """Calculate normalized sentiment score for 3-class RoBERTa model"""
-    if not text or text.strip() == "":
-        return None
-    
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-    
-    with torch.no_grad():
-        logits = model(**inputs).logits
-        probs = torch.softmax(logits, dim=1).numpy()[0]
-    
-    # For cardiffnlp model: [negative, neutral, positive]
-    return probs[2] - probs[0]  # positive - negative
-
-print("Calculating RoBERTa scores...")
-df['hf_roberta_score'] = df['email_text'].apply(lambda x: roberta_sentiment_score(x, tokenizer_roberta, model_roberta))
-
-# SST-2 - 2-class model
-print("\nLoading SST-2 model...")
-MODEL_NAME_SST2 = "distilbert-base-uncased-finetuned-sst-2-english"
-tokenizer_sst2 = AutoTokenizer.from_pretrained(MODEL_NAME_SST2)
-model_sst2 = AutoModelForSequenceClassification.from_pretrained(MODEL_NAME_SST2)
-
-def sst2_sentiment_score(text, tokenizer, model):
-    """Calculate normalized sentiment score for 2-class SST-2 model"""
-    if not text or text.strip() == "":
-        return None
-    
-    inputs = tokenizer(text, return_tensors="pt", truncation=True, max_length=512)
-    
-    with torch.no_grad():
-        logits = model(**inputs).logits
-        probs = torch.softmax(logits, dim=1).numpy()[0]
-    
-    # For SST-2 model: [negative, positive]
-    return probs[1] - probs[0]  # positive - negative
-
-print("Calculating SST-2 scores...")
-df['hf_sst2_score'] = df['email_text'].apply(lambda x: sst2_sentiment_score(x, tokenizer_sst2, model_sst2))
+with MemoryStage('models.load'):
+    print(f"✅ Transformer scoring: {client.prepare(['roberta', 'sst2'])}")
+
+if not args.pipelined:
+    # Lexicon features for every email, then each transformer in turn
+    print("Processing emails...")
+    df, _ = build_features(data, nrc_dict)
+    print(f"✅ Processed {len(df)} emails")
+    df = df.join(clusters.drop(columns=['company_id', 'text_hash']))
+
+    def score_templates(model):
+        """Score each template source once and fan the result out to its members"""
+        texts = [text if isinstance(text, str) else None for text in df.loc[source_rows, 'email_text']]
+        return fan_out(dict(zip(source_rows, client.scores(model, texts))), source)
+
+    def cascade_templates():
+        """Transformer scores for the calibration sample and uncertain sources, lexicon proxy for the rest.
+
+        Returns RoBERTa and SST-2 scores (NaN where the transformers didn't
+        run), their proxy predictions (NaN where they did) and the escalated flag.
+        """
+        sources = df.loc[source_rows]
+        texts = [text if isinstance(text, str) and text.strip() else None for text in sources['email_text']]
+        X = sources[cascade.PROXY_FEATURES].fillna(0).to_numpy()
+        roberta = np.full(len(sources), np.nan)
+        sst2 = np.full(len(sources), np.nan)
+        roberta_predicted = np.full(len(sources), np.nan)
+        sst2_predicted = np.full(len(sources), np.nan)
+
+        def run_transformers(mask):
+            batch = [texts[i] for i in np.flatnonzero(mask)]
+            roberta[mask] = client.scores('roberta', batch)
+            sst2[mask] = client.scores('sst2', batch)
+
+        # Empty emails cost nothing to "escalate": the scorers return NaN without running
+        escalated = cascade.calibration_rows(len(sources), args.calibration) | np.array([t is None for t in texts])
+        print(f"Calculating RoBERTa and SST-2 scores for {escalated.sum()} calibration sources...")
+        run_transformers(escalated)
+        calibrated = escalated.sum()
+        if not escalated.all():
+            fit = ~np.isnan(roberta)
+            roberta_proxy = cascade.LexiconProxy().fit(X[fit], roberta[fit])
+            sst2_proxy = cascade.LexiconProxy().fit(X[fit], sst2[fit])
+            predicted = roberta_proxy.predict(X)
+            uncertain = ~escalated & cascade.escalate(sources['vader_compound'].to_numpy(), predicted,
+                                                      args.band, args.max_gap)
+            print(f"Calculating RoBERTa and SST-2 scores for {uncertain.sum()} uncertain sources...")
+            run_transformers(uncertain)
+            escalated |= uncertain
+            roberta_predicted[~escalated] = predicted[~escalated]
+            sst2_predicted[~escalated] = sst2_proxy.predict(X[~escalated])
+        print(f"⚡ Transformers ran on {escalated.sum()}/{len(sources)} template sources "
+              f"({escalated.mean():.1%}): {calibrated} calibration, {escalated.sum() - calibrated} uncertain")
+
+        return [fan_out(dict(zip(source_rows, values)), source)
+                for values in [roberta, sst2, roberta_predicted, sst2_predicted, escalated]]
+
+    with MemoryStage('models.score'):
+        if args.cascade:
+            # The last run's real transformer scores, to report how close the cascade gets
+            previous = pd.read_csv(REJECTION_ANALYSIS_EXTENDED) if os.path.exists(REJECTION_ANALYSIS_EXTENDED) else None
+            # Predictions go in their own columns: the model statistics below and
+            # downstream stages only ever see real transformer scores
+            (df['hf_roberta_score'], df['hf_sst2_score'], df['hf_roberta_proxy'], df['hf_sst2_proxy'],
+             df['transformer_escalated']) = cascade_templates()
+        else:
+            print("Calculating RoBERTa scores...")
+            df['hf_roberta_score'] = score_templates('roberta')
+
+            print("Calculating SST-2 scores...")
+            df['hf_sst2_score'] = score_templates('sst2')
+
+else:
+    # read -> lexicon workers -> batched transformers -> write, all overlapping
+    print(f"Processing emails (pipelined: {args.lexicon_workers} {args.executor} lexicon workers, "
+          f"transformer batches of {args.batch_size})...")
+    texts = [email.get('email_text') for email, _ in emails]
+    source_texts = {texts[i] for i in source_rows}
+    store = FeatureStore(len(emails), nrc_dict)
+    roberta_scores = np.full(len(emails), np.nan)
+    sst2_scores = np.full(len(emails), np.nan)
+    scored = {}
+
+    def transformer_stage(items):
+        """Batched RoBERTa + SST-2 for the template sources in a batch of (text, row)"""
+        batch = list(dict.fromkeys(text for text, _ in items
+                                   if text and text.strip() and text in source_texts and text not in scored))
+        if batch:
+            roberta = client.scores('roberta', batch)
+            sst2 = client.scores('sst2', batch)
+            scored.update(zip(batch, zip(roberta, sst2)))
+        return [(row, scored.get(text, (np.nan, np.nan))) for text, row in items]
+
+    def write(i, result):
+        row, (roberta, sst2) = result
+        store.set_row(i, row)
+        store.status[i] = STATUSES.index(emails[i][1])
+        roberta_scores[i] = roberta
+        sst2_scores[i] = sst2
+
+    # Lexicon workers and transformer batches overlap, so they are measured as one block
+    with MemoryStage('models.stream'):
+        report = run_stream(texts, [
+            StreamStage('lexicon', extract_rows, workers=args.lexicon_workers, batch_size=4,
+                        executor=args.executor, initializer=init_worker, initargs=(nrc_dict,), keep_input=True),
+            StreamStage('transformers', transformer_stage, batch_size=args.batch_size),
+        ], write, queue_size=args.queue_size)
+    print_utilization(report)
+
+    df = assemble_frame(store, emails).join(clusters.drop(columns=['company_id', 'text_hash']))
+    df['hf_roberta_score'] = fan_out(dict(zip(source_rows, roberta_scores[source_rows])), source)
+    df['hf_sst2_score'] = fan_out(dict(zip(source_rows, sst2_scores[source_rows])), source)
+    print(f"✅ Processed {len(df)} emails")
+
+# Agreement of the cascade with the last full transformer run over unchanged emails
+if args.cascade:
+    if previous is not None and 'hf_roberta_score' in previous:
+        if 'transformer_escalated' in previous:
+            previous = previous[previous['transformer_escalated'].astype(bool)]
+        cascaded = df[['company_id', 'email_text', 'transformer_escalated']].copy()
+        for model in ['roberta', 'sst2']:
+            cascaded[f'hf_{model}_score'] = df[f'hf_{model}_score'].fillna(df[f'hf_{model}_proxy'])
+        full = cascaded.merge(previous[['company_id', 'email_text', 'hf_roberta_score', 'hf_sst2_score']],
+                              on=['company_id', 'email_text'], suffixes=('', '_full'))
+        print("\n📊 CASCADE vs FULL RUN:")
+        print(f"{'Model':<9} {'Rows':<12} {'n':>6} {'MAE':>7} {'|Δ|≤0.1':>8} {'sign':>7} {'r':>7}")
+        for model in ['roberta', 'sst2']:
+            for label, rows in [('all', full), ('proxy only', full[~full['transformer_escalated'].astype(bool)])]:
+                stats = cascade.agreement(rows[f'hf_{model}_score'].to_numpy(float),
+                                          rows[f'hf_{model}_score_full'].to_numpy(float))
+                if stats:
+                    print(f"{model:<9} {label:<12} {stats['rows']:>6} {stats['mae']:>7.3f} {stats['within_0.1']:>8.1%} "
+                          f"{stats['same_sign']:>7.1%} {stats['pearson']:>7.3f}")
+    else:
+        print("\nℹ️  No earlier full run to compare with; run without --cascade once to get one")
 
 # Save extended analysis
 print("\nSaving results...")
-df.to_csv('data/rejection_analysis_extended.csv', index=False)
-print("✅ Saved to data/rejection_analysis_extended.csv")
+df.to_csv(REJECTION_ANALYSIS_EXTENDED, index=False)
+print(f"✅ Saved to {REJECTION_ANALYSIS_EXTENDED}")
 
 # Summary statistics
 summary = df.groupby('status')[['vader_compound', 'textblob_polarity', 'afinn_score',
                                 'hf_roberta_score', 'hf_sst2_score']].agg(['mean','std'])
-summary.to_csv('data/rejection_summary.csv')
-print("✅ Saved summary to data/rejection_summary.csv")
+summary.to_csv(REJECTION_SUMMARY)
+print(f"✅ Saved summary to {REJECTION_SUMMARY}")
 
 # Correlation matrix
 print("\n📊 CORRELATION MATRIX:")
 corr = df[['vader_compound', 'textblob_polarity', 'afinn_score',
            'hf_roberta_score', 'hf_sst2_score']].corr()
-corr.to_csv('data/rejection_correlation_compare.csv')
+corr.to_csv(CORRELATION_COMPARE)
 print(corr)
 
 # Emotion correlations
@@ -246,4 +231,5 @@ df_plot['vader_roberta_gap'] = abs(df_plot['vader_compound'] - df_plot['hf_rober
 print("\nTop 5 biggest disagreements (VADER vs RoBERTa):")
 print(df_plot.nlargest(5, 'vader_roberta_gap')[['company_id', 'vader_compound', 'hf_roberta_score', 'vader_roberta_gap']])
 
+print_memory_report()
 print("\n✅ Extended analysis complete!")
\ No newline at end of file
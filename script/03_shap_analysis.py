@@ -1,16 +1,47 @@
 import pandas as pd
+import torch
 from transformers_interpret import SequenceClassificationExplainer
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 import json
 
+from memory import MemoryStage, print_memory_report
+from paths import REJECTION_ANALYSIS_EXTENDED, SHAP_RESULTS, SHAP_SUMMARY, SHAP_WORD_ATTRIBUTIONS
+from shap_store import ShapStoreWriter
+from token_cache import Encoding, merge_words, token_cache
 
-model_name = "cardiffnlp/twitter-roberta-base-sentiment-latest"
-model = AutoModelForSequenceClassification.from_pretrained(model_name)
-tokenizer = AutoTokenizer.from_pretrained(model_name)
-cls_explainer = SequenceClassificationExplainer(model, tokenizer)
+MAX_LENGTH = 512
 
 
-df = pd.read_csv('data/rejection_analysis_extended.csv')
+class CachedExplainer(SequenceClassificationExplainer):
+    """Explainer whose token ids come from the token cache, truncated like the scoring in 02"""
+
+    def _make_input_reference_pair(self, text):
+        encoding = token_cache(self.tokenizer).encode([text])[0]
+        room = MAX_LENGTH - self.tokenizer.num_special_tokens_to_add()
+        self.encoding = Encoding(*(array[:room] for array in encoding))
+        text_ids = self.encoding.ids.tolist()
+        input_ids = self.tokenizer.build_inputs_with_special_tokens(text_ids)
+        ref_input_ids = [self.cls_token_id] + [self.ref_token_id] * len(text_ids) + [self.sep_token_id]
+        return (torch.tensor([input_ids], device=self.device),
+                torch.tensor([ref_input_ids], device=self.device),
+                len(text_ids))
+
+    def word_attributions_for(self, text, class_name):
+        """(word, attribution) per word of the text, summing its sub-word tokens via the cached offsets"""
+        token_attributions = self(text, class_name=class_name)
+        # Drop the <s> and </s> the model input adds around the text
+        scores = [score for _, score in token_attributions[1:-1]]
+        return merge_words(self.text, self.encoding, scores)
+
+
+with MemoryStage('models.load'):
+    model_name = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    cls_explainer = CachedExplainer(model, tokenizer)
+
+
+df = pd.read_csv(REJECTION_ANALYSIS_EXTENDED)
 
 STOPWORDS = {
     'i', 'me', 'my', 'myself', 'mine',
@@ -93,6 +124,8 @@ print("="*80)
 # Storage for results
 all_results = {}
 csv_data = []
+attributions_by_source = {}
+store = ShapStoreWriter()
 
 companies = df[df['status'] != 'ghosted']['company_id'].tolist()
 
@@ -104,8 +137,15 @@ for company in companies:
     email_data = df[df['company_id'] == company].iloc[0]
     text = email_data['email_text']
     
-    # Get word attributions
-    word_attributions = cls_explainer(text, class_name="positive")
+    # Get word attributions, once per template (see script/dedup.py)
+    source = int(email_data.get('template_source_row', email_data.name))
+    if source not in attributions_by_source:
+        source_text = df.loc[source, 'email_text']
+        with MemoryStage('shap.attribution'):
+            attributions_by_source[source] = cls_explainer.word_attributions_for(source_text, "positive")
+    word_attributions = attributions_by_source[source]
+    if source != email_data.name:
+        print(f"♻️  Reusing attributions from template {df.loc[source, 'company_id']}")
     meaningful_attrs = filter_word_attributions(word_attributions)
     
     print(f"\nVADER: {email_data['vader_compound']:.3f}")
@@ -155,6 +195,7 @@ for company in companies:
         'net_impact': float(net_meaningful),
         'words': [(word, float(score)) for word, score in sorted_attrs]
     }
+    store.add(company, all_results[company])
     
     # Add to CSV data
     for word, score in sorted_attrs:
@@ -172,12 +213,16 @@ print("\n" + "="*80)
 print("💾 SAVING RESULTS")
 print("="*80)
 
-with open('data/shap_results_all.json', 'w') as f:
+with open(SHAP_RESULTS, 'w') as f:
     json.dump(all_results, f, indent=2)
 
+# Sharded store the app reads one company at a time (script/shap_store.py)
+store.close()
+
 # Save to CSV (flat structure for easy analysis)
-csv_df = pd.DataFrame(csv_data)
-csv_df.to_csv('data/shap_word_attributions_all.csv', index=False)
+with MemoryStage('frame.assemble'):
+    csv_df = pd.DataFrame(csv_data)
+csv_df.to_csv(SHAP_WORD_ATTRIBUTIONS, index=False)
 
 
 # Save summary statistics
@@ -194,6 +239,6 @@ for company, results in all_results.items():
     })
 
 summary_df = pd.DataFrame(summary_data)
-summary_df.to_csv('data/shap_summary_all.csv', index=False)
-
+summary_df.to_csv(SHAP_SUMMARY, index=False)
 
+print_memory_report()
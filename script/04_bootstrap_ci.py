@@ -0,0 +1,125 @@
+"""Bootstrap confidence intervals for the features x model-scores correlations.
+
+Usage:
+    python script/04_bootstrap_ci.py --resamples 10000 --jobs 4
+
+Every resample of the (non-ghosted) emails is drawn as one index matrix and
+all resampled correlation matrices are computed with batched matrix products.
+Resamples are split into fixed-size chunks, each with its own seed, that
+run on separate cores; the results depend on --seed only, not on --jobs.
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from features import EMOTION_COLUMNS, FEATURE_COLUMNS
+from paths import BOOTSTRAP_CORRELATIONS, REJECTION_ANALYSIS_EXTENDED
+
+MODEL_SCORES = ['vader_compound', 'textblob_polarity', 'afinn_score', 'hf_roberta_score', 'hf_sst2_score']
+FEATURES = [name for name, _ in FEATURE_COLUMNS + EMOTION_COLUMNS if name not in MODEL_SCORES]
+CHUNK = 2048  # resamples per seeded chunk (the unit of work per core)
+MEMORY_BUDGET = 256 * 2**20  # bytes of resampled rows per batched product
+
+
+def block_size(n, cols):
+    """Resamples per batched product: b x n indices and b x n x cols float64 rows fit the budget"""
+    return max(1, min(CHUNK, MEMORY_BUDGET // (n * (cols + 1) * 8)))
+
+
+def correlations(X, Y, idx):
+    """Pearson r of every X column with every Y column, for each row of idx.
+
+    X (n, f), Y (n, m), idx (b, n) -> (b, f, m). Resamples where a column is
+    constant give NaN.
+    """
+    Xb = X[idx]
+    Yb = Y[idx]
+    Xb -= Xb.mean(axis=1, keepdims=True)
+    Yb -= Yb.mean(axis=1, keepdims=True)
+    cov = np.matmul(Xb.transpose(0, 2, 1), Yb)
+    sx = np.sqrt(np.einsum('bnf,bnf->bf', Xb, Xb))
+    sy = np.sqrt(np.einsum('bnm,bnm->bm', Yb, Yb))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return cov / (sx[:, :, None] * sy[:, None, :])
+
+
+def bootstrap_chunk(X, Y, n_resamples, seed):
+    """Correlation matrices for n_resamples bootstrap draws"""
+    rng = np.random.default_rng(seed)
+    n = len(X)
+    out = np.empty((n_resamples, X.shape[1], Y.shape[1]))
+    # Drawing the index rows in smaller blocks doesn't change the stream, so the
+    # results don't depend on the block size
+    block = block_size(n, X.shape[1] + Y.shape[1])
+    for start in range(0, n_resamples, block):
+        b = min(block, n_resamples - start)
+        out[start:start + b] = correlations(X, Y, rng.integers(0, n, size=(b, n)))
+    return out
+
+
+def bootstrap(X, Y, n_resamples=10_000, jobs=None, seed=0, confidence=0.95):
+    """Point correlations plus percentile CIs; returns (r, low, high, valid)"""
+    jobs = jobs or os.cpu_count() or 1
+    # One seed per chunk of CHUNK resamples, however many workers draw them
+    sizes = [min(CHUNK, n_resamples - start) for start in range(0, n_resamples, CHUNK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    if jobs == 1:
+        samples = np.concatenate([bootstrap_chunk(X, Y, size, s) for size, s in zip(sizes, seeds)])
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            samples = np.concatenate(list(pool.map(bootstrap_chunk, [X] * len(sizes), [Y] * len(sizes), sizes, seeds)))
+
+    r = correlations(X, Y, np.arange(len(X))[None, :])[0]
+    alpha = (1 - confidence) / 2
+    low, high = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+    valid = np.isfinite(samples).sum(axis=0)
+    return r, low, high, valid
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resamples', type=int, default=10_000)
+    parser.add_argument('--jobs', type=int, default=os.cpu_count())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    df = pd.read_csv(REJECTION_ANALYSIS_EXTENDED)
+    df = df[df['status'] != 'ghosted']
+    features = [c for c in FEATURES if c in df.columns]
+    df = df.dropna(subset=features + MODEL_SCORES)
+    X = df[features].to_numpy(dtype=np.float64)
+    Y = df[MODEL_SCORES].to_numpy(dtype=np.float64)
+
+    start = time.perf_counter()
+    r, low, high, valid = bootstrap(X, Y, args.resamples, args.jobs, args.seed)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {args.resamples:,} resamples of {len(df)} emails x {len(features)} features x "
+          f"{len(MODEL_SCORES)} models in {elapsed:.2f}s ({args.jobs} jobs)")
+
+    out = pd.DataFrame({
+        'feature': np.repeat(features, len(MODEL_SCORES)),
+        'model': np.tile(MODEL_SCORES, len(features)),
+        'r': r.ravel(),
+        'ci_low': low.ravel(),
+        'ci_high': high.ravel(),
+        'valid_resamples': valid.ravel(),
+        'n': len(df),
+    })
+    out['excludes_zero'] = (out['ci_low'] > 0) | (out['ci_high'] < 0)
+    out.to_csv(BOOTSTRAP_CORRELATIONS, index=False)
+    print(f"✅ Saved to {BOOTSTRAP_CORRELATIONS}")
+
+    print("\n📊 EMOTION CORRELATIONS WITH VADER (95% bootstrap CI):")
+    headline = out[(out['model'] == 'vader_compound') & out['feature'].str.startswith('emotion_')]
+    for row in headline.itertuples():
+        flag = '' if row.excludes_zero else '  (CI includes 0)'
+        print(f"  {row.feature.replace('emotion_', '').capitalize():15} {row.r:+.3f}  "
+              f"[{row.ci_low:+.3f}, {row.ci_high:+.3f}]{flag}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""The notebook analyses as importable, memoized stages.
+
+Usage:
+    python script/pipeline.py final_stats      # bring final_stats.json (and what it needs) up to date
+    python script/analyses.py positive_ratio   # compute one analysis unconditionally (what the pipeline runs)
+
+In a notebook:
+    sys.path.insert(0, '../script')
+    from analyses import run
+    stats = run('final_stats')
+
+Each analysis is a function from its input files to one output: AFINN word
+lists (01), NRC emotion features (03), the positive-words-per-apology ratio
+(04), the lexicon vs transformer disagreements (05) and final_stats.json,
+which sums them up. Their inputs and outputs are declared with the pipeline
+stages of the same name. run() brings an analysis up to date the way the
+pipeline does, using the same fingerprints and state file, so a stage
+computed from a notebook is up to date for the pipeline and the other way
+round. Only analyses whose code or inputs changed are recomputed.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from afinn import Afinn
+
+import paths
+from features import build_features, load_nrc
+from pipeline import ROOT, STAGES, build_graph, fingerprint, load_state, save_state
+
+afinn = Afinn()
+
+# 04: the 4:1 rule
+MINIMUM_RATIO = 4           # positive words per apology below which emails run cold
+SAFE_RATIO = 6
+WARM = 0.85                 # VADER score counted as a warm email
+SUCCESS, FAILURE = 0.90, 0.50
+# 02: below this many positive words sentiment drops off (the Company_D cliff)
+POSITIVE_WORD_THRESHOLD = 4
+
+
+def non_ghosted(df):
+    return df[df['status'] != 'ghosted']
+
+
+def number(value, digits=None):
+    """JSON-safe float: None for NaN or infinity"""
+    if value is None or not np.isfinite(value):
+        return None
+    return round(float(value), digits) if digits is not None else float(value)
+
+
+@lru_cache(maxsize=None)
+def afinn_word(word):
+    return afinn.score(word)
+
+
+def afinn_words():
+    """01: AFINN score and the positive and negative words of every answered application"""
+    with open(paths.EMAILS) as f:
+        data = json.load(f)
+    rows = []
+    # 01 labels the feedback section 'feedback_rejection', unlike features.SECTIONS
+    for key, status in [('rejection_emails', 'rejection'), ('feedback_rejection', 'feedback_rejection')]:
+        for email in data.get(key, []):
+            text = email.get('email_text')
+            words = re.findall(r'\b[a-zA-Z]+\b', text.lower()) if isinstance(text, str) else []
+            scored = {word: afinn_word(word) for word in words if afinn_word(word) != 0}
+            positive = {word: score for word, score in scored.items() if score > 0}
+            negative = {word: score for word, score in scored.items() if score < 0}
+            rows.append({
+                'company_id': email.get('company_id'),
+                'position_applied': email.get('position_applied'),
+                'status': status,
+                'afinn_score': afinn.score(text) if text else 0,
+                'positive_words': json.dumps(positive),
+                'negative_words': json.dumps(negative),
+                'positive_count': len(positive),
+                'negative_count': len(negative),
+                'email_length': len(words),
+            })
+    return pd.DataFrame(rows)
+
+
+def emotions():
+    """03: the lexicon features plus NRC emotion counts for every email"""
+    with open(paths.EMAILS) as f:
+        data = json.load(f)
+    df, _ = build_features(data, load_nrc())
+    return df
+
+
+def positive_ratio():
+    """04: how many positive words it takes to make up for an apology"""
+    df = non_ghosted(pd.read_csv(paths.REJECTION_ANALYSIS_EXTENDED))
+    df = df.dropna(subset=['vader_compound'])
+
+    # Least squares fit of VADER on positive and apology word counts
+    X = np.column_stack([np.ones(len(df)), df['afinn_positive_count'], df['apology_words']])
+    intercept, positive, apology = np.linalg.lstsq(X, df['vader_compound'].to_numpy(float), rcond=None)[0]
+    calculated = abs(apology) / positive if apology < 0 and positive > 0 else None
+
+    with_apologies = df[df['apology_words'] > 0]
+    ratio = with_apologies['afinn_positive_count'] / with_apologies['apology_words']
+    vader = with_apologies['vader_compound']
+    warm, cold = ratio[vader >= WARM], ratio[vader < WARM]
+    threshold = None
+    if len(warm) and len(cold):
+        threshold = {'min_warm_ratio': number(warm.min()), 'max_cold_ratio': number(cold.max()),
+                     'suggested': number((warm.min() + cold.max()) / 2)}
+
+    zones = []
+    for zone, low, high in [('danger', 0, MINIMUM_RATIO), ('minimum', MINIMUM_RATIO, SAFE_RATIO),
+                            ('safe', SAFE_RATIO, np.inf)]:
+        in_zone = vader[(ratio >= low) & (ratio < high)]
+        zones.append({'zone': zone, 'min_ratio': low, 'max_ratio': number(high), 'emails': int(len(in_zone)),
+                      'success_rate': number((in_zone >= WARM).mean()) if len(in_zone) else None,
+                      'average_score': number(in_zone.mean()) if len(in_zone) else None})
+
+    return {
+        'emails': int(len(df)),
+        'regression': {'intercept': number(intercept), 'positive_effect': number(positive),
+                       'apology_effect': number(apology)},
+        'calculated_ratio': number(calculated),
+        'average_successful': number(ratio[vader >= SUCCESS].mean()),
+        'average_failed': number(ratio[vader < FAILURE].mean()),
+        'warm_threshold': WARM,
+        'threshold': threshold,
+        'zones': zones,
+    }
+
+
+def disagreements():
+    """05: emails where the lexicons and the transformers disagree most"""
+    df = non_ghosted(pd.read_csv(paths.REJECTION_ANALYSIS_EXTENDED)).copy()
+
+    # AFINN scaled to roughly [-1, 1] to average with VADER and TextBlob
+    afinn_max_abs = df['afinn_score'].abs().max()
+    afinn_norm = df['afinn_score'] / afinn_max_abs if afinn_max_abs != 0 else df['afinn_score']
+    lexicon_avg = pd.concat([df['vader_compound'], df['textblob_polarity'], afinn_norm], axis=1).mean(axis=1)
+
+    roberta = (lexicon_avg - df['hf_roberta_score']).abs()
+    sst2 = (lexicon_avg - df['hf_sst2_score']).abs()
+    df['max_disagreement'] = pd.concat([roberta, sst2], axis=1).max(axis=1)
+    df['note'] = np.where(df['max_disagreement'] == roberta, 'RoBERTa disagrees most', 'SST-2 disagrees most')
+
+    cols = ['company_id', 'email_text', 'vader_compound', 'textblob_polarity',
+            'afinn_score', 'hf_roberta_score', 'hf_sst2_score', 'max_disagreement', 'note']
+    return df[cols].sort_values(by='max_disagreement', ascending=False)
+
+
+def final_stats():
+    """The headline numbers of the write-up"""
+    df = pd.read_csv(paths.REJECTION_ANALYSIS_EXTENDED)
+    answered = non_ghosted(df)
+    compare = pd.read_csv(paths.CORRELATION_COMPARE, index_col=0)
+    with open(paths.POSITIVE_RATIO) as f:
+        ratio = json.load(f)
+
+    joy = answered['emotion_joy'].corr(answered['vader_compound'])
+    positive_words = answered['afinn_positive_count'].corr(answered['vader_compound'])
+    gaps = (answered['vader_compound'] - answered['hf_roberta_score']).abs()
+    top = answered.assign(gap=gaps).nlargest(3, 'gap')
+    calculated = ratio['calculated_ratio']
+
+    return {
+        'dataset': {
+            'total_emails': int(len(answered)),
+            'ghosted': int(len(df) - len(answered)),
+            'companies': answered['company_id'].tolist(),
+        },
+        'correlations': {
+            'joy_vader': number(joy),
+            'positive_words_vader': number(positive_words),
+            'vader_roberta': number(compare.loc['vader_compound', 'hf_roberta_score']),
+            'roberta_sst2': number(compare.loc['hf_roberta_score', 'hf_sst2_score']),
+        },
+        'ratio_rule': {
+            'calculated_ratio': number(calculated, 1),
+            'recommended_ratio': float(SAFE_RATIO),
+            'minimum_threshold': float(MINIMUM_RATIO),
+            'average_successful': ratio['average_successful'],
+        },
+        'key_findings': {
+            'joy_is_strongest': bool(joy > positive_words),
+            'joy_correlation': number(joy, 3),
+            'positive_word_threshold': POSITIVE_WORD_THRESHOLD,
+            'apology_compensation_ratio': round(calculated) if calculated is not None else None,
+        },
+        'model_disagreements': {
+            'top_3': [{'company': row['company_id'], 'gap': round(row['gap'], 2)} for _, row in top.iterrows()],
+        },
+    }
+
+
+ANALYSES = {
+    'afinn_words': afinn_words,
+    'emotions': emotions,
+    'positive_ratio': positive_ratio,
+    'disagreements': disagreements,
+    'final_stats': final_stats,
+}
+STAGES_BY_NAME = {stage.name: stage for stage in STAGES}
+
+
+def save(result, path):
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+    else:
+        result.to_csv(path, index=False)
+
+
+def load(path):
+    if path.endswith('.json'):
+        with open(path) as f:
+            return json.load(f)
+    return pd.read_csv(path)
+
+
+def compute(name):
+    """Run one analysis and write its output (paths relative to the repo root)"""
+    output = STAGES_BY_NAME[name].outputs[0]
+    result = ANALYSES[name]()
+    save(result, output)
+    return result
+
+
+def nrc_lexicon():
+    """The NRC lexicon from the shared cache, from any working directory"""
+    with contextlib.chdir(ROOT):
+        return load_nrc()
+
+
+def run(name, force=False, graph=None):
+    """Bring an analysis and the analyses it reads up to date; returns its output"""
+    graph = graph or build_graph(STAGES)
+    with contextlib.chdir(ROOT):
+        for upstream in graph[name]:
+            if upstream in ANALYSES:
+                run(upstream, graph=graph)
+        stage = STAGES_BY_NAME[name]
+        missing = [path for path in stage.inputs if not os.path.exists(path)]
+        if missing:
+            raise SystemExit(f"❌ {name}: missing {', '.join(missing)}, run python script/pipeline.py {name}")
+        fp = fingerprint(stage)
+        state = load_state()
+        if not force and state.get(name) == fp and all(os.path.exists(path) for path in stage.outputs):
+            print(f"⏭️  {name}: up to date")
+            return load(stage.outputs[0])
+        result = compute(name)
+        state = load_state()
+        state[name] = fp
+        save_state(state)
+        print(f"✅ {name}: saved {stage.outputs[0]}")
+        return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('analyses', nargs='+', choices=list(ANALYSES))
+    args = parser.parse_args()
+
+    for name in args.analyses:
+        compute(name)
+        print(f"✅ {name}: saved {STAGES_BY_NAME[name].outputs[0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Embedded SQLite query layer over the pipeline's output tables.
+
+The CSVs are loaded (in chunks) into one SQLite file, indexed on the columns
+the app filters, groups and sorts by, so the dashboard can run each filter
+and aggregation as a query instead of holding every table in pandas.
+
+    emails        rejection_analysis_extended.csv
+    shap_words    shap_word_attributions_all.csv
+    shap_summary  shap_summary_all.csv
+
+Usage:
+    python script/analysis_db.py                         # (re)build data/analysis.sqlite
+    python script/analysis_db.py --explain "SELECT ..."  # run a query, show plan and timing
+"""
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from paths import ANALYSIS_DB, REJECTION_ANALYSIS_EXTENDED, SHAP_SUMMARY, SHAP_WORD_ATTRIBUTIONS
+
+TABLES = {
+    'emails': REJECTION_ANALYSIS_EXTENDED,
+    'shap_words': SHAP_WORD_ATTRIBUTIONS,
+    'shap_summary': SHAP_SUMMARY,
+}
+INDEXES = [
+    ('emails', ['status', 'vader_compound']),
+    ('emails', ['position_applied']),
+    ('emails', ['days_since_application']),
+    ('emails', ['company_id']),
+    ('shap_words', ['direction', 'attribution']),
+    ('shap_words', ['word']),
+    ('shap_words', ['company']),
+]
+CHUNK_ROWS = 50_000
+
+
+def build(db_path=ANALYSIS_DB):
+    """Load every table and create the indexes; replaces the file atomically"""
+    tmp = db_path + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    con = sqlite3.connect(tmp)
+    try:
+        for table, csv_path in TABLES.items():
+            for i, chunk in enumerate(pd.read_csv(csv_path, chunksize=CHUNK_ROWS)):
+                chunk.to_sql(table, con, if_exists='replace' if i == 0 else 'append', index=False)
+        for table, columns in INDEXES:
+            con.execute(f"CREATE INDEX idx_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})")
+        con.execute('ANALYZE')
+        con.commit()
+    finally:
+        con.close()
+    os.replace(tmp, db_path)
+
+
+def is_stale(db_path=ANALYSIS_DB):
+    """True when the database is missing or older than any source CSV"""
+    if not os.path.exists(db_path):
+        return True
+    built = os.path.getmtime(db_path)
+    return any(os.path.getmtime(path) > built for path in TABLES.values() if os.path.exists(path))
+
+
+class AnalysisDB:
+    """Read-only connection that times each query and captures its plan"""
+
+    def __init__(self, db_path=ANALYSIS_DB):
+        if is_stale(db_path):
+            build(db_path)
+        self.con = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+
+    def query(self, sql, params=(), log=None):
+        """Result as a DataFrame; appends {sql, params, rows, ms, plan} to `log` if given"""
+        with self._lock:
+            start = time.perf_counter()
+            frame = pd.read_sql_query(sql, self.con, params=params)
+            ms = (time.perf_counter() - start) * 1000
+            if log is not None:
+                plan = [row[3] for row in self.con.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+                log.append({'sql': ' '.join(sql.split()), 'params': tuple(params), 'rows': len(frame),
+                            'ms': ms, 'plan': plan})
+        return frame
+
+    def distinct(self, table, column, log=None):
+        return self.query(f"SELECT DISTINCT {column} FROM {table} WHERE {column} IS NOT NULL "
+                          f"ORDER BY {column}", log=log)[column].tolist()
+
+
+def where_clause(statuses=None, position=None, min_days=None, max_days=None):
+    """(SQL WHERE clause, params) for the dashboard's email filters"""
+    conditions, params = [], []
+    if statuses is not None:
+        conditions.append(f"status IN ({', '.join('?' * len(statuses))})" if statuses else '0')
+        params += list(statuses)
+    if position:
+        conditions.append("position_applied LIKE ?")
+        params.append(f'%{position}%')
+    if min_days is not None:
+        conditions.append("days_since_application >= ?")
+        params.append(min_days)
+    if max_days is not None:
+        conditions.append("days_since_application <= ?")
+        params.append(max_days)
+    return ('WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--explain', metavar='SQL', help='run one query against the database')
+    args = parser.parse_args()
+
+    if args.explain:
+        log = []
+        print(AnalysisDB().query(args.explain, log=log).to_string(index=False))
+        print(f"\n📊 {log[0]['rows']} rows in {log[0]['ms']:.2f} ms")
+        for step in log[0]['plan']:
+            print(f"   {step}")
+        return
+
+    start = time.perf_counter()
+    build()
+    con = sqlite3.connect(ANALYSIS_DB)
+    counts = {table: con.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] for table in TABLES}
+    con.close()
+    print(f"✅ Built {ANALYSIS_DB} in {time.perf_counter() - start:.2f}s: "
+          + ', '.join(f"{table} ({n} rows)" for table, n in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
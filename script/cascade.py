@@ -0,0 +1,76 @@
+"""Cascade scoring: a lexicon proxy first, the transformers only where it is unsure.
+
+02_compare_models.py --cascade scores a random calibration sample of template
+sources with RoBERTa and SST-2, and fits a ridge regression from the lexicon
+features (VADER, TextBlob, AFINN, NRC, ...) to each model's score. A source is
+escalated to the transformers when the predicted RoBERTa score falls in the
+uncertainty band around neutral, or when it disagrees with VADER by more
+than max_gap (the VADER vs RoBERTa gaps the disagreement printout looks
+for). The other sources keep the proxy's predictions.
+"""
+import numpy as np
+
+PROXY_FEATURES = [
+    'vader_compound', 'textblob_polarity', 'afinn_score', 'afinn_positive_count', 'afinn_negative_count',
+    'empathy_density', 'pronoun_density', 'apology_words', 'mentions_future', 'contains_feedback',
+    'emotion_joy', 'emotion_trust', 'emotion_sadness', 'emotion_fear', 'emotion_anger',
+    'emotion_positive', 'emotion_negative', 'word_count', 'flesch_reading',
+]
+BAND = 0.3            # escalate when |predicted RoBERTa| is below this
+MAX_GAP = 0.6         # escalate when |VADER - predicted RoBERTa| is above this
+CALIBRATION = 0.05    # share of template sources always sent to the transformers
+MIN_CALIBRATION = 200
+RIDGE_ALPHA = 1.0
+
+
+class LexiconProxy:
+    """Ridge regression on standardized lexicon features"""
+
+    def __init__(self, alpha=RIDGE_ALPHA):
+        self.alpha = alpha
+
+    def fit(self, X, y):
+        X = np.asarray(X, dtype=float)
+        self.mean = X.mean(axis=0)
+        self.scale = X.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        Z = (X - self.mean) / self.scale
+        self.intercept = float(np.mean(y))
+        self.coef = np.linalg.solve(Z.T @ Z + self.alpha * np.eye(Z.shape[1]), Z.T @ (y - self.intercept))
+        return self
+
+    def predict(self, X):
+        Z = (np.asarray(X, dtype=float) - self.mean) / self.scale
+        return np.clip(Z @ self.coef + self.intercept, -1.0, 1.0)
+
+
+def calibration_rows(n, share=CALIBRATION, minimum=MIN_CALIBRATION, seed=0):
+    """Boolean mask of the rows scored by the transformers to fit the proxy (all of them for small corpora)"""
+    mask = np.zeros(n, dtype=bool)
+    count = max(int(round(share * n)), minimum)
+    if count >= n:
+        mask[:] = True
+    else:
+        mask[np.random.default_rng(seed).choice(n, count, replace=False)] = True
+    return mask
+
+
+def escalate(vader, predicted, band=BAND, max_gap=MAX_GAP):
+    """True where the proxy is unsure (near neutral) or predicts a VADER/RoBERTa disagreement"""
+    return (np.abs(predicted) < band) | (np.abs(vader - predicted) > max_gap) | np.isnan(vader)
+
+
+def agreement(scores, reference):
+    """How close cascade scores are to a full transformer run, over the rows both have"""
+    both = ~(np.isnan(scores) | np.isnan(reference))
+    scores, reference = scores[both], reference[both]
+    if not len(scores):
+        return None
+    error = np.abs(scores - reference)
+    return {
+        'rows': int(len(scores)),
+        'mae': float(error.mean()),
+        'within_0.1': float((error <= 0.1).mean()),
+        'same_sign': float((np.sign(scores) == np.sign(reference)).mean()),
+        'pearson': float(np.corrcoef(scores, reference)[0, 1]) if len(scores) > 2 else float('nan'),
+    }
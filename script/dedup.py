@@ -0,0 +1,163 @@
+"""Near-duplicate template clustering (MinHash + LSH).
+
+Most rejections are ATS templates that differ only in placeholders such as
+[Name] or [Company_X]. This stage groups them so the transformer stages can
+score and explain one representative per template and fan the result out.
+
+Usage:
+    python script/dedup.py          # writes data/template_clusters.csv
+
+Each row of the output says which email's model results the row can reuse
+(`template_source`, and its row `template_source_row`). Candidates are found
+on lowercased text, but RoBERTa is case-sensitive, so reuse is decided on the
+text with only placeholders masked: a member reuses its representative's
+results when that text is identical, or when its estimated Jaccard similarity
+to the representative is at least --reuse-threshold; otherwise it is scored on
+its own. `text_hash` fingerprints each masked text so the model stages can
+tell when the file is out of date.
+"""
+import argparse
+import hashlib
+import json
+import re
+
+import numpy as np
+import pandas as pd
+
+from features import SECTIONS
+from paths import EMAILS, TEMPLATE_CLUSTERS
+
+NUM_PERM = 128
+BANDS = 16  # 16 bands x 8 rows: pairs above ~0.7 similarity become candidates
+SHINGLE_SIZE = 3
+MERSENNE_PRIME = (1 << 61) - 1
+
+_rng = np.random.default_rng(1)
+PERM_A = _rng.integers(1, 1 << 32, NUM_PERM, dtype=np.uint64)
+PERM_B = _rng.integers(0, 1 << 32, NUM_PERM, dtype=np.uint64)
+
+
+def mask(text):
+    """Collapse whitespace and mask [placeholders], keeping case"""
+    if not text:
+        return ''
+    return ' '.join(re.sub(r'\[[^\]]*\]', '[x]', text).split())
+
+
+def text_hash(text):
+    """Short hash of a text's masked form, stored with the clusters"""
+    return hashlib.blake2b(mask(text).encode('utf-8'), digest_size=8).hexdigest()
+
+
+def shingles(normalized):
+    words = normalized.split()
+    if len(words) <= SHINGLE_SIZE:
+        return {normalized}
+    return {' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def minhash(normalized):
+    """128-value MinHash signature of a normalized text's word shingles"""
+    hashes = np.array([int.from_bytes(hashlib.blake2b(s.encode('utf-8'), digest_size=4).digest(), 'little')
+                       for s in shingles(normalized)], dtype=np.uint64)
+    permuted = (hashes[:, None] * PERM_A + PERM_B) % MERSENNE_PRIME
+    return (permuted & np.uint64(0xFFFFFFFF)).min(axis=0)
+
+
+def similarity(sig_a, sig_b):
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(sig_a == sig_b))
+
+
+def cluster_templates(texts, threshold=0.8, reuse_threshold=0.95):
+    """Cluster near-duplicate texts.
+
+    Returns a DataFrame with one row per text: cluster id, representative
+    index (the first member seen), estimated similarity to the
+    representative, and `source`, the index whose results this row reuses
+    (its first exact duplicate, usually itself, when it has to be scored).
+    Clusters ignore case; similarity and reuse compare the case-kept text.
+    """
+    masked = [mask(text) for text in texts]
+
+    # Exact duplicates after masking collapse before any hashing
+    unique = {}
+    first_of = np.array([unique.setdefault(text, i) for i, text in enumerate(masked)])
+    uniques = sorted(unique.values())
+
+    # Empty texts have nothing to compare and stay in their own group;
+    # candidates come from lowercased signatures, reuse from cased ones
+    signatures = {i: minhash(masked[i].lower()) for i in uniques if masked[i]}
+    cased = {i: minhash(masked[i]) for i in signatures}
+
+    # LSH: texts sharing any band become candidate pairs
+    parent = {i: i for i in uniques}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    rows = NUM_PERM // BANDS
+    for band in range(BANDS):
+        buckets = {}
+        for i, sig in signatures.items():
+            buckets.setdefault(sig[band * rows:(band + 1) * rows].tobytes(), []).append(i)
+        for members in buckets.values():
+            for other in members[1:]:
+                a, b = find(members[0]), find(other)
+                if a != b and similarity(signatures[members[0]], signatures[other]) >= threshold:
+                    parent[max(a, b)] = min(a, b)
+
+    representative = np.array([find(first_of[i]) for i in range(len(texts))])
+    sims = np.array([1.0 if masked[i] == masked[rep] else similarity(cased[first_of[i]], cased[rep])
+                     for i, rep in enumerate(representative)])
+    source = np.where(sims >= reuse_threshold, representative, first_of)
+    _, cluster = np.unique(representative, return_inverse=True)
+    return pd.DataFrame({
+        'cluster': cluster,
+        'representative': representative,
+        'similarity': sims,
+        'source': source,
+    })
+
+
+def fan_out(results, source):
+    """Copy results computed once per source row ({row: result}) to every row of `source`"""
+    return pd.Series(results).reindex(source).to_numpy()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--threshold', type=float, default=0.8, help='similarity needed to join a cluster')
+    parser.add_argument('--reuse-threshold', type=float, default=0.95,
+                        help='similarity needed to reuse the representative\'s results')
+    args = parser.parse_args()
+
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    emails = [email for key, _ in SECTIONS for email in data.get(key, [])]
+    company_ids = [email.get('company_id') for email in emails]
+
+    texts = [email.get('email_text') for email in emails]
+    plan = cluster_templates(texts, args.threshold, args.reuse_threshold)
+    out = pd.DataFrame({
+        'company_id': company_ids,
+        'text_hash': [text_hash(text) for text in texts],
+        'template_cluster': plan['cluster'],
+        'template_representative': [company_ids[i] for i in plan['representative']],
+        'template_similarity': plan['similarity'].round(4),
+        'template_source': [company_ids[i] for i in plan['source']],
+        'template_source_row': plan['source'],
+    })
+    out.to_csv(TEMPLATE_CLUSTERS, index=False)
+
+    n_scored = plan['source'].nunique()
+    print(f"✅ {len(out)} emails -> {plan['cluster'].nunique()} template clusters")
+    print(f"📊 Transformer stages will score {n_scored} emails and reuse {len(out) - n_scored} results")
+    print(f"✅ Saved to {TEMPLATE_CLUSTERS}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Distilled warmth model: a linear student of RoBERTa that scores without PyTorch.
+
+Usage:
+    python script/distill.py                    # train on 02's RoBERTa scores, report fidelity
+    python script/distill.py --score            # score 01's rejection_analysis.csv with the student
+
+The student is a ridge regression over the lexicon features 01 already
+computes plus hashed word unigrams and bigrams. Its pseudo-labels are the
+hf_roberta_score column of rejection_analysis_extended.csv: the real corpus,
+or a synthetic one scored with REJECTION_DATA_DIR=data/synthetic. Only real
+transformer scores are used, i.e. one per template source, and none of the
+proxy predictions from a --cascade run. Training holds out a share of the
+rows and reports the student's agreement with the teacher on them, next to
+a lexicon-only baseline, and its scoring throughput.
+"""
+import argparse
+import os
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.sparse.linalg import lsqr
+
+from cascade import LexiconProxy, agreement
+from doc_term import DocTermMatrix
+from paths import DISTILLED_MODEL, DISTILLED_SCORES, REJECTION_ANALYSIS, REJECTION_ANALYSIS_EXTENDED
+
+# Lexicon features in 01's output, so scoring needs neither NRC nor the transformers
+LEXICON_FEATURES = [
+    'vader_compound', 'textblob_polarity', 'afinn_score', 'afinn_positive_count', 'afinn_negative_count',
+    'empathy_words', 'apology_words', 'personal_pronouns', 'pronoun_density', 'empathy_density',
+    'mentions_future', 'contains_feedback', 'flesch_reading', 'word_count',
+]
+HASH_BITS = 18
+ALPHA = 1.0
+HOLDOUT = 0.2
+_BIGRAM_MIX = np.uint64(0x9E3779B1)
+
+
+def hashed_ngrams(texts, bits=HASH_BITS):
+    """Rows of log(1 + count) over hashed word unigrams and bigrams, L2-normalized"""
+    dtm = DocTermMatrix([text if isinstance(text, str) else '' for text in texts])
+    # crc32 is stable across processes, unlike hash(); one call per distinct word
+    codes = dtm.weights(lambda word: zlib.crc32(word.encode()), dtype=np.uint64)[dtm.token_ids]
+    docs = np.repeat(np.arange(len(dtm)), dtm.lengths)
+    # A bigram is two neighbouring tokens of the same document
+    same_doc = docs[1:] == docs[:-1]
+    bigrams = codes[:-1][same_doc] * _BIGRAM_MIX + codes[1:][same_doc]
+    size = np.uint64(1 << bits)
+    columns = np.concatenate([codes % size, bigrams % size]).astype(np.int64)
+    rows = np.concatenate([docs, docs[1:][same_doc]])
+    X = sparse.csr_matrix((np.ones(len(rows)), (rows, columns)), shape=(len(dtm), 1 << bits))
+    X.sum_duplicates()
+    X.data = np.log1p(X.data)
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sparse.diags(1.0 / norms) @ X
+
+
+class DistilledModel:
+    """Standardized lexicon features and hashed n-grams -> predicted hf_roberta_score"""
+
+    def __init__(self, bits=HASH_BITS, alpha=ALPHA):
+        self.bits = bits
+        self.alpha = alpha
+
+    def _design(self, frame):
+        lexicon = (frame[LEXICON_FEATURES].fillna(0).to_numpy(float) - self.mean) / self.scale
+        return sparse.hstack([sparse.csr_matrix(lexicon), hashed_ngrams(frame['email_text'], self.bits)]).tocsr()
+
+    def fit(self, frame, y):
+        lexicon = frame[LEXICON_FEATURES].fillna(0).to_numpy(float)
+        self.mean = lexicon.mean(axis=0)
+        self.scale = lexicon.std(axis=0)
+        self.scale[self.scale == 0] = 1.0
+        self.intercept = float(np.mean(y))
+        self.coef = lsqr(self._design(frame), y - self.intercept, damp=np.sqrt(self.alpha))[0]
+        return self
+
+    def predict(self, frame):
+        scores = np.clip(self._design(frame) @ self.coef + self.intercept, -1.0, 1.0)
+        empty = ~frame['email_text'].map(lambda text: isinstance(text, str) and bool(text.strip())).to_numpy()
+        scores[empty] = np.nan
+        return scores
+
+    def save(self, path=DISTILLED_MODEL):
+        np.savez_compressed(path, bits=self.bits, alpha=self.alpha, mean=self.mean, scale=self.scale,
+                            intercept=self.intercept, coef=self.coef, features=np.array(LEXICON_FEATURES))
+
+    @classmethod
+    def load(cls, path=DISTILLED_MODEL):
+        if not os.path.exists(path):
+            raise SystemExit(f"❌ No distilled model at {path}, run python script/distill.py first")
+        saved = np.load(path)
+        if saved['features'].tolist() != LEXICON_FEATURES:
+            raise SystemExit(f"❌ {path} was trained on other lexicon features, retrain it")
+        model = cls(int(saved['bits']), float(saved['alpha']))
+        model.mean, model.scale, model.coef = saved['mean'], saved['scale'], saved['coef']
+        model.intercept = float(saved['intercept'])
+        return model
+
+
+def teacher_labels(path=REJECTION_ANALYSIS_EXTENDED):
+    """Rows with a real RoBERTa score: one per template source, none predicted by --cascade"""
+    if not os.path.exists(path):
+        raise SystemExit(f"❌ {path} not found, run script/02_compare_models.py first")
+    df = pd.read_csv(path)
+    if 'template_source_row' in df:
+        df = df[df['template_source_row'] == df.index]
+    if 'transformer_escalated' in df:
+        df = df[df['transformer_escalated'].astype(bool)]
+    return df[df['hf_roberta_score'].notna()].reset_index(drop=True)
+
+
+def report(name, stats):
+    print(f"{name:<16} {stats['rows']:>6} {stats['mae']:>7.3f} {stats['within_0.1']:>8.1%} "
+          f"{stats['same_sign']:>7.1%} {stats['pearson']:>7.3f}")
+
+
+def train(args):
+    df = teacher_labels(args.labels)
+    if len(df) < 10:
+        raise SystemExit(f"❌ Only {len(df)} RoBERTa-scored emails in {args.labels}; score a larger corpus first")
+    y = df['hf_roberta_score'].to_numpy(float)
+    test = np.zeros(len(df), dtype=bool)
+    test[np.random.default_rng(args.seed).choice(len(df), max(1, int(len(df) * args.holdout)), replace=False)] = True
+    print(f"✅ {len(df)} teacher-labelled emails: {(~test).sum()} to train on, {test.sum()} held out")
+
+    start = time.perf_counter()
+    model = DistilledModel(args.bits, args.alpha).fit(df[~test], y[~test])
+    print(f"✅ Trained in {time.perf_counter() - start:.1f}s "
+          f"({np.count_nonzero(model.coef)} nonzero of {len(model.coef)} weights)")
+
+    start = time.perf_counter()
+    predicted = model.predict(df[test])
+    seconds = time.perf_counter() - start
+    baseline = LexiconProxy().fit(df.loc[~test, LEXICON_FEATURES].fillna(0).to_numpy(float), y[~test])
+
+    print(f"\n📊 FIDELITY TO ROBERTA (held-out emails):")
+    print(f"{'Model':<16} {'n':>6} {'MAE':>7} {'|Δ|≤0.1':>8} {'sign':>7} {'r':>7}")
+    report('distilled', agreement(predicted, y[test]))
+    report('lexicon only', agreement(baseline.predict(df.loc[test, LEXICON_FEATURES].fillna(0).to_numpy(float)),
+                                     y[test]))
+    print(f"\n⚡ {test.sum() / seconds:,.0f} emails/s ({test.sum()} emails in {seconds * 1000:.0f} ms, one process, "
+          f"from 01's lexicon features)")
+
+    # The shipped model learns from every labelled email
+    model = DistilledModel(args.bits, args.alpha).fit(df, y)
+    model.save(args.model)
+    print(f"✅ Saved to {args.model}")
+
+
+def score(args):
+    model = DistilledModel.load(args.model)
+    if not os.path.exists(args.input):
+        raise SystemExit(f"❌ {args.input} not found, run script/01_extract_features.py first")
+    df = pd.read_csv(args.input)
+    start = time.perf_counter()
+    scores = model.predict(df)
+    seconds = time.perf_counter() - start
+    pd.DataFrame({'company_id': df['company_id'], 'distilled_roberta_score': scores}).to_csv(args.out, index=False)
+    print(f"⚡ Scored {len(df):,} emails in {seconds:.2f}s ({len(df) / seconds:,.0f} emails/s)")
+    print(f"✅ Saved to {args.out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--score', action='store_true', help='score --input with the saved model instead of training')
+    parser.add_argument('--labels', default=REJECTION_ANALYSIS_EXTENDED, help='CSV with hf_roberta_score labels')
+    parser.add_argument('--input', default=REJECTION_ANALYSIS, help='--score: CSV with 01 lexicon features')
+    parser.add_argument('--out', default=DISTILLED_SCORES, help='--score: where to write the scores')
+    parser.add_argument('--model', default=DISTILLED_MODEL)
+    parser.add_argument('--bits', type=int, default=HASH_BITS, help='log2 of the hashed n-gram columns')
+    parser.add_argument('--alpha', type=float, default=ALPHA, help='ridge penalty')
+    parser.add_argument('--holdout', type=float, default=HOLDOUT, help='share of emails held out for the report')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.score:
+        score(args)
+    else:
+        train(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""Email embeddings and nearest-neighbour search.
+
+Pools the RoBERTa sentiment encoder's last hidden state (mean over tokens,
+L2-normalized) into one float32 vector per email, stored as a memory-mapped
+.npy matrix. Search is cosine similarity:
+
+    EmbeddingIndex   exact, vectorized brute force (small corpora)
+    IVFIndex         approximate inverted-file index for large corpora:
+                     k-means lists, only the nearest --nprobe lists scanned
+
+Usage:
+    python script/embeddings.py                      # embed data/email.json
+    python script/embeddings.py --benchmark 1000000  # latency on synthetic vectors
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from features import SECTIONS
+from inference import client
+from paths import EMAILS, EMBEDDING_IDS, EMBEDDINGS, EMBEDDINGS_IVF
+
+MODEL_NAME = "cardiffnlp/twitter-roberta-base-sentiment-latest"
+DIM = 768
+IVF_MIN_ROWS = 50_000
+CHUNK_ROWS = 65_536
+EMBED_ROWS = 1_024  # texts per embed call while building the corpus matrix
+
+
+def load_encoder(model_name=MODEL_NAME):
+    """Tokenizer and model; torch is only needed when embedding text"""
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+    model.eval()
+    return tokenizer, model
+
+
+def embed(texts, tokenizer, model, batch_size=16):
+    """Mean-pooled, L2-normalized last hidden states, shape (len(texts), DIM)"""
+    import torch
+    from token_cache import token_cache
+    out = np.zeros((len(texts), DIM), dtype=np.float32)
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        inputs = token_cache(tokenizer).batch(batch, max_length=512)
+        with torch.no_grad():
+            hidden = model(**inputs, output_hidden_states=True).hidden_states[-1]
+        mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1)
+        out[start:start + len(batch)] = pooled.numpy()
+    return normalize_rows(out)
+
+
+def normalize_rows(vectors):
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def _top_k(scores, ids, k, best_scores, best_ids):
+    """Merge a block of scores into the running top k"""
+    scores = np.concatenate([best_scores, scores])
+    ids = np.concatenate([best_ids, ids])
+    if len(scores) > k:
+        keep = np.argpartition(-scores, k - 1)[:k]
+        scores, ids = scores[keep], ids[keep]
+    return scores, ids
+
+
+def _sorted(scores, ids):
+    order = np.argsort(-scores, kind='stable')
+    return ids[order], scores[order]
+
+
+class EmbeddingIndex:
+    """Exact cosine search over an (n, dim) matrix, scanned in chunks"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+
+    def search(self, query, k=5):
+        """(row ids, similarities) of the k nearest rows, best first"""
+        query = np.asarray(query, dtype=np.float32)
+        best_scores, best_ids = np.empty(0, np.float32), np.empty(0, np.int64)
+        for start in range(0, len(self.vectors), CHUNK_ROWS):
+            scores = self.vectors[start:start + CHUNK_ROWS] @ query
+            ids = np.arange(start, start + len(scores))
+            best_scores, best_ids = _top_k(scores, ids, k, best_scores, best_ids)
+        return _sorted(best_scores, best_ids)
+
+
+def _list_vectors_path(path):
+    """The IVF index's reordered vectors live next to its .npz"""
+    return path[:-len('.npz')] + '_vectors.npy'
+
+
+class IVFIndex:
+    """Approximate cosine search: k-means lists, probe the nearest few.
+
+    Vectors are stored reordered by list so each probed list is one
+    contiguous slice of the memory map.
+    """
+
+    def __init__(self, centroids, offsets, order, vectors, nprobe=16):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.order = order
+        self.vectors = vectors
+        self.nprobe = nprobe
+
+    @classmethod
+    def build(cls, vectors, path, n_lists=None, sample=50_000, iterations=10, seed=0):
+        """Train lists on a sample, assign every row and write the reordered vectors"""
+        n = len(vectors)
+        n_lists = n_lists or max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(seed)
+        train = np.asarray(vectors[np.sort(rng.choice(n, min(n, sample), replace=False))])
+        centroids = train[rng.choice(len(train), n_lists, replace=False)].copy()
+
+        # Spherical k-means on the sample
+        for _ in range(iterations):
+            assign = np.argmax(train @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, train)
+            empty = np.bincount(assign, minlength=n_lists) == 0
+            sums[empty] = centroids[empty]
+            centroids = normalize_rows(sums)
+
+        assign = np.concatenate([np.argmax(vectors[s:s + CHUNK_ROWS] @ centroids.T, axis=1)
+                                 for s in range(0, n, CHUNK_ROWS)])
+        order = np.argsort(assign, kind='stable')
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))])
+
+        reordered = np.lib.format.open_memmap(_list_vectors_path(path), mode='w+', dtype=np.float32,
+                                              shape=vectors.shape)
+        for s in range(0, n, CHUNK_ROWS):
+            reordered[s:s + CHUNK_ROWS] = vectors[order[s:s + CHUNK_ROWS]]
+        reordered.flush()
+        np.savez(path, centroids=centroids, offsets=offsets, order=order)
+        return cls.load(path)
+
+    @classmethod
+    def load(cls, path, nprobe=16):
+        data = np.load(path)
+        vectors = np.load(_list_vectors_path(path), mmap_mode='r')
+        return cls(data['centroids'], data['offsets'], data['order'], vectors, nprobe)
+
+    def search(self, query, k=5):
+        """(row ids, similarities) of the approximate k nearest rows, best first"""
+        query = np.asarray(query, dtype=np.float32)
+        probe = np.argpartition(-(self.centroids @ query), min(self.nprobe, len(self.centroids)) - 1)[:self.nprobe]
+        best_scores, best_ids = np.empty(0, np.float32), np.empty(0, np.int64)
+        for lst in probe:
+            start, end = self.offsets[lst], self.offsets[lst + 1]
+            if start == end:
+                continue
+            scores = self.vectors[start:end] @ query
+            best_scores, best_ids = _top_k(scores, self.order[start:end], k, best_scores, best_ids)
+        return _sorted(best_scores, best_ids)
+
+
+def open_index(vectors_path=EMBEDDINGS, ivf_path=EMBEDDINGS_IVF):
+    """The IVF index when one has been built, otherwise exact search"""
+    if os.path.exists(ivf_path):
+        return IVFIndex.load(ivf_path)
+    return EmbeddingIndex(np.load(vectors_path, mmap_mode='r'))
+
+
+def build_corpus_embeddings():
+    """Embed every email with text; row order is saved next to the matrix"""
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    emails = [email for key, _ in SECTIONS for email in data.get(key, []) if email.get('email_text')]
+
+    vectors = np.lib.format.open_memmap(EMBEDDINGS, mode='w+', dtype=np.float32, shape=(len(emails), DIM))
+    # Fixed-size chunks: neither the request nor the daemon's reply holds the whole corpus
+    for s in range(0, len(emails), EMBED_ROWS):
+        vectors[s:s + EMBED_ROWS] = client.embed([email['email_text'] for email in emails[s:s + EMBED_ROWS]])
+    vectors.flush()
+    pd.DataFrame({'company_id': [email['company_id'] for email in emails]}).to_csv(EMBEDDING_IDS, index=False)
+    print(f"✅ Saved {len(emails)} x {DIM} embeddings to {EMBEDDINGS}")
+
+    if len(emails) >= IVF_MIN_ROWS:
+        IVFIndex.build(vectors, EMBEDDINGS_IVF)
+        print(f"✅ Built IVF index at {EMBEDDINGS_IVF}")
+    elif os.path.exists(EMBEDDINGS_IVF):
+        os.remove(EMBEDDINGS_IVF)
+        os.remove(_list_vectors_path(EMBEDDINGS_IVF))
+
+
+def benchmark(rows, queries=200, k=10, templates=5_000, seed=0):
+    """Query latency and recall on synthetic template-like vectors"""
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        vectors = np.lib.format.open_memmap(os.path.join(tmp, 'vectors.npy'), mode='w+',
+                                            dtype=np.float32, shape=(rows, DIM))
+        centers = normalize_rows(rng.standard_normal((templates, DIM)).astype(np.float32))
+        for s in range(0, rows, CHUNK_ROWS):
+            n = min(CHUNK_ROWS, rows - s)
+            noise = 0.3 * rng.standard_normal((n, DIM)).astype(np.float32) / np.sqrt(DIM)
+            vectors[s:s + n] = normalize_rows(centers[rng.integers(0, templates, n)] + noise)
+        vectors.flush()
+        qs = normalize_rows(vectors[rng.integers(0, rows, queries)]
+                            + 0.3 * rng.standard_normal((queries, DIM)).astype(np.float32) / np.sqrt(DIM))
+
+        start = time.perf_counter()
+        ivf = IVFIndex.build(vectors, os.path.join(tmp, 'ivf.npz'))
+        build_seconds = time.perf_counter() - start
+        exact = EmbeddingIndex(vectors)
+
+        results = {}
+        for name, index in (('ivf', ivf), ('exact', exact)):
+            for q in qs[:20]:
+                index.search(q, k)  # warm the page cache
+            latencies, found = [], []
+            for q in qs:
+                start = time.perf_counter()
+                ids, _ = index.search(q, k)
+                latencies.append((time.perf_counter() - start) * 1000)
+                found.append(ids)
+            results[name] = (np.array(latencies), found)
+
+        recall = np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(results['exact'][1], results['ivf'][1])])
+        print(f"📊 Nearest-neighbour search over {rows:,} x {DIM} float32 "
+              f"({len(ivf.centroids)} lists, nprobe {ivf.nprobe}, IVF build {build_seconds:.1f}s)")
+        print(f"{'index':<8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        print("-" * 36)
+        for name, (lat, _) in results.items():
+            p50, p95, p99 = np.percentile(lat, [50, 95, 99])
+            print(f"{name:<8} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+        print(f"\n✅ IVF recall@{k} vs exact: {recall:.3f}")
+        del ivf, exact, vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--benchmark', type=int, metavar='ROWS', help='benchmark search on synthetic vectors')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        benchmark(args.benchmark)
+    else:
+        build_corpus_embeddings()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,303 @@
+"""Compact, array-backed feature store for the extraction scripts.
+
+Features live in preallocated typed NumPy columns (int16/int32 counts,
+float32 scores, bool flags, categorical status) that the extractor fills in
+place, and `to_frame` wraps them in a DataFrame without copying.
+
+Usage:
+    python script/features.py --rows 1000000   # memory report vs dict-per-email
+"""
+import argparse
+import json
+import os
+import re
+import time
+import tracemalloc
+import urllib.request
+
+import numpy as np
+import pandas as pd
+from afinn import Afinn
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from doc_term import DocTermMatrix
+from memory import MemoryStage
+from paths import EMAILS, NRC_LEXICON
+from polarity import polarity
+from readability import readability
+from sentence_scoring import SentenceScorer
+
+vader = SentimentIntensityAnalyzer()
+vader_scorer = SentenceScorer(vader)  # exact VADER, sentence valences memoized across emails
+afinn = Afinn()
+
+# Manual keywords
+empathy_keywords = ['thank', 'appreciate', 'grateful', 'hope', 'wish', 'impressed']
+apology_keywords = ['sorry', 'apologies', 'apologize', 'unfortunately', 'regret', 'regrettably']
+future_keywords = ['future', 'again', 'next', 'keep in touch', 'stay connected', 'opportunities']
+personal_pronouns = ['you', 'your', 'yours', "you're", "you've"]
+feedback_keywords = ['because', 'reason', 'based on', 'not convinced', 'stronger', 'more closely']
+
+# Input sections of email.json and the status each one gets
+SECTIONS = [
+    ('rejection_emails', 'rejection'),
+    ('feedback_rejection', 'rejection_with_feedback'),
+    ('ghosted_applications', 'ghosted'),
+]
+STATUSES = [status for _, status in SECTIONS]
+
+FEATURE_COLUMNS = [
+    ('email_length', np.int32),
+    ('word_count', np.int32),
+    ('sentence_count', np.int16),
+    ('vader_compound', np.float32),
+    ('textblob_polarity', np.float64),  # float32 would drift ~1e-8 from TextBlob
+    ('afinn_score', np.float32),
+    ('afinn_positive_count', np.int16),
+    ('afinn_negative_count', np.int16),
+    ('empathy_words', np.int16),
+    ('apology_words', np.int16),
+    ('personal_pronouns', np.int16),
+    ('pronoun_density', np.float32),
+    ('empathy_density', np.float32),
+    ('mentions_future', np.bool_),
+    ('contains_feedback', np.bool_),
+    # float32 would drift ~5e-6 from textstat
+    ('flesch_reading', np.float64),
+    ('flesch_kincaid_grade', np.float64),
+    ('gunning_fog', np.float64),
+    ('smog_index', np.float64),
+]
+NRC_URL = "https://raw.githubusercontent.com/dinbav/LeXmo/master/NRC-Emotion-Lexicon-Wordlevel-v0.92.txt"
+EMOTIONS = ['joy', 'trust', 'anticipation', 'sadness', 'fear', 'anger', 'disgust', 'surprise', 'positive', 'negative']
+EMOTION_COLUMNS = [(f'emotion_{emotion}', np.int16) for emotion in EMOTIONS]
+
+# Scores that are missing (rather than zero) for an empty email
+MISSING_WHEN_EMPTY = ('vader_compound', 'textblob_polarity', 'flesch_reading', 'flesch_kincaid_grade',
+                      'gunning_fog', 'smog_index')
+
+
+class FeatureStore:
+    """Preallocated feature columns for n emails, filled one row at a time"""
+
+    def __init__(self, n, nrc_dict=None):
+        self.n = n
+        self.nrc_dict = nrc_dict
+        self.schema = FEATURE_COLUMNS + (EMOTION_COLUMNS if nrc_dict is not None else [])
+        self.columns = {name: np.zeros(n, dtype=dtype) for name, dtype in self.schema}
+        self.status = np.zeros(n, dtype=np.int8)
+
+    def fill(self, i, text, status='rejection'):
+        """Per-email scores for row i; the word-count features come from fill_counts"""
+        c = self.columns
+        self.status[i] = STATUSES.index(status)
+        if not text or text.strip() == "":
+            for name, _ in self.schema:
+                c[name][i] = np.nan if name in MISSING_WHEN_EMPTY else 0
+            return
+
+        text_lower = text.lower()
+
+        # Sentiment scores
+        c['vader_compound'][i] = vader_scorer.compound(text)
+        c['textblob_polarity'][i] = polarity(text)
+
+        # Structural features
+        c['mentions_future'][i] = any(keyword in text_lower for keyword in future_keywords)
+        c['contains_feedback'][i] = any(keyword in text_lower for keyword in feedback_keywords)
+        c['email_length'][i] = len(text)
+        c['sentence_count'][i] = len(re.split(r'[.!?]+', text))
+
+        # Readability
+        for name, value in readability.scores(text).items():
+            c[name][i] = value
+
+    def fill_counts(self, start, dtm):
+        """Word-count features for rows start.. from the doc-term matrix of their texts.
+
+        Every lexicon is one weight per vocabulary word, so AFINN, the
+        keyword lists and the NRC emotions all come out of one product.
+        """
+        c = self.columns
+        rows = slice(start, start + len(dtm))
+        afinn_weights = dtm.weights(afinn.score)
+        lexicons = {
+            'afinn_score': afinn_weights,
+            'afinn_positive_count': afinn_weights > 0,
+            'afinn_negative_count': afinn_weights < 0,
+            'empathy_words': dtm.membership(empathy_keywords),
+            'apology_words': dtm.membership(apology_keywords),
+            'personal_pronouns': dtm.membership(personal_pronouns),
+        }
+        if self.nrc_dict is not None:
+            emotion_index = {emotion: j for j, emotion in enumerate(EMOTIONS)}
+            nrc = np.zeros((len(dtm.vocab), len(EMOTIONS)))
+            for k, word in enumerate(dtm.vocab):
+                for emotion in self.nrc_dict.get(word, ()):
+                    if emotion in emotion_index:
+                        nrc[k, emotion_index[emotion]] += 1
+            for emotion, j in emotion_index.items():
+                lexicons[f'emotion_{emotion}'] = nrc[:, j]
+
+        names = list(lexicons)
+        totals = dtm.apply(np.column_stack(list(lexicons.values())))
+        for j, name in enumerate(names):
+            c[name][rows] = totals[:, j]
+
+        # Densities
+        word_count = dtm.lengths
+        c['word_count'][rows] = word_count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, count in (('pronoun_density', 'personal_pronouns'), ('empathy_density', 'empathy_words')):
+                c[name][rows] = np.where(word_count > 0, totals[:, names.index(count)] / word_count, 0)
+
+    def fill_many(self, start, texts, statuses=None):
+        """Fill consecutive rows from start: scores per email, then counts in one pass"""
+        for k, text in enumerate(texts):
+            self.fill(start + k, text, statuses[k] if statuses is not None else 'rejection')
+        self.fill_counts(start, DocTermMatrix(texts))
+
+    def row(self, i):
+        """Feature values of row i as a plain dict (e.g. to send between processes)"""
+        return {name: column[i].item() for name, column in self.columns.items()}
+
+    def set_row(self, i, values):
+        for name, value in values.items():
+            self.columns[name][i] = value
+
+    def status_column(self):
+        return pd.Categorical.from_codes(self.status, categories=STATUSES)
+
+    def to_frame(self, meta=None, column_order=None):
+        """DataFrame over the feature arrays (no copy), plus optional metadata columns"""
+        columns = dict(meta or {})
+        columns.update(self.columns)
+        columns['status'] = self.status_column()
+        if column_order is not None:
+            columns = {name: columns[name] for name in column_order}
+        return pd.DataFrame(columns, copy=False)
+
+
+def load_nrc(path=NRC_LEXICON):
+    """NRC Emotion Lexicon as {word: [emotions]}, downloaded on first use"""
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        urllib.request.urlretrieve(NRC_URL, path + '.tmp')
+        os.replace(path + '.tmp', path)
+    nrc = pd.read_csv(path, sep='\t', names=['word', 'emotion', 'score'])
+    nrc = nrc[nrc['score'] == 1][['word', 'emotion']]
+
+    nrc_dict = {}
+    for word, emotion in nrc.values:
+        if word not in nrc_dict:
+            nrc_dict[word] = []
+        nrc_dict[word].append(emotion)
+    return nrc_dict
+
+
+def load_emails(data):
+    """(email, status) pairs in section order"""
+    return [(email, status) for key, status in SECTIONS for email in data.get(key, [])]
+
+
+def assemble_frame(store, emails):
+    """DataFrame of the input emails plus their features.
+
+    Columns come out in the same order the dict-per-email loops produced:
+    input keys first, then features, then status.
+    """
+    with MemoryStage('frame.assemble'):
+        feature_names = [name for name, _ in store.schema]
+        order = {}
+        for email, _ in emails:
+            for name in list(email) + feature_names + ['status']:
+                order.setdefault(name, None)
+        meta = {name: np.array([email.get(name, np.nan) for email, _ in emails], dtype=object)
+                for name in order if name not in store.columns and name != 'status'}
+        return store.to_frame(meta, list(order))
+
+
+def build_features(data, nrc_dict=None):
+    """Feature DataFrame for every email in email.json, in section order"""
+    emails = load_emails(data)
+    with MemoryStage('features.extract'):
+        store = FeatureStore(len(emails), nrc_dict)
+        store.fill_many(0, [email.get('email_text') for email, _ in emails], [status for _, status in emails])
+        readability.save()
+    return assemble_frame(store, emails), store
+
+
+# Worker-side state for extract_rows, set once per process by init_worker
+_worker_nrc_dict = None
+
+
+def init_worker(nrc_dict=None):
+    global _worker_nrc_dict
+    _worker_nrc_dict = nrc_dict
+
+
+def extract_rows(texts):
+    """Feature rows for a batch of texts (runs in thread or process workers)"""
+    store = FeatureStore(len(texts), _worker_nrc_dict)
+    store.fill_many(0, texts)
+    return [store.row(i) for i in range(len(texts))]
+
+
+def memory_report(rows, data):
+    """Compare dict-per-email records + DataFrame against the feature store"""
+    df, store = build_features(data)
+    feature_names = [name for name, _ in store.schema] + ['status']
+    records = df.astype(object).where(df.notna(), None).to_dict('records')
+    reps = -(-rows // len(records))
+
+    # Current path: one dict per email, then pandas infers the dtypes
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows_as_dicts = [dict(records[i % len(records)]) for i in range(rows)]
+    old_df = pd.DataFrame(rows_as_dicts)
+    old_seconds = time.perf_counter() - start
+    _, old_peak = tracemalloc.get_traced_memory()
+    old_features = old_df[feature_names].memory_usage(deep=True, index=False).sum()
+    del rows_as_dicts, old_df
+    tracemalloc.stop()
+
+    # Feature store: typed columns filled in place
+    tracemalloc.start()
+    start = time.perf_counter()
+    big = FeatureStore(rows)
+    for name, column in big.columns.items():
+        column[:] = np.tile(store.columns[name], reps)[:rows]
+    big.status[:] = np.tile(store.status, reps)[:rows]
+    new_df = big.to_frame()
+    new_seconds = time.perf_counter() - start
+    _, new_peak = tracemalloc.get_traced_memory()
+    new_features = new_df.memory_usage(deep=True, index=False).sum()
+    shared = all(np.shares_memory(new_df[name].to_numpy(), column) for name, column in big.columns.items())
+    tracemalloc.stop()
+
+    mb = 1024 * 1024
+    print(f"📊 Feature memory for {rows:,} emails ({len(feature_names)} feature columns)")
+    print(f"{'':<24} {'columns MB':>11} {'peak MB':>9} {'seconds':>8}")
+    print("-" * 56)
+    print(f"{'dict per email':<24} {old_features / mb:>11.1f} {old_peak / mb:>9.1f} {old_seconds:>8.2f}")
+    print(f"{'feature store':<24} {new_features / mb:>11.1f} {new_peak / mb:>9.1f} {new_seconds:>8.2f}")
+    print("-" * 56)
+    print(f"✅ {old_features / new_features:.1f}x smaller columns, {old_peak / new_peak:.1f}x lower peak; "
+          f"DataFrame shares the store's arrays: {shared}")
+    print("\nDtypes:")
+    print(pd.DataFrame({'dict per email': pd.DataFrame(records)[feature_names].dtypes.astype(str),
+                        'feature store': new_df.dtypes.astype(str)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=1_000_000, help='emails to simulate by repeating the corpus')
+    args = parser.parse_args()
+
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    memory_report(args.rows, data)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+"""Rebuild the charts in visualizations/ from the notebooks, only where inputs changed.
+
+Usage:
+    python script/figures.py                       # render every out-of-date figure
+    python script/figures.py three_factor_analysis # render one figure (by its first PNG's name)
+    python script/figures.py --force --jobs 8      # render everything on 8 processes
+    python script/figures.py --list                # figures, their cells and inputs
+
+Each figure is a task: the notebook code cells that draw it, the data files
+those cells read, and the PNGs they save. A task's fingerprint hashes its
+cells' source and its input files. It is rendered again only when that
+changed since its last render or a PNG is missing. Tasks run on a process
+pool, and each one's render time is printed.
+
+The cells run as they are written in the notebooks, with visualizations/ as
+the working directory, so their '../data/...' paths and bare PNG names both
+resolve. `setup` replaces the earlier notebook cells a figure relies on
+(mostly loading `df`), so that no other figure is redrawn along the way.
+Needs matplotlib and seaborn, like the notebooks.
+"""
+import argparse
+import contextlib
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import time
+import traceback
+import warnings
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import dataclass
+
+import paths
+from pipeline import ROOT, file_digest
+
+VIS_DIR = os.path.join(ROOT, 'visualizations')
+STATE_FILE = os.path.join(paths.PIPELINE_DIR, 'figures.json')
+
+# What the notebooks' kernels had imported before the figure cells ran
+PREAMBLE = """\
+import json
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+"""
+LOAD_FEATURES = "df = pd.read_csv('../data/rejection_analysis.csv')\n"
+LOAD_EXTENDED = "df = pd.read_csv('../data/rejection_analysis_extended.csv')\n"
+
+
+@dataclass
+class Figure:
+    outputs: list   # PNGs, relative to visualizations/
+    notebook: str
+    cells: list     # code cells to run, by index in the notebook
+    inputs: list    # data files the cells read, relative to the repo root
+    setup: str = ''
+
+    @property
+    def name(self):
+        return os.path.splitext(self.outputs[0])[0]
+
+
+FIGURES = [
+    Figure(['sentiment_paradox.png'], '02_data_analysis', [0], ['data/rejection_analysis.csv']),
+    Figure(['correlation_heatmap.png'], '02_data_analysis', [7], ['data/rejection_analysis.csv'], LOAD_FEATURES),
+    Figure(['correlation_heatmap_clean.png'], '02_data_analysis', [8], ['data/rejection_analysis.csv'],
+           LOAD_FEATURES),
+    Figure(['three_factor_analysis.png'], '02_data_analysis', [9], ['data/rejection_analysis.csv'], LOAD_FEATURES),
+    Figure(['compensation_effect_final.png'], '02_data_analysis', [10], ['data/rejection_analysis.csv'],
+           LOAD_FEATURES),
+    # Cell 6 drew an earlier version of this chart to the same file; cell 12 is the one kept
+    Figure(['positive_word_gradient.png'], '02_data_analysis', [12], ['data/rejection_analysis.csv'],
+           LOAD_FEATURES),
+    Figure(['pairplot_sentiment.png'], '02_data_analysis', [13], ['data/rejection_analysis.csv'], LOAD_FEATURES),
+    Figure(['pairplot_annotated.png'], '02_data_analysis', [14], ['data/rejection_analysis.csv'], LOAD_FEATURES),
+    Figure(['emotion_heatmap.png', 'emotion_comparison.png'], '03_NRC_emotion_analysis', [2, 3],
+           ['data/rejection_analysis_with_emotions.csv']),
+    Figure(['4_to_1_threshold_analysis.png'], '04_calculate_positive_ratio', [9],
+           ['data/rejection_analysis_extended.csv'], LOAD_EXTENDED),
+    Figure(['emotion_sentiment_heatmap.png'], '05_compare_extened', [1, 2], ['data/rejection_analysis_extended.csv']),
+    Figure(['sentiment_pairplot.png'], '05_compare_extened', [1, 4], ['data/rejection_analysis_extended.csv']),
+    Figure(['future_vs_gratitude.png'], '05_compare_extened', [1, 8], ['data/rejection_analysis_extended.csv']),
+    Figure(['lexicon_vs_transformer.png'], '05_compare_extened', [1, 9], ['data/rejection_analysis_extended.csv']),
+    Figure(['shap_word_importance_4panel.png', 'shap_balance_chart.png', 'shap_heatmap.png',
+            'shap_net_impact_correlation.png'], '05_compare_extened', [1, 11],
+           ['data/shap_results.json', 'data/shap_word_attributions.csv', 'data/shap_summary.csv']),
+    # In the notebook this runs after cell 11 has set the style
+    Figure(['shap_worst_words_across_all.png'], '05_compare_extened', [12], ['data/shap_results_all.json'],
+           "plt.style.use('seaborn-v0_8-darkgrid')\nsns.set_palette('husl')\n"),
+]
+
+
+def cell_sources(figure):
+    """Source of the figure's cells, without IPython magics"""
+    with open(os.path.join(ROOT, 'notebooks', f'{figure.notebook}.ipynb')) as f:
+        cells = json.load(f)['cells']
+    sources = []
+    for i in figure.cells:
+        if cells[i]['cell_type'] != 'code':
+            raise SystemExit(f"❌ {figure.name}: cell {i} of {figure.notebook} is not a code cell")
+        lines = ''.join(cells[i]['source']).splitlines()
+        sources.append('\n'.join(line for line in lines if not line.lstrip().startswith(('%', '!'))))
+    return sources
+
+
+def fingerprint(figure, sources):
+    """Hash of the figure's code and input files"""
+    h = hashlib.sha256()
+    h.update(PREAMBLE.encode())
+    h.update(figure.setup.encode())
+    for source in sources:
+        h.update(source.encode() + b'\0')
+    for path in sorted(figure.inputs):
+        h.update(f'{path}:{file_digest(path)}\n'.encode())
+    return h.hexdigest()
+
+
+def load_state():
+    if os.path.exists(STATE_FILE):
+        with open(STATE_FILE) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_FILE), exist_ok=True)
+    tmp = STATE_FILE + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, STATE_FILE)
+
+
+def init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    # Imported once per worker, so the timings are rendering only
+    import matplotlib.pyplot
+    import seaborn
+    os.chdir(VIS_DIR)
+
+
+def render(name, code):
+    """Run one figure's code in a fresh namespace; returns seconds spent"""
+    import matplotlib
+    import matplotlib.pyplot as plt
+    # Workers are reused, so start every figure from matplotlib's defaults
+    plt.close('all')
+    matplotlib.rcdefaults()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        exec(compile(code, f'<figure {name}>', 'exec'), {'__name__': '__figure__'})
+    plt.close('all')
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('figures', nargs='*', help='figures to bring up to date (default: all)')
+    parser.add_argument('--force', action='store_true', help='render figures even if up to date')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help='figures to render concurrently')
+    parser.add_argument('--dry-run', action='store_true', help='show what would render without rendering it')
+    parser.add_argument('--list', action='store_true', help='list figures with their cells and inputs')
+    args = parser.parse_args()
+
+    by_name = {figure.name: figure for figure in FIGURES}
+    unknown = [name for name in args.figures if name not in by_name]
+    if unknown:
+        raise SystemExit(f"❌ Unknown figure(s): {', '.join(unknown)}. Known: {', '.join(by_name)}")
+    selected = [by_name[name] for name in args.figures] if args.figures else FIGURES
+
+    if args.list:
+        for figure in selected:
+            print(f"{figure.name:<30} {figure.notebook} cells {figure.cells}  inputs: {', '.join(figure.inputs)}")
+        return
+
+    state = load_state()
+    todo = []
+    for figure in selected:
+        missing = [path for path in figure.inputs if not os.path.exists(os.path.join(ROOT, path))]
+        if missing:
+            print(f"❌ {figure.name}: missing input {', '.join(missing)}")
+            continue
+        sources = cell_sources(figure)
+        fp = fingerprint(figure, sources)
+        outputs_exist = all(os.path.exists(os.path.join(VIS_DIR, path)) for path in figure.outputs)
+        if not args.force and outputs_exist and state.get(figure.name) == fp:
+            print(f"⏭️  {figure.name}: up to date")
+            continue
+        todo.append((figure, fp, PREAMBLE + figure.setup + '\n'.join(sources)))
+
+    if args.dry_run or not todo:
+        for figure, _, _ in todo:
+            print(f"🔄 {figure.name}: would render {', '.join(figure.outputs)}")
+        return
+    if importlib.util.find_spec('matplotlib') is None or importlib.util.find_spec('seaborn') is None:
+        raise SystemExit("❌ Rendering figures needs matplotlib and seaborn: pip install matplotlib seaborn")
+
+    jobs = max(1, min(args.jobs, len(todo)))
+    print(f"🎨 Rendering {len(todo)} figure(s) on {jobs} process(es)...")
+    timings, failed = [], []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=init_worker) as pool:
+        running = {pool.submit(render, figure.name, code): (figure, fp) for figure, fp, code in todo}
+        while running:
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                figure, fp = running.pop(future)
+                try:
+                    seconds = future.result()
+                except Exception as e:
+                    failed.append(figure.name)
+                    print(f"❌ {figure.name}: {type(e).__name__}: {e}")
+                    print(''.join(traceback.format_exception(e)[-3:]).rstrip())
+                    continue
+                timings.append((figure.name, seconds))
+                state[figure.name] = fp
+                save_state(state)
+                print(f"✅ {figure.name:<30} {seconds:>6.2f}s  {', '.join(figure.outputs)}")
+    wall = time.perf_counter() - start
+
+    print(f"\n📊 Rendered {len(timings)} figure(s) in {wall:.1f}s wall, "
+          f"{sum(s for _, s in timings):.1f}s of rendering across {jobs} process(es)")
+    for name, seconds in sorted(timings, key=lambda item: -item[1])[:5]:
+        print(f"   {name:<30} {seconds:>6.2f}s")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Transformer scoring through the local inference daemon, or in-process.
+
+`client.scores('roberta', texts)`, `client.scores('sst2', texts)` and
+`client.embed(texts)` go to script/inference_daemon.py over a Unix socket when
+it is running. The daemon keeps the models resident and batches concurrent
+requests together. When no daemon answers, the client loads the models
+in-process, once, and scores locally with the same functions. It tries the
+daemon again after RETRY_SECONDS.
+
+Messages are a 4-byte length plus a JSON header, optionally followed by one
+binary frame holding a NumPy array (the results).
+"""
+import functools
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+MODELS = {
+    'roberta': 'cardiffnlp/twitter-roberta-base-sentiment-latest',  # [negative, neutral, positive]
+    'sst2': 'distilbert-base-uncased-finetuned-sst-2-english',       # [negative, positive]
+}
+OPS = list(MODELS) + ['embed']
+SOCKET_PATH = os.environ.get('REJECTION_INFERENCE_SOCKET',
+                             os.path.join(tempfile.gettempdir(), f'rejection-inference-{os.getuid()}.sock'))
+BATCH_SIZE = 16
+RETRY_SECONDS = 30.0
+
+_LENGTH = struct.Struct('!I')
+
+
+# Wire format
+def _recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    pos = 0
+    while pos < n:
+        got = sock.recv_into(view[pos:])
+        if not got:
+            raise ConnectionResetError('connection closed')
+        pos += got
+    return buf
+
+
+def _recv_frame(sock):
+    (length,) = _LENGTH.unpack(_recv_exact(sock, _LENGTH.size))
+    return _recv_exact(sock, length)
+
+
+def send_message(sock, header, array=None):
+    """Send a JSON header and, if given, one array as a second frame"""
+    if array is not None:
+        array = np.ascontiguousarray(array)
+        header = dict(header, dtype=array.dtype.str, shape=list(array.shape))
+    body = json.dumps(header).encode('utf-8')
+    frames = [_LENGTH.pack(len(body)), body]
+    if array is not None:
+        data = array.tobytes()
+        frames += [_LENGTH.pack(len(data)), data]
+    sock.sendall(b''.join(frames))
+
+
+def recv_message(sock):
+    """(header, array or None)"""
+    header = json.loads(_recv_frame(sock))
+    if 'dtype' not in header:
+        return header, None
+    array = np.frombuffer(_recv_frame(sock), dtype=header['dtype']).reshape(header['shape'])
+    return header, array
+
+
+# In-process models
+@functools.lru_cache(maxsize=None)
+def load_model(name):
+    """(tokenizer, model) for 'roberta' or 'sst2', loaded once per process"""
+    from embeddings import load_encoder
+    return load_encoder(MODELS[name])
+
+
+def sentiment_scores(texts, tokenizer, model, batch_size=BATCH_SIZE):
+    """positive - negative per text (NaN for empty ones); both models put those classes first and last"""
+    import torch
+    from token_cache import token_cache
+    scores = np.full(len(texts), np.nan)
+    rows = [i for i, text in enumerate(texts) if text and text.strip()]
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        inputs = token_cache(tokenizer).batch([texts[i] for i in batch], max_length=512)
+        with torch.no_grad():
+            probs = torch.softmax(model(**inputs).logits, dim=1).numpy()
+        scores[batch] = probs[:, -1] - probs[:, 0]
+    return scores
+
+
+def run_local(op, texts, batch_size=BATCH_SIZE):
+    """The op in this process: scores for a model name, or 'embed' vectors"""
+    if op == 'embed':
+        from embeddings import embed
+        return embed(list(texts), *load_model('roberta'), batch_size=batch_size)
+    return sentiment_scores(list(texts), *load_model(op), batch_size=batch_size)
+
+
+class InferenceClient:
+    """Daemon client with in-process fallback; one connection per thread"""
+
+    def __init__(self, socket_path=SOCKET_PATH, timeout=120.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._retry_at = 0.0
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None:
+            if time.monotonic() < self._retry_at:
+                return None
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError:
+                sock.close()
+                self._retry_at = time.monotonic() + RETRY_SECONDS
+                return None
+            self._local.sock = sock
+        return sock
+
+    def _drop(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, header, array_expected=True):
+        """Daemon reply, or None when there is no daemon to ask"""
+        sock = self._connection()
+        if sock is None:
+            return None
+        try:
+            send_message(sock, header)
+            reply, array = recv_message(sock)
+        except OSError:
+            # Daemon went away mid-request: answer this one locally
+            self._drop()
+            self._retry_at = time.monotonic() + RETRY_SECONDS
+            return None
+        if 'error' in reply:
+            raise RuntimeError(f"inference daemon: {reply['error']}")
+        return array if array_expected else reply
+
+    def run(self, op, texts):
+        if op not in OPS:
+            raise ValueError(f"unknown op '{op}', expected one of {OPS}")
+        texts = list(texts)
+        if not texts:
+            from embeddings import DIM
+            return np.zeros((0, DIM), dtype=np.float32) if op == 'embed' else np.zeros(0)
+        result = self._request({'op': op, 'texts': texts})
+        return result if result is not None else run_local(op, texts)
+
+    def scores(self, model, texts):
+        """positive - negative for each text under 'roberta' or 'sst2'"""
+        return self.run(model, texts)
+
+    def embed(self, texts):
+        """Mean-pooled, L2-normalized RoBERTa vectors, shape (len(texts), 768)"""
+        return self.run('embed', texts)
+
+    def ping(self):
+        """The daemon's stats, or None if it isn't running"""
+        return self._request({'op': 'stats'}, array_expected=False)
+
+    def prepare(self, models):
+        """'daemon' if the daemon answers, else load `models` here and return 'in-process'"""
+        if self.ping() is not None:
+            return 'daemon'
+        for name in models:
+            load_model(name)
+        return 'in-process'
+
+
+client = InferenceClient()
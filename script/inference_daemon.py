@@ -0,0 +1,177 @@
+"""Long-lived local inference daemon for the RoBERTa and SST-2 models.
+
+Usage:
+    python script/inference_daemon.py                          # listen on the default socket
+    python script/inference_daemon.py --max-batch 32 --max-wait-ms 10
+
+The models are loaded once and stay resident. Requests from the scripts, the
+app and batch jobs (through inference.client) arrive over a Unix socket, and
+each model's queue is drained into dynamic batches: a batch closes when it
+holds --max-batch texts or --max-wait-ms after its first request arrived.
+Texts are sorted by length inside a batch to keep padding down.
+"""
+import argparse
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from inference import MODELS, OPS, SOCKET_PATH, load_model, recv_message, run_local, send_message
+
+
+class DynamicBatcher:
+    """Coalesce multi-text requests for one op into batches with a max-wait deadline"""
+
+    def __init__(self, op, max_batch=32, max_wait_ms=10.0):
+        self.op = op
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        self.requests = self.texts = self.batches = 0
+        self.busy = 0.0
+        threading.Thread(target=self._run, daemon=True, name=f'batcher-{op}').start()
+
+    def submit(self, texts):
+        future = Future()
+        self.pending.put((texts, future))
+        return future
+
+    def _collect(self):
+        batch = [self.pending.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self.pending.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            texts = [text for request, _ in batch for text in request]
+            # Similar lengths share a forward pass, so there is less padding
+            order = sorted(range(len(texts)), key=lambda i: len(texts[i] or ''))
+            start = time.perf_counter()
+            try:
+                outputs = [run_local(self.op, [texts[i] for i in order[k:k + self.max_batch]], self.max_batch)
+                           for k in range(0, len(order), self.max_batch)]
+                results = np.empty_like(outputs[0], shape=(len(texts),) + outputs[0].shape[1:])
+                results[order] = np.concatenate(outputs)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            self.busy += time.perf_counter() - start
+            self.requests += len(batch)
+            self.texts += len(texts)
+            self.batches += len(outputs)
+            offset = 0
+            for request, future in batch:
+                future.set_result(results[offset:offset + len(request)])
+                offset += len(request)
+
+    def stats(self):
+        return {'requests': self.requests, 'texts': self.texts, 'batches': self.batches,
+                'texts_per_batch': self.texts / self.batches if self.batches else 0.0, 'busy_seconds': self.busy}
+
+
+class InferenceServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(batchers, started):
+    class Handler(socketserver.BaseRequestHandler):
+        def handle(self):
+            # One persistent connection per client thread; serve requests until it closes
+            while True:
+                try:
+                    header, _ = recv_message(self.request)
+                except (ConnectionResetError, ValueError):
+                    return
+                op = header.get('op')
+                try:
+                    if op == 'stats':
+                        send_message(self.request, {'uptime': time.monotonic() - started,
+                                                    'ops': {name: b.stats() for name, b in batchers.items()}})
+                        continue
+                    texts = header.get('texts')
+                    if op not in batchers:
+                        send_message(self.request, {'error': f"unknown op '{op}'"})
+                    elif not isinstance(texts, list) or not all(t is None or isinstance(t, str) for t in texts):
+                        send_message(self.request, {'error': "'texts' must be a list of strings"})
+                    else:
+                        try:
+                            send_message(self.request, {'op': op}, batchers[op].submit(texts).result())
+                        except Exception as e:
+                            send_message(self.request, {'error': f'{type(e).__name__}: {e}'})
+                except OSError:
+                    return
+
+    return Handler
+
+
+def claim_socket(path):
+    """Remove a stale socket file; refuse to start if a daemon already answers on it"""
+    if not os.path.exists(path):
+        return
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.remove(path)
+    else:
+        raise SystemExit(f"❌ An inference daemon is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--socket', default=SOCKET_PATH, help='Unix socket path (or REJECTION_INFERENCE_SOCKET)')
+    parser.add_argument('--max-batch', type=int, default=32, help='texts per forward pass')
+    parser.add_argument('--max-wait-ms', type=float, default=10.0, help='how long a batch waits for more requests')
+    parser.add_argument('--torch-threads', type=int, help='PyTorch intra-op threads')
+    args = parser.parse_args()
+
+    if args.torch_threads:
+        import torch
+        torch.set_num_threads(args.torch_threads)
+
+    claim_socket(args.socket)
+    start = time.perf_counter()
+    for name in MODELS:
+        load_model(name)
+    print(f"✅ Loaded {', '.join(MODELS.values())} in {time.perf_counter() - start:.1f}s")
+
+    batchers = {op: DynamicBatcher(op, args.max_batch, args.max_wait_ms) for op in OPS}
+    server = InferenceServer(args.socket, make_handler(batchers, time.monotonic()))
+    os.chmod(args.socket, 0o600)
+    print(f"✅ Inference daemon on {args.socket} (batch ≤{args.max_batch}, wait ≤{args.max_wait_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+        for op, batcher in batchers.items():
+            s = batcher.stats()
+            print(f"📊 {op:<8} {s['requests']:>7} requests, {s['texts']:>8} texts, "
+                  f"{s['texts_per_batch']:.1f} texts/batch")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""Load test for the scoring service (script/serve.py).
+
+Usage:
+    python script/serve.py &
+    python script/load_test.py --url http://127.0.0.1:8765 --endpoint /analyze
+
+Sends real emails from data/email.json (or a synthetic corpus from
+synth_corpus.py, with --corpus) at each concurrency level and reports
+requests/sec and latency percentiles.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+CONCURRENCY_LEVELS = [1, 2, 4, 8, 16, 32, 64]
+
+
+def load_texts(path='data/email.json', limit=None):
+    if not path.endswith('.json'):
+        from synth_corpus import iter_corpus
+        texts = (record['email_text'] for record in iter_corpus(path) if record.get('email_text'))
+        return list(itertools.islice(texts, limit))
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return [email['email_text']
+            for key in ('rejection_emails', 'feedback_rejection', 'ghosted_applications')
+            for email in data.get(key, [])
+            if email.get('email_text')][:limit]
+
+
+def make_bodies(texts, endpoint, batch_size):
+    if endpoint.endswith('/batch'):
+        return [json.dumps({'texts': [texts[(i + j) % len(texts)] for j in range(batch_size)]}).encode('utf-8')
+                for i in range(len(texts))]
+    return [json.dumps({'text': text}).encode('utf-8') for text in texts]
+
+
+def client(host, port, endpoint, bodies, offset, stop_at, latencies, errors):
+    """One keep-alive connection sending requests until stop_at"""
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    i = offset
+    while time.perf_counter() < stop_at:
+        body = bodies[i % len(bodies)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('POST', endpoint, body=body, headers={'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=60)
+            continue
+        latencies.append(time.perf_counter() - start)
+    conn.close()
+
+
+def run_level(host, port, endpoint, bodies, concurrency, duration):
+    latencies, errors = [], []
+    stop_at = time.perf_counter() + duration
+    threads = [threading.Thread(target=client, args=(host, port, endpoint, bodies, i, stop_at, latencies, errors))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    lat_ms = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(lat_ms, [50, 95, 99]) if len(lat_ms) else (np.nan,) * 3
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': len(latencies) / elapsed,
+        'p50_ms': p50,
+        'p95_ms': p95,
+        'p99_ms': p99,
+        'max_ms': lat_ms.max() if len(lat_ms) else np.nan,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--endpoint', default='/analyze',
+                        choices=['/analyze', '/analyze/batch', '/rewrite', '/rewrite/batch'])
+    parser.add_argument('--duration', type=float, default=5.0, help='seconds per concurrency level')
+    parser.add_argument('--batch-size', type=int, default=32, help='texts per request for batch endpoints')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=CONCURRENCY_LEVELS)
+    parser.add_argument('--corpus', default='data/email.json',
+                        help='email.json, or a synthetic JSONL file / shard directory')
+    parser.add_argument('--max-texts', type=int, default=100_000, help='texts to read from --corpus')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    bodies = make_bodies(load_texts(args.corpus, args.max_texts), args.endpoint, args.batch_size)
+
+    # Warm up the worker pool before measuring
+    run_level(url.hostname, url.port, args.endpoint, bodies, 1, 1.0)
+
+    print(f"📊 Load test: {args.url}{args.endpoint} ({args.duration:.0f}s per level)")
+    print(f"{'conc':>5} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    print("-" * 70)
+    for concurrency in args.concurrency:
+        r = run_level(url.hostname, url.port, args.endpoint, bodies, concurrency, args.duration)
+        print(f"{r['concurrency']:>5} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} {r['max_ms']:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,163 @@
+"""Per-stage memory instrumentation with budgets.
+
+`with MemoryStage('models.score'):` records, for the block:
+  - peak RSS, sampled from /proc/self/statm (ru_maxrss where that isn't available)
+  - the Python allocation high-water mark, from tracemalloc
+  - the allocation sites that grew the most over the block
+tracemalloc slows allocation-heavy code, so it only runs when
+REJECTION_TRACE_MEMORY=1 (pipeline.py --trace-memory). Budgets in MB come from
+REJECTION_MEMORY_BUDGETS, e.g. "models.score=3000,features.extract=800". When
+a block's peak RSS goes over its budget, the script exits with an error once
+the block ends.
+"""
+import os
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+
+BUDGETS_ENV = 'REJECTION_MEMORY_BUDGETS'
+TRACE_ENV = 'REJECTION_TRACE_MEMORY'
+SAMPLE_SECONDS = 0.02
+TOP_SITES = 5
+MB = 1024 * 1024
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Finished blocks, in the order they ended
+REPORTS = []
+_open = []
+
+
+def parse_budgets(spec):
+    """{name: MB} from "name=MB,name=MB" """
+    budgets = {}
+    for item in filter(None, (part.strip() for part in (spec or '').split(','))):
+        name, _, mb = item.partition('=')
+        try:
+            budgets[name.strip()] = float(mb)
+        except ValueError:
+            raise SystemExit(f"❌ Bad memory budget '{item}', expected name=MB")
+    return budgets
+
+
+def current_rss():
+    """Resident set size in bytes"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except OSError:
+        return max_rss()
+
+
+def max_rss(who=resource.RUSAGE_SELF):
+    """Lifetime peak RSS in bytes (ru_maxrss is KB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def tracing():
+    return os.environ.get(TRACE_ENV, '') not in ('', '0')
+
+
+def take_snapshot():
+    """Traced allocations, leaving out tracemalloc's own"""
+    return tracemalloc.take_snapshot().filter_traces([tracemalloc.Filter(False, tracemalloc.__file__)])
+
+
+class MemoryStage:
+    """Context manager measuring one block; see the module docstring"""
+
+    def __init__(self, name, budget_mb=None):
+        self.name = name
+        self.budget_mb = budget_mb if budget_mb is not None else parse_budgets(os.environ.get(BUDGETS_ENV)).get(name)
+        self.rss_peak = 0
+        self.py_peak = 0
+
+    def _sample(self):
+        while not self._stop.wait(SAMPLE_SECONDS):
+            self.rss_peak = max(self.rss_peak, current_rss())
+
+    def __enter__(self):
+        self.traced = tracing()
+        if self.traced:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            # Fold the peak so far into the enclosing blocks before resetting it
+            _, peak = tracemalloc.get_traced_memory()
+            for outer in _open:
+                outer.py_peak = max(outer.py_peak, peak)
+            tracemalloc.reset_peak()
+            self._snapshot = take_snapshot()
+        _open.append(self)
+        self.rss_start = self.rss_peak = current_rss()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample, daemon=True, name=f'memory-{self.name}')
+        self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        self._stop.set()
+        self._sampler.join()
+        self.rss_peak = max(self.rss_peak, current_rss())
+        _open.remove(self)
+        sites = []
+        if self.traced:
+            _, peak = tracemalloc.get_traced_memory()
+            self.py_peak = max(self.py_peak, peak)
+            for outer in _open:
+                outer.py_peak = max(outer.py_peak, self.py_peak)
+            growth = take_snapshot().compare_to(self._snapshot, 'lineno')
+            sites = [(str(stat.traceback[0]), stat.size_diff) for stat in growth[:TOP_SITES] if stat.size_diff > 0]
+            self._snapshot = None
+        report = {'name': self.name, 'seconds': seconds, 'rss_start': self.rss_start, 'rss_peak': self.rss_peak,
+                  'py_peak': self.py_peak if self.traced else None, 'sites': sites, 'budget_mb': self.budget_mb}
+        REPORTS.append(report)
+
+        if exc_type is None and self.budget_mb is not None and self.rss_peak > self.budget_mb * MB:
+            print_memory_report([report])
+            raise SystemExit(f"❌ {self.name}: peak RSS {self.rss_peak / MB:,.0f} MB is over its "
+                             f"{self.budget_mb:,.0f} MB budget ({BUDGETS_ENV})")
+        return False
+
+
+def merge_reports(reports):
+    """One row per block name: repeated blocks (e.g. once per template) add their time and keep the peaks"""
+    merged = {}
+    for r in reports:
+        m = merged.get(r['name'])
+        if m is None:
+            merged[r['name']] = dict(r, calls=1)
+            continue
+        m['calls'] += 1
+        m['seconds'] += r['seconds']
+        if r['rss_peak'] > m['rss_peak']:
+            m['rss_peak'] = r['rss_peak']
+        if r['py_peak'] is not None and (m['py_peak'] is None or r['py_peak'] > m['py_peak']):
+            m['py_peak'], m['sites'] = r['py_peak'], r['sites']
+    return list(merged.values())
+
+
+def print_memory_report(reports=None):
+    """Table of the measured blocks, with their top allocation sites when traced"""
+    reports = merge_reports(REPORTS if reports is None else reports)
+    if not reports:
+        return
+    print(f"\n📊 Memory by stage (process peak RSS {max_rss() / MB:,.0f} MB)")
+    print(f"{'Stage':<20} {'calls':>6} {'seconds':>8} {'RSS start':>10} {'RSS peak':>9} {'Python peak':>12} {'budget':>8}")
+    print("-" * 79)
+    for r in reports:
+        py_peak = f"{r['py_peak'] / MB:,.1f}" if r['py_peak'] is not None else '-'
+        budget = f"{r['budget_mb']:,.0f}" if r['budget_mb'] is not None else '-'
+        print(f"{r['name']:<20} {r['calls']:>6} {r['seconds']:>8.2f} {r['rss_start'] / MB:>10,.0f} "
+              f"{r['rss_peak'] / MB:>9,.0f} {py_peak:>12} {budget:>8}")
+    for r in reports:
+        if r['sites']:
+            print(f"\n   Largest allocation growth in {r['name']}:")
+            for site, size in r['sites']:
+                print(f"   {size / MB:>9,.2f} MB  {site}")
+    if not any(r['py_peak'] is not None for r in reports):
+        print(f"   (set {TRACE_ENV}=1 for Python peaks and allocation sites)")
@@ -0,0 +1,56 @@
+"""Data artifact paths shared by the pipeline stages (relative to the repo root)."""
+import os
+
+# REJECTION_DATA_DIR points every stage at another corpus, e.g. one from synth_corpus.py
+DATA_DIR = os.environ.get('REJECTION_DATA_DIR', 'data')
+
+EMAILS = f'{DATA_DIR}/email.json'
+
+# 01_extract_features.py
+REJECTION_ANALYSIS = f'{DATA_DIR}/rejection_analysis.csv'
+
+# dedup.py
+TEMPLATE_CLUSTERS = f'{DATA_DIR}/template_clusters.csv'
+
+# embeddings.py
+EMBEDDINGS = f'{DATA_DIR}/embeddings.npy'
+EMBEDDING_IDS = f'{DATA_DIR}/embedding_ids.csv'
+EMBEDDINGS_IVF = f'{DATA_DIR}/embeddings_ivf.npz'
+
+# 02_compare_models.py
+REJECTION_ANALYSIS_EXTENDED = f'{DATA_DIR}/rejection_analysis_extended.csv'
+REJECTION_SUMMARY = f'{DATA_DIR}/rejection_summary.csv'
+CORRELATION_COMPARE = f'{DATA_DIR}/rejection_correlation_compare.csv'
+
+# 03_shap_analysis.py
+SHAP_RESULTS = f'{DATA_DIR}/shap_results_all.json'
+SHAP_STORE = f'{DATA_DIR}/shap_store'
+SHAP_WORD_ATTRIBUTIONS = f'{DATA_DIR}/shap_word_attributions_all.csv'
+SHAP_SUMMARY = f'{DATA_DIR}/shap_summary_all.csv'
+
+# 04_bootstrap_ci.py
+BOOTSTRAP_CORRELATIONS = f'{DATA_DIR}/bootstrap_correlations.csv'
+
+# distill.py
+DISTILLED_MODEL = f'{DATA_DIR}/distilled_warmth.npz'
+DISTILLED_SCORES = f'{DATA_DIR}/distilled_scores.csv'
+
+# analyses.py (the notebook analyses)
+AFINN_RESULTS = f'{DATA_DIR}/afinn_results.csv'
+REJECTION_ANALYSIS_WITH_EMOTIONS = f'{DATA_DIR}/rejection_analysis_with_emotions.csv'
+POSITIVE_RATIO = f'{DATA_DIR}/positive_ratio.json'
+SENTIMENT_DISAGREEMENTS = f'{DATA_DIR}/sentiment_disagreement_highlights.csv'
+FINAL_STATS = f'{DATA_DIR}/final_stats.json'
+
+# analysis_db.py
+ANALYSIS_DB = f'{DATA_DIR}/analysis.sqlite'
+
+# Pipeline runner state and per-stage logs
+PIPELINE_DIR = f'{DATA_DIR}/.pipeline'
+
+# Memos shared across runs (readability.py syllable counts, token_cache.py tokenizer outputs,
+# the NRC lexicon download)
+CACHE_DIR = f'{DATA_DIR}/.cache'
+SYLLABLE_CACHE = f'{CACHE_DIR}/syllables.json'
+TOKEN_CACHE = f'{CACHE_DIR}/tokens'
+NRC_LEXICON = f'{CACHE_DIR}/nrc_emotion_lexicon.txt'
@@ -0,0 +1,370 @@
+"""Run the analysis pipeline as a DAG of stages.
+
+Usage:
+    python script/pipeline.py                  # run every out-of-date stage
+    python script/pipeline.py shap_analysis    # run a stage and its upstream stages
+    python script/pipeline.py --force          # ignore fingerprints and rerun
+    python script/pipeline.py --dry-run        # show what would run
+    python script/pipeline.py --memory-budget compare_models=4000 --memory-budget shap.attribution=3000
+
+Each stage declares its script, input and output artifacts and the models it
+loads. A stage's fingerprint hashes its input files, its code (the script and
+every repo module it imports, found by parsing the imports) and the resolved
+model revisions; when that matches the last successful run and all
+outputs exist, the stage is skipped. Stages whose inputs are ready run
+concurrently.
+
+Each stage's peak RSS is reported in the summary. A stage fails when it goes
+over its budget (Stage.memory_mb or --memory-budget). Budgets for blocks
+inside the scripts (dotted names like models.score, see script/memory.py) are
+passed down to the stage processes.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+
+import paths
+from memory import BUDGETS_ENV, MB, TRACE_ENV, parse_budgets
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNER = os.path.relpath(os.path.abspath(__file__), ROOT)
+STATE_FILE = os.path.join(paths.PIPELINE_DIR, 'state.json')
+LOG_DIR = os.path.join(paths.PIPELINE_DIR, 'logs')
+
+ROBERTA = 'cardiffnlp/twitter-roberta-base-sentiment-latest'
+SST2 = 'distilbert-base-uncased-finetuned-sst-2-english'
+
+
+@dataclass
+class Stage:
+    name: str
+    script: str
+    inputs: list
+    outputs: list
+    models: list = field(default_factory=list)
+    memory_mb: float = None  # peak RSS budget for the whole stage process
+    args: list = field(default_factory=list)  # command-line arguments for the script
+
+
+STAGES = [
+    Stage('dedup_templates', 'script/dedup.py',
+          inputs=[paths.EMAILS],
+          outputs=[paths.TEMPLATE_CLUSTERS]),
+    Stage('embed_emails', 'script/embeddings.py',
+          inputs=[paths.EMAILS],
+          outputs=[paths.EMBEDDINGS, paths.EMBEDDING_IDS],
+          models=[ROBERTA]),
+    Stage('extract_features', 'script/01_extract_features.py',
+          inputs=[paths.EMAILS],
+          outputs=[paths.REJECTION_ANALYSIS]),
+    Stage('compare_models', 'script/02_compare_models.py',
+          inputs=[paths.EMAILS, paths.TEMPLATE_CLUSTERS],
+          outputs=[paths.REJECTION_ANALYSIS_EXTENDED, paths.REJECTION_SUMMARY, paths.CORRELATION_COMPARE],
+          models=[ROBERTA, SST2]),
+    Stage('shap_analysis', 'script/03_shap_analysis.py',
+          inputs=[paths.REJECTION_ANALYSIS_EXTENDED],
+          outputs=[paths.SHAP_RESULTS, paths.SHAP_STORE, paths.SHAP_WORD_ATTRIBUTIONS, paths.SHAP_SUMMARY],
+          models=[ROBERTA]),
+    Stage('bootstrap_ci', 'script/04_bootstrap_ci.py',
+          inputs=[paths.REJECTION_ANALYSIS_EXTENDED],
+          outputs=[paths.BOOTSTRAP_CORRELATIONS]),
+    Stage('query_db', 'script/analysis_db.py',
+          inputs=[paths.REJECTION_ANALYSIS_EXTENDED, paths.SHAP_WORD_ATTRIBUTIONS, paths.SHAP_SUMMARY],
+          outputs=[paths.ANALYSIS_DB]),
+    # The notebook analyses; notebooks bring these up to date with analyses.run(name)
+    Stage('afinn_words', 'script/analyses.py', args=['afinn_words'],
+          inputs=[paths.EMAILS],
+          outputs=[paths.AFINN_RESULTS]),
+    Stage('emotions', 'script/analyses.py', args=['emotions'],
+          inputs=[paths.EMAILS],
+          outputs=[paths.REJECTION_ANALYSIS_WITH_EMOTIONS]),
+    Stage('positive_ratio', 'script/analyses.py', args=['positive_ratio'],
+          inputs=[paths.REJECTION_ANALYSIS_EXTENDED],
+          outputs=[paths.POSITIVE_RATIO]),
+    Stage('disagreements', 'script/analyses.py', args=['disagreements'],
+          inputs=[paths.REJECTION_ANALYSIS_EXTENDED],
+          outputs=[paths.SENTIMENT_DISAGREEMENTS]),
+    Stage('final_stats', 'script/analyses.py', args=['final_stats'],
+          inputs=[paths.REJECTION_ANALYSIS_EXTENDED, paths.CORRELATION_COMPARE, paths.POSITIVE_RATIO],
+          outputs=[paths.FINAL_STATS]),
+]
+
+
+def file_digest(path):
+    h = hashlib.sha256()
+    with open(os.path.join(ROOT, path), 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def model_revision(name):
+    """Commit hash of the locally cached model snapshot, if there is one"""
+    cache = os.environ.get('HF_HUB_CACHE') or os.path.join(
+        os.environ.get('HF_HOME', os.path.expanduser('~/.cache/huggingface')), 'hub')
+    ref = os.path.join(cache, 'models--' + name.replace('/', '--'), 'refs', 'main')
+    if os.path.exists(ref):
+        with open(ref) as f:
+            return f.read().strip()
+    return 'unresolved'
+
+
+def local_imports(script):
+    """The script plus every script/ module it imports, directly or not (function-level imports too).
+
+    This runner is left out: stages only import its helpers (ROOT,
+    model_revision), and editing STAGES shouldn't rerun every stage.
+    """
+    found, stack = set(), [script]
+    while stack:
+        path = stack.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(os.path.join(ROOT, path)) as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                module = os.path.join(os.path.dirname(path), name.split('.')[0] + '.py')
+                if module != RUNNER and os.path.exists(os.path.join(ROOT, module)):
+                    stack.append(module)
+    return found
+
+
+def fingerprint(stage):
+    """Hash of everything a stage's outputs depend on"""
+    h = hashlib.sha256()
+    for path in sorted(local_imports(stage.script)) + sorted(stage.inputs):
+        h.update(f'{path}:{file_digest(path)}\n'.encode())
+    for model in sorted(stage.models):
+        h.update(f'{model}@{model_revision(model)}\n'.encode())
+    if stage.args:
+        h.update(f"args {' '.join(stage.args)}\n".encode())
+    h.update(f'python {sys.version_info[0]}.{sys.version_info[1]}\n'.encode())
+    return h.hexdigest()
+
+
+def load_state():
+    path = os.path.join(ROOT, STATE_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_state(state):
+    path = os.path.join(ROOT, STATE_FILE)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Notebooks update the state too (analyses.run), so never leave it half-written
+    with open(path + '.tmp', 'w') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+
+def build_graph(stages):
+    """Map each stage to the stages producing its inputs"""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            if output in producers:
+                raise ValueError(f"{output} is produced by both {producers[output]} and {stage.name}")
+            producers[output] = stage.name
+    graph = {stage.name: sorted({producers[i] for i in stage.inputs if i in producers}) for stage in stages}
+
+    # Reject cycles up front
+    visiting, done = set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name in visiting:
+            raise ValueError(f"dependency cycle through {name}")
+        visiting.add(name)
+        for dep in graph[name]:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+
+    for name in graph:
+        visit(name)
+    return graph
+
+
+def select(graph, targets):
+    """Targets plus everything upstream of them"""
+    selected, stack = set(), list(targets)
+    while stack:
+        name = stack.pop()
+        if name not in graph:
+            raise SystemExit(f"❌ Unknown stage '{name}'. Available: {', '.join(graph)}")
+        if name not in selected:
+            selected.add(name)
+            stack.extend(graph[name])
+    return selected
+
+
+def run_script(stage, env=None):
+    """Run one stage script from the repo root, logging its output.
+
+    Returns (exit code, seconds, log path, peak RSS in bytes).
+    """
+    os.makedirs(os.path.join(ROOT, LOG_DIR), exist_ok=True)
+    log_path = os.path.join(ROOT, LOG_DIR, f'{stage.name}.log')
+    env = dict(env or os.environ, PYTHONUNBUFFERED='1')
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        proc = subprocess.Popen([sys.executable, stage.script, *stage.args], cwd=ROOT, stdout=log,
+                                stderr=subprocess.STDOUT, env=env)
+        # wait4 gives this child's own rusage, even with other stages running concurrently
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+    peak = usage.ru_maxrss if sys.platform == 'darwin' else usage.ru_maxrss * 1024
+    return proc.returncode, time.perf_counter() - start, log_path, peak
+
+
+def run_pipeline(stages, targets=None, force=False, jobs=2, dry_run=False, budgets=None, trace_memory=False):
+    """Run out-of-date stages in dependency order; returns per-stage results.
+
+    budgets maps stage names (or dotted block names inside the scripts) to MB.
+    """
+    by_name = {stage.name: stage for stage in stages}
+    budgets = dict(budgets or {})
+    stage_budgets = {stage.name: budgets.pop(stage.name, stage.memory_mb) for stage in stages}
+    env = dict(os.environ)
+    if budgets:
+        env[BUDGETS_ENV] = ','.join(f'{name}={mb}' for name, mb in
+                                    {**parse_budgets(env.get(BUDGETS_ENV)), **budgets}.items())
+    if trace_memory:
+        env[TRACE_ENV] = '1'
+    graph = build_graph(stages)
+    selected = select(graph, targets or list(by_name))
+    state = load_state()
+    results = {}
+    pending = {name for name in selected}
+    running = {}
+
+    def ready(name):
+        return all(dep in results and results[dep]['status'] in ('ran', 'skipped', 'would run')
+                   for dep in graph[name] if dep in selected)
+
+    def blocked(name):
+        return any(dep in results and results[dep]['status'] in ('failed', 'blocked') for dep in graph[name] if dep in selected)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                if blocked(name):
+                    pending.discard(name)
+                    results[name] = {'status': 'blocked', 'seconds': 0.0}
+                    print(f"⛔ {name}: blocked by a failed upstream stage")
+                    continue
+                if not ready(name):
+                    continue
+                pending.discard(name)
+                stage = by_name[name]
+                # Inputs an upstream stage would rebuild don't exist yet (or will change)
+                upstream = [dep for dep in graph[name] if dep in selected and results[dep]['status'] == 'would run']
+                if dry_run and upstream:
+                    results[name] = {'status': 'would run', 'seconds': 0.0}
+                    print(f"🔜 {name}: would run {' '.join([stage.script, *stage.args])} after {', '.join(upstream)}")
+                    continue
+                missing = [p for p in stage.inputs if not os.path.exists(os.path.join(ROOT, p))]
+                if missing:
+                    results[name] = {'status': 'failed', 'seconds': 0.0}
+                    print(f"❌ {name}: missing inputs {missing}")
+                    continue
+                fp = fingerprint(stage)
+                outputs_exist = all(os.path.exists(os.path.join(ROOT, p)) for p in stage.outputs)
+                if not force and outputs_exist and state.get(name) == fp:
+                    results[name] = {'status': 'skipped', 'seconds': 0.0}
+                    print(f"⏭️  {name}: up to date")
+                    continue
+                if dry_run:
+                    results[name] = {'status': 'would run', 'seconds': 0.0}
+                    print(f"🔜 {name}: would run {' '.join([stage.script, *stage.args])}")
+                    continue
+                print(f"▶️  {name}: running {' '.join([stage.script, *stage.args])}")
+                running[pool.submit(run_script, stage, env)] = (name, fp)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, fp = running.pop(future)
+                returncode, seconds, log_path, peak = future.result()
+                budget = stage_budgets[name]
+                over_budget = budget is not None and peak > budget * MB
+                if returncode == 0 and not over_budget:
+                    # Record the fingerprint of the inputs the stage actually consumed
+                    state[name] = fp
+                    save_state(state)
+                    results[name] = {'status': 'ran', 'seconds': seconds, 'peak_mb': peak / MB}
+                    print(f"✅ {name}: done in {seconds:.1f}s, peak RSS {peak / MB:,.0f} MB")
+                elif over_budget:
+                    results[name] = {'status': 'failed', 'seconds': seconds, 'peak_mb': peak / MB}
+                    print(f"❌ {name}: peak RSS {peak / MB:,.0f} MB is over its {budget:,.0f} MB budget "
+                          f"(log: {os.path.relpath(log_path, ROOT)})")
+                else:
+                    results[name] = {'status': 'failed', 'seconds': seconds, 'peak_mb': peak / MB}
+                    print(f"❌ {name}: exit code {returncode} after {seconds:.1f}s (log: {os.path.relpath(log_path, ROOT)})")
+                    with open(log_path) as f:
+                        tail = f.readlines()[-15:]
+                    print(''.join('    ' + line for line in tail), end='')
+    return results
+
+
+def print_summary(results, wall):
+    icons = {'ran': '✅', 'skipped': '⏭️ ', 'would run': '🔜', 'failed': '❌', 'blocked': '⛔'}
+    print("\n📊 Stage timing summary")
+    print(f"{'Stage':<22} {'Status':<12} {'Seconds':>8} {'Peak MB':>8}")
+    print("-" * 53)
+    for name, r in results.items():
+        peak = f"{r['peak_mb']:,.0f}" if 'peak_mb' in r else '-'
+        print(f"{name:<22} {icons[r['status']]} {r['status']:<9} {r['seconds']:>8.1f} {peak:>8}")
+    print("-" * 53)
+    print(f"{'wall clock':<35} {wall:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('stages', nargs='*', help='stages to bring up to date (default: all)')
+    parser.add_argument('--force', action='store_true', help='rerun stages even if up to date')
+    parser.add_argument('--jobs', type=int, default=2, help='stages to run concurrently')
+    parser.add_argument('--dry-run', action='store_true', help='show what would run without running it')
+    parser.add_argument('--list', action='store_true', help='list stages and their dependencies')
+    parser.add_argument('--memory-budget', action='append', default=[], metavar='NAME=MB',
+                        help='peak RSS budget for a stage or a block inside one (repeatable)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='trace Python allocations in the stages (slower; adds peaks and top sites)')
+    args = parser.parse_args()
+
+    if args.list:
+        graph = build_graph(STAGES)
+        for stage in STAGES:
+            deps = ', '.join(graph[stage.name]) or '-'
+            print(f"{stage.name:<22} after: {deps:<30} outputs: {', '.join(stage.outputs)}")
+        return
+
+    start = time.perf_counter()
+    results = run_pipeline(STAGES, args.stages, args.force, args.jobs, args.dry_run,
+                           parse_budgets(','.join(args.memory_budget)), args.trace_memory)
+    print_summary(results, time.perf_counter() - start)
+    if any(r['status'] in ('failed', 'blocked') for r in results.values()):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
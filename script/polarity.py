@@ -0,0 +1,184 @@
+"""TextBlob-compatible polarity without building TextBlob objects.
+
+`TextBlob(text).sentiment.polarity` runs pattern's sentence tokenizer and
+then its sentiment assessments over the lowercased tokens. This module loads
+the same pattern lexicon once into a flat word -> (polarity, intensity,
+is_modifier) dict, memoizes how each raw token splits into words, and applies
+the same modifier, negation, "!" and emoticon rules, so scores match TextBlob
+to floating-point precision.
+
+Usage:
+    python script/polarity.py          # check against TextBlob and time both
+"""
+import argparse
+import json
+import re
+import time
+
+from textblob._text import (ABBREVIATIONS, EMOTICONS, EOS, PUNCTUATION, RE_ABBR1, RE_ABBR2, RE_ABBR3,
+                            RE_EMOTICONS, RE_SARCASM, replacements)
+from textblob.en import sentiment as pattern_sentiment
+
+from paths import EMAILS
+
+RE_LINEBREAK = re.compile(r"\n{2,}")
+MAX_MEMO = 500_000
+
+_LEADING = tuple(PUNCTUATION.replace(".", ""))
+_TRAILING = _LEADING + (".",)
+
+
+def split_token(t):
+    """Split leading/trailing punctuation off one whitespace token, like pattern's find_tokens"""
+    tokens, tail = [], []
+    while t.startswith(_LEADING) and t not in replacements:
+        tokens.append(t[0])
+        t = t[1:]
+    while t.endswith(_TRAILING) and t not in replacements:
+        if t.endswith(_LEADING):
+            tail.append(t[-1])
+            t = t[:-1]
+        # Ellipsis before period
+        if t.endswith("..."):
+            tail.append("...")
+            t = t[:-3].rstrip(".")
+        # Period, unless it ends an abbreviation
+        if t.endswith("."):
+            if (t in ABBREVIATIONS or RE_ABBR1.match(t) is not None
+                    or RE_ABBR2.match(t) is not None or RE_ABBR3.match(t) is not None):
+                break
+            tail.append(t[-1])
+            t = t[:-1]
+    if t != "":
+        tokens.append(t)
+    tokens.extend(reversed(tail))
+    return tuple(tok for tok in tokens if tok != EOS)
+
+
+class Polarity:
+    """Pattern's polarity rules over a compact lexicon, with per-token memos"""
+
+    def __init__(self, sentiment=pattern_sentiment):
+        len(sentiment)  # the lexicon is a lazydict: force the XML to load
+        modifiers = sentiment.modifiers
+        self.lexicon = {word: (entry[None][0], entry[None][2], any(pos in entry for pos in modifiers))
+                        for word, entry in dict.items(sentiment) if None in entry}
+        self.negations = frozenset(sentiment.negations)
+        self.modifier = sentiment.modifier
+        self.emoticons = {}
+        for (_, p), faces in EMOTICONS.items():
+            for face in faces:
+                self.emoticons.setdefault(face.lower(), p)
+        self.tokenizer = sentiment.tokenizer
+        self._split = {}
+
+    def words(self, text):
+        """Lowercased tokens, as pattern's sentiment sees a raw string"""
+        original = text
+        for a, b in replacements.items():
+            text = text.replace(a, b)
+        text = (text.replace("“", " “ ").replace("”", " ” ").replace("‘", " ‘ ").replace("’", " ’ ")
+                .replace("'", " ' ").replace('"', ' " ').replace("\r\n", "\n"))
+        text = RE_LINEBREAK.sub(" %s " % EOS, text)
+
+        memo = self._split
+        if len(memo) > MAX_MEMO:
+            memo.clear()
+        tokens = []
+        for raw in text.split():
+            split = memo.get(raw)
+            if split is None:
+                split = memo[raw] = split_token(raw)
+            tokens.extend(split)
+
+        # Sarcasm "( ! )" and emoticons split by the tokenizer get re-joined per
+        # sentence; both are rare, so hand those texts to pattern's tokenizer
+        joined = " ".join(tokens)
+        if ("(" in joined and RE_SARCASM.search(joined)) or any(
+                " " in match.group(1) for match in RE_EMOTICONS.finditer(joined)):
+            return [w.lower() for w in " ".join(self.tokenizer(original)).split()]
+        return [w.lower() for w in tokens]
+
+    def __call__(self, text):
+        """Polarity in [-1, 1]; 0.0 when nothing in the text is in the lexicon"""
+        return self.score(self.words(text))
+
+    def score(self, words):
+        """Average polarity of pattern's assessments over lowercased words"""
+        lexicon, negations, emoticons = self.lexicon, self.negations, self.emoticons
+        a = []  # [polarity, intensity, negated] per assessed chunk
+        m = n = None
+        for w in words:
+            entry = lexicon.get(w)
+            if entry is not None:
+                p, i, is_modifier = entry
+                if m is None:
+                    a.append([p, i, False])
+                else:
+                    last = a[-1]
+                    last[0] = max(-1.0, min(p * last[1], +1.0))
+                    last[1] = i
+                if n is not None:
+                    a[-1][1] = 1.0 / a[-1][1]
+                    a[-1][2] = True
+                m = w if is_modifier else None
+                n = w if w in negations else None
+            else:
+                # Negations carry across short words ("not a good")
+                if w in negations:
+                    n = w
+                elif n and len(w.strip("'")) > 1:
+                    n = None
+                # "really not good"
+                if n is not None and m is not None and self.modifier(m):
+                    a[-1][2] = True
+                    n = None
+                elif m and len(w) > 2:
+                    m = None
+                if w == "!" and a:
+                    a[-1][0] = max(-1.0, min(a[-1][0] * 1.25, +1.0))
+                if w == "(!)":
+                    a.append([0.0, 1.0, False])
+                if w.isalpha() is False and len(w) <= 5 and w not in PUNCTUATION:
+                    p = emoticons.get(w)
+                    if p is not None:
+                        a.append([p, 1.0, False])
+        total = 0
+        for p, _, negated in a:
+            total += p * -0.5 if negated else p
+        return total / float(len(a) or 1)
+
+
+polarity = Polarity()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the corpus when timing')
+    args = parser.parse_args()
+
+    from textblob import TextBlob
+    from features import load_emails
+
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    texts = [email['email_text'] for email, _ in load_emails(data) if email.get('email_text')]
+
+    worst = max(abs(polarity(text) - TextBlob(text).sentiment.polarity) for text in texts)
+    print(f"✅ Max difference from TextBlob over {len(texts)} emails: {worst:.2e}")
+
+    corpus = texts * args.repeat
+    start = time.perf_counter()
+    for text in corpus:
+        TextBlob(text).sentiment.polarity
+    textblob_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in corpus:
+        polarity(text)
+    fast_seconds = time.perf_counter() - start
+    print(f"📊 {len(corpus):,} emails: TextBlob {textblob_seconds:.2f}s, fast scorer {fast_seconds:.2f}s "
+          f"({textblob_seconds / fast_seconds:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
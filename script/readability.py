@@ -0,0 +1,187 @@
+"""One-pass readability metrics with a persistent syllable memo.
+
+textstat recounts syllables for every word of every email, and each metric
+re-tokenizes the text. Here the words, sentences and syllables are counted
+once and shared by Flesch reading ease, Flesch-Kincaid grade, Gunning fog and
+SMOG. Syllable counts are memoized per word and saved to
+data/.cache/syllables.json, so cmudict is only loaded when a new word shows up.
+Results match textstat's (en, unrounded) for all four metrics. The word lists
+and syllable rules come from textstat's private helpers (textstat is pinned in
+requirements.txt); without them the same counts go through its public API.
+
+Usage:
+    python script/readability.py       # check against textstat and time both
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+try:
+    from textstat.backend.utils._get_cmudict import get_cmudict
+    from textstat.backend.utils._get_lang_easy_words import get_lang_easy_words
+    from textstat.backend.utils._get_pyphen import get_pyphen
+    from textstat.backend.utils.constants import RE_NONCONTRACTION_APOSTROPHE
+except ImportError:  # another textstat layout: same counts, one public call per new word
+    import textstat
+    get_cmudict = get_lang_easy_words = get_pyphen = None
+    RE_NONCONTRACTION_APOSTROPHE = r"\'(?![tsd]|ve|ll|re)"
+
+from paths import EMAILS, SYLLABLE_CACHE
+
+LANG = 'en_US'
+RE_NONCONTRACTION = re.compile(RE_NONCONTRACTION_APOSTROPHE)
+RE_PUNCTUATION = re.compile(r"[^\w\s\']")
+RE_SENTENCE = re.compile(r"\b[^.!?]+[.!?]*", re.UNICODE)
+HARD_SYLLABLES = 3  # Gunning fog "complex word" and SMOG polysyllable cut-off
+MAX_MEMO = 500_000  # sentences whose word counts are kept, like polarity.py's token memo
+
+METRICS = ['flesch_reading', 'flesch_kincaid_grade', 'gunning_fog', 'smog_index']
+
+
+def words_of(text):
+    """textstat's word list: punctuation removed, contractions kept whole"""
+    return RE_PUNCTUATION.sub("", RE_NONCONTRACTION.sub("", text)).split()
+
+
+class Readability:
+    """Readability metrics over a shared word -> syllable memo"""
+
+    def __init__(self, cache_path=SYLLABLE_CACHE):
+        self.cache_path = cache_path
+        self.syllables = {}
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r') as f:
+                self.syllables = json.load(f)
+        self.easy_words = get_lang_easy_words(LANG) if get_lang_easy_words else None
+        self._cmudict = self._pyphen = None
+        self._new_words = 0
+        self._sentence_words = {}
+
+    def count_syllables(self, word):
+        """Syllables of one lowercased word: cmudict vowels, else pyphen hyphenation"""
+        count = self.syllables.get(word)
+        if count is None and get_cmudict is None:
+            count = self.syllables[word] = textstat.syllable_count(word)
+            self._new_words += 1
+        elif count is None:
+            if self._cmudict is None:
+                self._cmudict = get_cmudict(LANG)
+                self._pyphen = get_pyphen(LANG)
+            try:
+                count = sum(1 for phone in self._cmudict[word][0] if phone[-1].isdigit())
+            except (TypeError, IndexError, KeyError):
+                count = len(self._pyphen.positions(word)) + 1
+            self.syllables[word] = count
+            self._new_words += 1
+        return count
+
+    def is_difficult(self, word):
+        """Not on the easy word list (the caller checks the syllables)"""
+        if self.easy_words is None:
+            return textstat.is_difficult_word(word, HARD_SYLLABLES)
+        return word not in self.easy_words
+
+    def count_sentences(self, text):
+        """textstat's sentence count: fragments of two words or fewer don't count"""
+        if not text:
+            return 0
+        sentences = RE_SENTENCE.findall(text)
+        memo = self._sentence_words
+        if len(memo) > MAX_MEMO:
+            memo.clear()
+        short = 0
+        for sentence in sentences:
+            n = memo.get(sentence)
+            if n is None:
+                n = memo[sentence] = len(words_of(sentence))
+            short += n <= 2
+        return max(1, len(sentences) - short)
+
+    def scores(self, text):
+        """All four metrics from one tokenization of `text`"""
+        words = words_of(text)
+        n_words = len(words)
+        n_sentences = self.count_sentences(text)
+
+        syllables = polysyllables = difficult = 0
+        for word in words:
+            lower = word.lower()
+            count = self.count_syllables(lower)
+            syllables += count
+            if count >= HARD_SYLLABLES:
+                polysyllables += 1
+                if self.is_difficult(lower):
+                    difficult += 1
+
+        words_per_sentence = n_words / n_sentences if n_sentences else 0.0
+        syllables_per_word = syllables / n_words if n_words else 0.0
+        if words_per_sentence == 0 or syllables_per_word == 0:
+            flesch = grade = 0.0
+        else:
+            flesch = 206.835 - 1.015 * words_per_sentence - 84.6 * syllables_per_word
+            grade = (0.39 * words_per_sentence) + (11.8 * syllables_per_word) - 15.59
+        fog = 0.4 * (words_per_sentence + 100 * difficult / n_words) if n_words else 0.0
+        smog = (1.043 * (30 * (polysyllables / n_sentences)) ** 0.5) + 3.1291 if n_sentences else 0.0
+        return {'flesch_reading': flesch, 'flesch_kincaid_grade': grade, 'gunning_fog': fog, 'smog_index': smog}
+
+    def save(self):
+        """Write the syllable memo back if new words were counted"""
+        if not self.cache_path or not self._new_words:
+            return
+        os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+        tmp = self.cache_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.syllables, f, sort_keys=True)
+        os.replace(tmp, self.cache_path)
+        self._new_words = 0
+
+
+readability = Readability()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20, help='passes over the corpus when timing')
+    args = parser.parse_args()
+
+    import textstat
+    from features import load_emails
+
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    texts = [email['email_text'] for email, _ in load_emails(data) if email.get('email_text')]
+
+    reference = {
+        'flesch_reading': textstat.flesch_reading_ease,
+        'flesch_kincaid_grade': textstat.flesch_kincaid_grade,
+        'gunning_fog': textstat.gunning_fog,
+        'smog_index': textstat.smog_index,
+    }
+    for name, func in reference.items():
+        worst = max(abs(readability.scores(text)[name] - func(text)) for text in texts)
+        print(f"✅ {name:<22} max difference from textstat: {worst:.2e}")
+    readability.save()
+
+    # textstat caches results per text, so time it on distinct strings
+    corpus = [f"{text} {i}" for i in range(args.repeat) for text in texts]
+    start = time.perf_counter()
+    for text in corpus:
+        textstat.flesch_reading_ease(text)
+    flesch_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in corpus:
+        for func in reference.values():
+            func(text + ' ')
+    all_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in corpus:
+        readability.scores(text)
+    fast_seconds = time.perf_counter() - start
+    print(f"📊 {len(corpus):,} emails: textstat Flesch {flesch_seconds:.2f}s, textstat all four {all_seconds:.2f}s, "
+          f"one pass all four {fast_seconds:.2f}s ({flesch_seconds / fast_seconds:.1f}x vs Flesch alone)")
+
+
+if __name__ == '__main__':
+    main()
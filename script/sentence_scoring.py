@@ -0,0 +1,256 @@
+"""Sentence-decomposed VADER scoring with a per-sentence memo.
+
+VADER scores each token from a window of at most three preceding and two
+following tokens, then applies two whole-text steps: the "but" rule and
+punctuation emphasis. Token valences for a sentence are therefore a pure
+function of the sentence, its neighbouring context tokens and the text-wide
+ALL-CAPS flag, so they can be memoized and recombined into exactly the score
+`SentimentIntensityAnalyzer.polarity_scores` returns for the whole text.
+
+Sentences are memoized under a digest of their normalized context window
+(VADER's punctuation-stripped tokens), so templated emails that share
+sentences verbatim reuse each other's valences.
+
+Usage:
+    python script/sentence_scoring.py   # exactness check and memo hit rate on the corpus
+"""
+import argparse
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from types import SimpleNamespace
+
+from vaderSentiment.vaderSentiment import (BOOSTER_DICT, SentimentIntensityAnalyzer,
+                                           SentiText, allcap_differential, normalize)
+
+from paths import EMAILS
+from warmth import APOLOGY_KEYWORDS, JOY_KEYWORDS, POSITIVE_KEYWORDS
+
+SENTENCE_END = ('.', '!', '?')
+CONTEXT_BEFORE = 3
+CONTEXT_AFTER = 2
+
+
+def split_sentences(tokens):
+    """Split whitespace tokens into sentences ending in . ! or ?"""
+    sentences, current = [], []
+    for token in tokens:
+        current.append(token)
+        if token.endswith(SENTENCE_END):
+            sentences.append(current)
+            current = []
+    if current:
+        sentences.append(current)
+    return sentences
+
+
+class LRUMemo:
+    """Small LRU dict with hit/miss counters"""
+
+    def __init__(self, compute, maxsize=100_000):
+        self.compute = compute
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __call__(self, key, *args):
+        """Cached value for key; on a miss compute(*args), or compute(key) without args"""
+        cached = self.data.get(key)
+        if cached is not None:
+            self.hits += 1
+            self.data.move_to_end(key)
+            return cached
+        self.misses += 1
+        result = self.compute(*(args or (key,)))
+        self.data[key] = result
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+        return result
+
+
+class SentenceScorer:
+    """Exact VADER polarity scores assembled from memoized sentence valences"""
+
+    def __init__(self, analyzer=None, maxsize=100_000):
+        self.vader = analyzer or SentimentIntensityAnalyzer()
+        self.emoji_chars = frozenset(ch for ch in self.vader.emojis if len(ch) == 1)
+        self.valences = LRUMemo(self._compute, maxsize)
+
+    @property
+    def hits(self):
+        return self.valences.hits
+
+    @property
+    def misses(self):
+        return self.valences.misses
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def prepare(self, text):
+        """Emoji replacement exactly as polarity_scores does it"""
+        if self.emoji_chars.isdisjoint(text):
+            return text.strip()
+        text_no_emoji = ""
+        prev_space = True
+        for chr in text:
+            if chr in self.vader.emojis:
+                if not prev_space:
+                    text_no_emoji += ' '
+                text_no_emoji += self.vader.emojis[chr]
+                prev_space = False
+            else:
+                text_no_emoji += chr
+                prev_space = chr == ' '
+        return text_no_emoji.strip()
+
+    def segment(self, text):
+        """Return (prepared text, words, sentences as (start, end) word spans)"""
+        text = self.prepare(text)
+        raw = text.split()
+        words = [SentiText._strip_punc_if_word(token) for token in raw]
+        spans, start = [], 0
+        for sentence in split_sentences(raw):
+            spans.append((start, start + len(sentence)))
+            start += len(sentence)
+        return text, words, spans
+
+    def _window(self, words, start, end, is_cap_diff):
+        """(digest key, window tokens, sentence offset in window, sentence length)"""
+        window = words[max(0, start - CONTEXT_BEFORE):end + CONTEXT_AFTER]
+        offset = min(start, CONTEXT_BEFORE)
+        # Whitespace-split tokens never contain \x1f, so the join is unambiguous
+        normalized = f"{offset}:{end - start}:{int(is_cap_diff)}\x1e" + "\x1f".join(window)
+        key = hashlib.blake2b(normalized.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        return key, window, offset, end - start
+
+    def _compute(self, window, offset, length, is_cap_diff):
+        """Token valences for one sentence, evaluated inside its context window"""
+        sentitext = SimpleNamespace(words_and_emoticons=window, is_cap_diff=is_cap_diff)
+        sentiments = []
+        for i in range(offset, offset + length):
+            item = window[i]
+            if item.lower() in BOOSTER_DICT:
+                sentiments.append(0)
+                continue
+            if i < len(window) - 1 and item.lower() == "kind" and window[i + 1].lower() == "of":
+                sentiments.append(0)
+                continue
+            sentiments = self.vader.sentiment_valence(0, sentitext, item, i, sentiments)
+        return tuple(sentiments)
+
+    def sentence_valences(self, text):
+        """Per-sentence token valences (before the whole-text "but" rule)"""
+        text, words, spans = self.segment(text)
+        is_cap_diff = allcap_differential(words)
+        per_sentence = []
+        for start, end in spans:
+            key, window, offset, length = self._window(words, start, end, is_cap_diff)
+            per_sentence.append(self.valences(key, window, offset, length, is_cap_diff))
+        return text, words, spans, per_sentence
+
+    def polarity_scores(self, text):
+        """Drop-in replacement for SentimentIntensityAnalyzer.polarity_scores"""
+        text, words, _, per_sentence = self.sentence_valences(text)
+        sentiments = [v for valences in per_sentence for v in valences]
+        sentiments = self.vader._but_check(words, sentiments)
+        return self.vader.score_valence(sentiments, text)
+
+    def compound(self, text):
+        return self.polarity_scores(text)['compound']
+
+
+def keyword_counts(tokens):
+    """analyze_text keyword counts for one sentence's whitespace tokens"""
+    words = [token.lower() for token in tokens]
+    return (
+        sum(1 for w in words if any(j in w for j in JOY_KEYWORDS)),
+        sum(1 for w in words if any(a in w for a in APOLOGY_KEYWORDS)),
+        sum(1 for w in words if any(p in w for p in POSITIVE_KEYWORDS)),
+        len(words),
+    )
+
+
+class IncrementalAnalyzer:
+    """analyze_text with per-sentence caching, for as-you-type analysis.
+
+    VADER valences and keyword counts are memoized per sentence, so after an
+    edit only the changed sentences (plus neighbours whose context tokens
+    changed) are recomputed before recombining into email-level metrics.
+    """
+
+    def __init__(self, scorer=None, maxsize=100_000):
+        self.scorer = scorer or SentenceScorer(maxsize=maxsize)
+        self.keywords = LRUMemo(keyword_counts, maxsize)
+
+    def analyze(self, text):
+        """Same keys as analyze_text, plus a per-sentence breakdown"""
+        prepared, words, spans, per_sentence = self.scorer.sentence_valences(text)
+        vader = self.scorer.vader
+        sentiments = vader._but_check(words, [v for valences in per_sentence for v in valences])
+        score = vader.score_valence(sentiments, prepared)['compound']
+
+        raw = prepared.split()
+        sentences = []
+        for start, end in spans:
+            joy, apology, positive, word_count = self.keywords(tuple(raw[start:end]))
+            contribution = sum(sentiments[start:end])
+            sentences.append({
+                'sentence': ' '.join(raw[start:end]),
+                'warmth': normalize(contribution) if contribution else 0.0,
+                'contribution': contribution,
+                'joy': joy,
+                'apology': apology,
+                'positive': positive,
+                'word_count': word_count,
+            })
+
+        # Emoji replacement changes the tokens VADER sees; keyword counts
+        # always follow analyze_text and use the raw text
+        if prepared == text.strip():
+            counts = [(s['joy'], s['apology'], s['positive'], s['word_count']) for s in sentences]
+        else:
+            counts = [self.keywords(tuple(tokens)) for tokens in split_sentences(text.split())]
+        joy, apology, positive, word_count = (sum(column) for column in zip(*counts)) if counts else (0, 0, 0, 0)
+
+        return {
+            'score': score,
+            'joy': joy,
+            'apology': apology,
+            'positive': positive,
+            'word_count': word_count,
+            'sentences': sentences,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    from features import load_emails
+
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    texts = [email['email_text'] for email, _ in load_emails(data) if email.get('email_text')]
+
+    scorer = SentenceScorer()
+    start = time.perf_counter()
+    memo_scores = [scorer.compound(text) for text in texts]
+    memo_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    vader_scores = [scorer.vader.polarity_scores(text)['compound'] for text in texts]
+    vader_seconds = time.perf_counter() - start
+
+    mismatches = sum(a != b for a, b in zip(memo_scores, vader_scores))
+    print(f"✅ {len(texts)} emails, {mismatches} compound scores differ from VADER")
+    print(f"📊 Sentence memo: {scorer.hits} hits / {scorer.hits + scorer.misses} sentences "
+          f"({scorer.hit_rate:.0%} hit rate), {len(scorer.valences.data)} entries")
+    print(f"📊 VADER {vader_seconds * 1000:.1f} ms, memoized {memo_seconds * 1000:.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+"""Headless HTTP scoring service for analyze_text and the rewriter.
+
+Usage:
+    python script/serve.py --port 8765 --workers 4
+
+Endpoints (JSON in, JSON out):
+    GET  /health
+    POST /analyze          {"text": "..."}
+    POST /analyze/batch    {"texts": ["...", ...]}
+    POST /rewrite          {"text": "..."}
+    POST /rewrite/batch    {"texts": ["...", ...]}
+
+Single requests are queued and coalesced into micro-batches (up to
+--max-batch texts or --max-wait-ms) before going to the worker pool, so
+concurrent callers share one vectorized analyze_texts call. A request that
+isn't answered within --request-timeout seconds, or that finds the worker pool
+broken, gets a 503.
+"""
+import argparse
+import json
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import BrokenExecutor, CancelledError, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rewrite_search import rewrite_records
+from warmth import analyze_records
+
+MAX_BODY_BYTES = 10 * 1024 * 1024
+
+
+def submit(pool, func, *args):
+    """pool.submit, raising BrokenExecutor for a pool that is broken or shut down"""
+    try:
+        return pool.submit(func, *args)
+    except RuntimeError as error:
+        if isinstance(error, BrokenExecutor):
+            raise
+        raise BrokenExecutor(str(error)) from error
+
+
+class MicroBatcher:
+    """Coalesce single-text requests into batches for one worker function"""
+
+    def __init__(self, pool, func, max_batch=64, max_wait_ms=5.0):
+        self.pool = pool
+        self.func = func
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.pending = queue.Queue()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, text):
+        future = Future()
+        self.pending.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            texts = [text for text, _ in batch]
+            try:
+                pending = submit(self.pool, self.func, texts)
+            except BrokenExecutor as error:
+                # A broken or shut-down pool fails this batch, not the batcher
+                for _, future in batch:
+                    future.set_exception(error)
+                continue
+            pending.add_done_callback(lambda done, batch=batch: self._resolve(done, batch))
+
+    @staticmethod
+    def _resolve(done, batch):
+        error = CancelledError() if done.cancelled() else done.exception()
+        for i, (_, future) in enumerate(batch):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(done.result()[i])
+
+
+class ScoringService:
+    """Worker pool plus one micro-batcher per single-text endpoint"""
+
+    def __init__(self, workers=4, executor='process', max_batch=64, max_wait_ms=5.0, chunk_size=256,
+                 request_timeout=30.0):
+        if executor == 'process':
+            self.pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        else:
+            self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.chunk_size = chunk_size
+        self.request_timeout = request_timeout
+        self.batchers = {
+            'analyze': MicroBatcher(self.pool, analyze_records, max_batch, max_wait_ms),
+            'rewrite': MicroBatcher(self.pool, rewrite_records, max_batch, max_wait_ms),
+        }
+        self.batch_funcs = {'analyze': analyze_records, 'rewrite': rewrite_records}
+
+    def single(self, kind, text):
+        return self.batchers[kind].submit(text).result(timeout=self.request_timeout)
+
+    def batch(self, kind, texts):
+        """Split a batch request into chunks and fan them out over the pool"""
+        func = self.batch_funcs[kind]
+        chunks = [texts[i:i + self.chunk_size] for i in range(0, len(texts), self.chunk_size)]
+        futures = [submit(self.pool, func, chunk) for chunk in chunks]
+        return [record for future in futures for record in future.result(timeout=self.request_timeout)]
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+
+class ScoringServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def make_handler(service):
+    routes = {
+        '/analyze': ('analyze', False),
+        '/analyze/batch': ('analyze', True),
+        '/rewrite': ('rewrite', False),
+        '/rewrite/batch': ('rewrite', True),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, payload, close=False):
+            """close=True ends the keep-alive connection, e.g. when the request body was left unread"""
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            if close:
+                self.send_header('Connection', 'close')
+                self.close_connection = True
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send(200, {'status': 'ok'})
+            else:
+                self._send(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if self.path not in routes:
+                self._send(404, {'error': f'unknown path {self.path}'})
+                return
+            kind, is_batch = routes[self.path]
+
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                self._send(400, {'error': 'invalid Content-Length'}, close=True)
+                return
+            if length > MAX_BODY_BYTES:
+                self._send(413, {'error': 'request body too large'}, close=True)
+                return
+            try:
+                payload = json.loads(self.rfile.read(length) or b'{}')
+            except json.JSONDecodeError as e:
+                self._send(400, {'error': f'invalid JSON: {e}'})
+                return
+            if not isinstance(payload, dict):
+                self._send(400, {'error': 'request body must be a JSON object'})
+                return
+
+            if is_batch:
+                texts = payload.get('texts')
+                if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+                    self._send(400, {'error': "'texts' must be a list of strings"})
+                    return
+            else:
+                text = payload.get('text')
+                if not isinstance(text, str):
+                    self._send(400, {'error': "'text' must be a string"})
+                    return
+
+            try:
+                result = {'results': service.batch(kind, texts)} if is_batch else service.single(kind, text)
+            except TimeoutError:
+                self._send(503, {'error': f'no result within {service.request_timeout:g}s'})
+                return
+            except (BrokenExecutor, CancelledError) as e:
+                # The worker pool died or is shutting down
+                self._send(503, {'error': f'scoring workers unavailable: {type(e).__name__}: {e}'})
+                return
+            except Exception as e:
+                self._send(500, {'error': f'{type(e).__name__}: {e}'})
+                return
+            self._send(200, result)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--executor', choices=['process', 'thread'], default='process')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=5.0)
+    parser.add_argument('--request-timeout', type=float, default=30.0, help='seconds before a request gets a 503')
+    args = parser.parse_args()
+
+    service = ScoringService(args.workers, args.executor, args.max_batch, args.max_wait_ms,
+                             request_timeout=args.request_timeout)
+    server = ScoringServer((args.host, args.port), make_handler(service))
+    print(f"✅ Scoring service on http://{args.host}:{args.port} "
+          f"({args.workers} {args.executor} workers, batch ≤{args.max_batch}, wait ≤{args.max_wait_ms}ms)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,167 @@
+"""Sharded SHAP attribution store, read one company at a time.
+
+03_shap_analysis.py writes every company's word attributions to
+data/shap_store/ as it explains them. Each shard of SHARD_SIZE companies is
+three files: its word dictionary (JSON), uint32 codes into it, and float32
+scores. index.sqlite maps each company to its shard, offset and length, and
+holds the scalar results (VADER, RoBERTa, sums). The app looks up a company in
+the index and reads only that company's slice of the shard, so startup time
+and memory don't grow with the number of explained emails.
+
+Usage:
+    python script/shap_store.py     # rebuild the store from shap_results_all.json
+"""
+import functools
+import json
+import os
+import shutil
+import sqlite3
+import threading
+
+import numpy as np
+
+from paths import SHAP_RESULTS, SHAP_STORE
+
+SHARD_SIZE = 1024
+INDEX = 'index.sqlite'
+SCALARS = ['vader', 'roberta', 'positive_sum', 'negative_sum', 'net_impact']
+
+
+def shard_path(path, shard, kind):
+    return os.path.join(path, f'shard-{shard:05d}.{kind}')
+
+
+class ShapStoreWriter:
+    """Append companies' results, then close() to swap the finished store into place"""
+
+    def __init__(self, path=SHAP_STORE, shard_size=SHARD_SIZE):
+        self.path = path
+        self.tmp = path + '.tmp'
+        if os.path.exists(self.tmp):
+            shutil.rmtree(self.tmp)
+        os.makedirs(self.tmp)
+        self.shard_size = shard_size
+        self.shard = 0
+        self.rows = []
+        self._new_shard()
+
+    def _new_shard(self):
+        self.dictionary = {}
+        self.codes = []
+        self.scores = []
+        self.members = 0
+
+    def _flush(self):
+        if not self.members:
+            return
+        with open(shard_path(self.tmp, self.shard, 'words'), 'w') as f:
+            json.dump(list(self.dictionary), f)
+        np.array(self.codes, dtype=np.uint32).tofile(shard_path(self.tmp, self.shard, 'codes'))
+        np.array(self.scores, dtype=np.float32).tofile(shard_path(self.tmp, self.shard, 'scores'))
+        self.shard += 1
+        self._new_shard()
+
+    def add(self, company, result):
+        """result as 03 builds it: the SCALARS plus 'words', a list of (word, score)"""
+        words = result['words']
+        self.rows.append((company, self.shard, len(self.codes), len(words)) + tuple(result[k] for k in SCALARS))
+        for word, score in words:
+            self.codes.append(self.dictionary.setdefault(word, len(self.dictionary)))
+            self.scores.append(score)
+        self.members += 1
+        if self.members == self.shard_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        con = sqlite3.connect(os.path.join(self.tmp, INDEX))
+        con.execute(f"CREATE TABLE companies (company TEXT PRIMARY KEY, shard INTEGER, offset INTEGER, "
+                    f"length INTEGER, {', '.join(f'{k} REAL' for k in SCALARS)}) WITHOUT ROWID")
+        con.executemany(f"INSERT OR REPLACE INTO companies VALUES ({', '.join('?' * (4 + len(SCALARS)))})",
+                        self.rows)
+        con.commit()
+        con.close()
+        # Readers see the old store or the new one, never a half-written one
+        old = self.path + '.old'
+        if os.path.exists(self.path):
+            os.replace(self.path, old)
+        os.replace(self.tmp, self.path)
+        if os.path.exists(old):
+            shutil.rmtree(old)
+
+
+def build(path=SHAP_STORE, source=SHAP_RESULTS):
+    """Write the store from 03's JSON results"""
+    with open(source) as f:
+        results = json.load(f)
+    writer = ShapStoreWriter(path)
+    for company, result in results.items():
+        writer.add(company, result)
+    writer.close()
+    return len(results)
+
+
+def is_stale(path=SHAP_STORE, source=SHAP_RESULTS):
+    """True when the store is missing or older than the JSON results"""
+    index = os.path.join(path, INDEX)
+    if not os.path.exists(index):
+        return True
+    return os.path.exists(source) and os.path.getmtime(source) > os.path.getmtime(index)
+
+
+class ShapStore:
+    """Read-only, dict-like view: store[company] -> {'vader', ..., 'words': [(word, score), ...]}"""
+
+    def __init__(self, path=SHAP_STORE, source=SHAP_RESULTS):
+        if is_stale(path, source):
+            build(path, source)
+        self.path = path
+        self.con = sqlite3.connect(f'file:{os.path.join(path, INDEX)}?mode=ro', uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.dictionary = functools.lru_cache(maxsize=32)(self._dictionary)
+
+    def _dictionary(self, shard):
+        with open(shard_path(self.path, shard, 'words')) as f:
+            return json.load(f)
+
+    def _row(self, company):
+        with self._lock:
+            return self.con.execute(f"SELECT shard, offset, length, {', '.join(SCALARS)} FROM companies "
+                                    f"WHERE company = ?", (company,)).fetchone()
+
+    def __contains__(self, company):
+        return self._row(company) is not None
+
+    def __getitem__(self, company):
+        row = self._row(company)
+        if row is None:
+            raise KeyError(company)
+        shard, offset, length = row[:3]
+        codes = np.fromfile(shard_path(self.path, shard, 'codes'), dtype=np.uint32, count=length, offset=offset * 4)
+        scores = np.fromfile(shard_path(self.path, shard, 'scores'), dtype=np.float32, count=length,
+                             offset=offset * 4)
+        dictionary = self.dictionary(shard)
+        result = dict(zip(SCALARS, row[3:]))
+        result['words'] = [(dictionary[code], float(score)) for code, score in zip(codes, scores)]
+        return result
+
+    def get(self, company, default=None):
+        try:
+            return self[company]
+        except KeyError:
+            return default
+
+    def __len__(self):
+        with self._lock:
+            return self.con.execute("SELECT COUNT(*) FROM companies").fetchone()[0]
+
+
+def main():
+    companies = build()
+    size = sum(os.path.getsize(os.path.join(SHAP_STORE, f)) for f in os.listdir(SHAP_STORE))
+    print(f"✅ Wrote {companies} companies to {SHAP_STORE} ({size / 1024:,.0f} KB, "
+          f"{os.path.getsize(SHAP_RESULTS) / 1024:,.0f} KB as JSON)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""Bounded-queue producer/consumer pipeline with per-stage utilization.
+
+A reader thread feeds items through a chain of stages into a sink. Each
+stage has its own worker threads and takes up to `batch_size` items per
+call; with executor='process' the workers hand batches to a process pool
+instead of running them in-thread. Queues between stages are bounded, so a
+slow stage applies back-pressure instead of buffering the whole corpus, and
+end-to-end time approaches the cost of the slowest stage. An exception in
+the reader or a stage is passed down the queues and re-raised by run_stream.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+_DONE = object()
+
+
+class _Failed:
+    """Sent downstream in place of items when the reader or a stage raised"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+class StreamStage:
+    """One pipeline stage: func maps a list of payloads to a list of outputs"""
+
+    def __init__(self, name, func, workers=1, batch_size=1, executor='thread',
+                 initializer=None, initargs=(), keep_input=False):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.batch_size = batch_size
+        self.executor = executor
+        self.initializer = initializer
+        self.initargs = initargs
+        self.keep_input = keep_input  # emit (payload, output) so later stages still see the input
+        self.busy = 0.0
+        self.items = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._finished = 0
+        self._pool = None
+
+    def _take(self, inbox):
+        """Block for one item, then top the batch up with whatever is queued"""
+        first = inbox.get()
+        if first is _DONE:
+            return [], True
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                item = inbox.get_nowait()
+            except queue.Empty:
+                break
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _work(self, inbox, outbox):
+        done = False
+        while not done:
+            batch, done = self._take(inbox)
+            failed = [item for item in batch if isinstance(item, _Failed)]
+            if failed:
+                outbox.put(failed[0])
+                return
+            if batch:
+                payloads = [payload for _, payload in batch]
+                start = time.perf_counter()
+                try:
+                    if self._pool is not None:
+                        outputs = self._pool.submit(self.func, payloads).result()
+                    else:
+                        outputs = self.func(payloads)
+                except Exception as error:
+                    # The consumer stops at this; siblings no longer need the end marker
+                    outbox.put(_Failed(error))
+                    return
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.busy += elapsed
+                    self.items += len(batch)
+                    self.batches += 1
+                for (idx, payload), output in zip(batch, outputs):
+                    outbox.put((idx, (payload, output) if self.keep_input else output))
+        # Let sibling workers see the end marker; the last one passes it on
+        inbox.put(_DONE)
+        with self._lock:
+            self._finished += 1
+            last = self._finished == self.workers
+        if last:
+            outbox.put(_DONE)
+
+    def open(self):
+        if self.executor == 'process':
+            # Fork: the stage scripts are plain top-level scripts, which spawn would re-run
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer,
+                                             initargs=self.initargs, mp_context=multiprocessing.get_context('fork'))
+            self._pool.submit(int).result()  # start the workers before any stage threads exist
+        elif self.initializer is not None:
+            self.initializer(*self.initargs)
+
+    def start(self, inbox, outbox):
+        threads = [threading.Thread(target=self._work, args=(inbox, outbox), daemon=True, name=f'{self.name}-{i}')
+                   for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        return threads
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+def run_stream(source, stages, sink, queue_size=64):
+    """Push `source` through `stages` into `sink(index, output)`.
+
+    Returns per-stage utilization stats, including the reader and writer.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    reader = {'name': 'read', 'workers': 1, 'busy': 0.0, 'items': 0}
+    writer = {'name': 'write', 'workers': 1, 'busy': 0.0, 'items': 0}
+
+    def read():
+        it = iter(source)
+        idx = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                payload = next(it)
+            except StopIteration:
+                break
+            except Exception as error:
+                queues[0].put(_Failed(error))
+                return
+            reader['busy'] += time.perf_counter() - start
+            queues[0].put((idx, payload))
+            idx += 1
+        reader['items'] = idx
+        queues[0].put(_DONE)
+
+    wall_start = time.perf_counter()
+    threads = []
+    try:
+        for stage in stages:
+            stage.open()
+        for stage, inbox, outbox in zip(stages, queues, queues[1:]):
+            threads += stage.start(inbox, outbox)
+        reader_thread = threading.Thread(target=read, daemon=True, name='read')
+        reader_thread.start()
+        threads.append(reader_thread)
+
+        outbox = queues[-1]
+        while True:
+            item = outbox.get()
+            if item is _DONE:
+                break
+            if isinstance(item, _Failed):
+                raise item.error
+            start = time.perf_counter()
+            sink(*item)
+            writer['busy'] += time.perf_counter() - start
+            writer['items'] += 1
+        for t in threads:
+            t.join()
+    finally:
+        for stage in stages:
+            stage.close()
+    wall = time.perf_counter() - wall_start
+
+    stats = [reader] + [{'name': s.name, 'workers': s.workers, 'busy': s.busy, 'items': s.items,
+                         'batches': s.batches} for s in stages] + [writer]
+    for s in stats:
+        s['utilization'] = s['busy'] / (wall * s['workers']) if wall else 0.0
+    return {'wall': wall, 'stages': stats}
+
+
+def print_utilization(report):
+    print(f"\n📊 Pipeline utilization (wall clock {report['wall']:.2f}s)")
+    print(f"{'Stage':<14} {'workers':>7} {'items':>7} {'busy s':>8} {'util':>6}")
+    print("-" * 46)
+    for s in report['stages']:
+        print(f"{s['name']:<14} {s['workers']:>7} {s['items']:>7} {s['busy']:>8.2f} {s['utilization']:>6.0%}")
@@ -0,0 +1,282 @@
+"""Deterministic synthetic corpora for scale tests, derived from data/email.json.
+
+Record i depends only on (seed, i). It picks a real email as template, keeping
+the corpus' status mix, and varies it:
+  - placeholders ([Name], [Company_X], ...) swapped for names or new ids
+  - the position title swapped for another one from the corpus
+  - middle sentences shuffled
+  - apology/joy/positive keywords swapped within their keyword set
+  - sentences dropped, or borrowed from other templates, to vary length
+A --near-duplicate-rate share of records copy an earlier record with one small
+edit, so dedup and the memos see template-heavy mail as they would in practice.
+Shards are generated independently (in parallel with --workers) and streamed
+to JSONL, one email per line.
+
+Usage:
+    python script/synth_corpus.py --emails 1000000 --out data/synthetic
+    python script/synth_corpus.py --emails 10000 --out data/synthetic --email-json
+    REJECTION_DATA_DIR=data/synthetic python script/pipeline.py   # run the stages on it
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from features import SECTIONS, load_emails
+from paths import EMAILS
+from warmth import KEYWORD_SETS
+
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+')
+PLACEHOLDER = re.compile(r'\[([^\]]+)\]')
+
+NAMES = ['Alex', 'Sam', 'Jordan', 'Charlie', 'Robin', 'Noor', 'Lena', 'Tom', 'Ines', 'Yusuf',
+         'Marie', 'Pieter', 'Aisha', 'Lucas', 'Emma', 'Mehdi', 'Sofia', 'Jonas', 'Elif', 'Wout']
+COMPANY_WORDS = ['Data', 'Cloud', 'Nova', 'Blue', 'Flux', 'Orbit', 'Grid', 'Peak', 'Core', 'Bright']
+COMPANY_SUFFIXES = ['Labs', 'Systems', 'Group', 'Analytics', 'Solutions', 'Tech', 'Works', 'Digital']
+GREETINGS = ['Hi', 'Hello', 'Dear', 'Hey', 'Good morning']
+
+# Placeholders filled with a first name; the others get a company name
+PERSON_PLACEHOLDERS = {'Name', 'Candidate'}
+PARENT_ATTEMPTS = 8  # draws for a near-duplicate's parent before falling back to a fresh email
+
+
+def _match_case(word, like):
+    return word.capitalize() if like[:1].isupper() else word
+
+
+class SyntheticCorpus:
+    """Seeded generator over the templates of one email.json"""
+
+    def __init__(self, data, seed=0, near_duplicate_rate=0.2, shuffle_rate=0.5, substitution_rate=0.3,
+                 placeholder_fill_rate=0.5, position_swap_rate=0.3, length_sigma=0.35):
+        self.seed = seed
+        self.near_duplicate_rate = near_duplicate_rate
+        self.shuffle_rate = shuffle_rate
+        self.substitution_rate = substitution_rate
+        self.placeholder_fill_rate = placeholder_fill_rate
+        self.position_swap_rate = position_swap_rate
+        self.length_sigma = length_sigma
+
+        emails = load_emails(data)
+        self.templates = [(email, status) for email, status in emails if email.get('email_text')]
+        self.ghosted_days = [email['days_since_application'] for email, status in emails
+                             if not email.get('email_text') and email.get('days_since_application') is not None]
+        self.ghosted_rate = (len(emails) - len(self.templates)) / len(emails) if emails else 0.0
+        self.positions = sorted({email['position_applied'] for email, _ in self.templates
+                                 if email.get('position_applied') not in (None, 'Unknown')})
+        self.sentences = [SENTENCE_SPLIT.split(email['email_text']) for email, _ in self.templates]
+        self.middles = [s for sentences in self.sentences for s in sentences[1:-1]]
+        self.keyword_set = {word: words for words in KEYWORD_SETS.values() for word in words}
+        self.keyword_pattern = re.compile(r'\b(?:%s)\b' % '|'.join(map(re.escape, self.keyword_set)))
+
+    def _rng(self, i):
+        return random.Random(self.seed * 2 ** 40 + i)
+
+    def _fill(self, kind, company_id, rng):
+        """Value for one [placeholder]: a plausible name, or a placeholder of the new record"""
+        if rng.random() >= self.placeholder_fill_rate:
+            return f'[{company_id}]' if kind.startswith('Company') else f'[{kind}]'
+        if kind in PERSON_PLACEHOLDERS:
+            return rng.choice(NAMES)
+        return f'{rng.choice(COMPANY_WORDS)}{rng.choice(COMPANY_SUFFIXES)}'
+
+    def _keywords(self, text):
+        """(start, end) of each keyword; matched on the lowercased text, which is faster than IGNORECASE"""
+        lower = text.lower()
+        if len(lower) != len(text):
+            lower = ''.join(c if len(c.lower()) != 1 else c.lower() for c in text)
+        return [m.span() for m in self.keyword_pattern.finditer(lower)]
+
+    def _swap(self, text, start, end, rng):
+        word = text[start:end]
+        return _match_case(rng.choice(self.keyword_set[word.lower()]), word)
+
+    def _substitute(self, text, rng, rate):
+        pieces, last = [], 0
+        for start, end in self._keywords(text):
+            if rng.random() < rate:
+                pieces += [text[last:start], self._swap(text, start, end, rng)]
+                last = end
+        return ''.join(pieces) + text[last:]
+
+    def _vary(self, i, rng):
+        k = rng.randrange(len(self.templates))
+        template, status = self.templates[k]
+        company_id = f'Synth_{i:08d}'
+        sentences = list(self.sentences[k])
+
+        # Length: drop middle sentences or borrow some from other templates
+        target = max(2, round(len(sentences) * rng.lognormvariate(0, self.length_sigma)))
+        while len(sentences) > target and len(sentences) > 2:
+            del sentences[rng.randrange(1, len(sentences) - 1)]
+        while len(sentences) < target and self.middles:
+            sentences.insert(rng.randrange(1, len(sentences)), rng.choice(self.middles))
+
+        # Keep the greeting and sign-off in place, shuffle the body
+        if len(sentences) > 3 and rng.random() < self.shuffle_rate:
+            body = sentences[1:-1]
+            rng.shuffle(body)
+            sentences = [sentences[0]] + body + [sentences[-1]]
+        text = ' '.join(sentences)
+
+        position = template.get('position_applied')
+        if self.positions and rng.random() < self.position_swap_rate:
+            new_position = rng.choice(self.positions)
+            if position and position != 'Unknown':
+                text = text.replace(position, new_position)
+            position = new_position
+        text = PLACEHOLDER.sub(lambda m: self._fill(m.group(1), company_id, rng), text)
+        text = self._substitute(text, rng, self.substitution_rate)
+        return {'company_id': company_id, 'email_text': text, 'position_applied': position,
+                'status': status, 'template': template.get('company_id'), 'duplicate_of': None}
+
+    def _nudge(self, record, i, rng):
+        """Near-duplicate of `record`: one keyword swapped, or a new greeting"""
+        text = record['email_text']
+        keywords = self._keywords(text)
+        if keywords:
+            start, end = rng.choice(keywords)
+            text = text[:start] + self._swap(text, start, end, rng) + text[end:]
+        else:
+            text = rng.choice(GREETINGS) + ' ' + text.split(' ', 1)[-1]
+        return dict(record, company_id=f'Synth_{i:08d}', email_text=text, duplicate_of=record['company_id'])
+
+    def record(self, i):
+        """The i-th email of the corpus"""
+        rng = self._rng(i)
+        if rng.random() < self.ghosted_rate:
+            days = rng.choice(self.ghosted_days) if self.ghosted_days else 30
+            return {'company_id': f'Synth_{i:08d}', 'email_text': None, 'status': 'ghosted',
+                    'days_since_application': max(1, round(days * rng.uniform(0.5, 1.5)))}
+        if i > 0 and rng.random() < self.near_duplicate_rate:
+            # Records are pure functions of i, so an earlier one is just regenerated
+            for _ in range(PARENT_ATTEMPTS):
+                parent = self.record(rng.randrange(i))
+                if parent['email_text']:
+                    return self._nudge(parent, i, rng)
+        return self._vary(i, rng)
+
+    def records(self, start, stop):
+        for i in range(start, stop):
+            yield self.record(i)
+
+
+def open_text(path, mode='rt', compressed=None):
+    if compressed is None:
+        compressed = path.endswith('.gz')
+    return gzip.open(path, mode, encoding='utf-8') if compressed else open(path, mode, encoding='utf-8')
+
+
+def shard_paths(path):
+    """Shard files of a corpus directory, in order"""
+    return sorted(glob.glob(os.path.join(path, 'emails-*.jsonl')) + glob.glob(os.path.join(path, 'emails-*.jsonl.gz')))
+
+
+def iter_corpus(path):
+    """Records of a JSONL file, a shard directory, or an email.json"""
+    if os.path.isdir(path):
+        for shard in shard_paths(path):
+            yield from iter_corpus(shard)
+    elif path.endswith('.json'):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for email, status in load_emails(data):
+            yield dict(email, status=status)
+    else:
+        with open_text(path) as f:
+            for line in f:
+                yield json.loads(line)
+
+
+# Shard workers: one generator per process
+_corpus = None
+
+
+def _init_worker(data, options):
+    global _corpus
+    _corpus = SyntheticCorpus(data, **options)
+
+
+def _write_shard(job):
+    path, start, stop = job
+    tmp = path + '.tmp'
+    with open_text(tmp, 'wt', compressed=path.endswith('.gz')) as f:
+        for record in _corpus.records(start, stop):
+            f.write(json.dumps(record) + '\n')
+    os.replace(tmp, path)
+    return path, stop - start
+
+
+def write_email_json(out_dir, metadata):
+    """email.json-shaped copy of the shards, so the pipeline stages can read the corpus"""
+    path = os.path.join(out_dir, 'email.json')
+    with open(path + '.tmp', 'w') as f:
+        f.write('{')
+        for key, status in SECTIONS:
+            f.write(f'\n  {json.dumps(key)}: [')
+            first = True
+            for record in iter_corpus(out_dir):
+                if record['status'] != status:
+                    continue
+                email = {k: v for k, v in record.items() if k not in ('template', 'duplicate_of')}
+                if status != 'ghosted':
+                    del email['status']
+                f.write(('\n    ' if first else ',\n    ') + json.dumps(email))
+                first = False
+            f.write('\n  ],')
+        f.write(f'\n  "metadata": {json.dumps(metadata)}\n}}\n')
+    os.replace(path + '.tmp', path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--emails', type=int, default=1000, help='corpus size')
+    parser.add_argument('--out', default='data/synthetic', help='output directory for the shards')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shard-size', type=int, default=100_000, help='emails per shard file')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='processes writing shards')
+    parser.add_argument('--gzip', action='store_true', help='write .jsonl.gz shards')
+    parser.add_argument('--near-duplicate-rate', type=float, default=0.2)
+    parser.add_argument('--shuffle-rate', type=float, default=0.5, help='share of emails with shuffled sentences')
+    parser.add_argument('--substitution-rate', type=float, default=0.3, help='chance each keyword is swapped')
+    parser.add_argument('--length-sigma', type=float, default=0.35, help='spread of the log length factor')
+    parser.add_argument('--email-json', action='store_true', help='also write an email.json for the pipeline')
+    args = parser.parse_args()
+
+    with open(EMAILS, 'r') as f:
+        data = json.load(f)
+    options = {'seed': args.seed, 'near_duplicate_rate': args.near_duplicate_rate,
+               'shuffle_rate': args.shuffle_rate, 'substitution_rate': args.substitution_rate,
+               'length_sigma': args.length_sigma}
+
+    os.makedirs(args.out, exist_ok=True)
+    for stale in shard_paths(args.out):
+        os.remove(stale)
+    suffix = '.jsonl.gz' if args.gzip else '.jsonl'
+    jobs = [(os.path.join(args.out, f'emails-{k:05d}{suffix}'), start, min(args.emails, start + args.shard_size))
+            for k, start in enumerate(range(0, args.emails, args.shard_size))]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, min(args.workers, len(jobs))),
+                             initializer=_init_worker, initargs=(data, options)) as pool:
+        for path, count in pool.map(_write_shard, jobs):
+            print(f"   {path} ({count:,} emails)")
+    seconds = time.perf_counter() - start
+
+    metadata = dict(options, emails=args.emails, source=EMAILS, shards=len(jobs), synthetic=True)
+    with open(os.path.join(args.out, 'manifest.json'), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"✅ {args.emails:,} emails in {len(jobs)} shards in {seconds:.2f}s "
+          f"({args.emails / seconds:,.0f} emails/s)")
+    if args.email_json:
+        print(f"✅ Wrote {write_email_json(args.out, metadata)}")
+
+
+if __name__ == '__main__':
+    main()
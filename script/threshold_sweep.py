@@ -0,0 +1,129 @@
+"""Threshold sweep for ratio rules like "4 positives per apology".
+
+Emails are sorted by the ratio once. Cumulative sums then give warm-rate,
+accuracy and sentiment gap for the rule "warm if ratio >= t" at every distinct
+threshold t in O(n log n).
+
+Usage:
+    python script/threshold_sweep.py                                   # positives per apology
+    python script/threshold_sweep.py --numerator emotion_joy
+    python script/threshold_sweep.py --numerator pronoun_density --denominator none
+    python script/threshold_sweep.py --benchmark 10000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from paths import REJECTION_ANALYSIS_EXTENDED
+
+WARM_THRESHOLD = 0.85
+
+
+def ratio_feature(df, numerator, denominator=None):
+    """numerator / denominator over rows where the denominator is positive,
+    or the numerator column itself when there is no denominator"""
+    if denominator is None:
+        return df[numerator].astype(float)
+    rows = df[denominator] > 0
+    return df.loc[rows, numerator] / df.loc[rows, denominator]
+
+
+def sweep(values, scores, warm_threshold=WARM_THRESHOLD):
+    """Evaluate "warm if value >= t" at every distinct value t.
+
+    Returns one row per threshold with the split sizes, warm rate on each
+    side, accuracy of the rule and the mean-score gap between the sides.
+    """
+    values = np.asarray(values, dtype=float)
+    scores = np.asarray(scores, dtype=float)
+    keep = np.isfinite(values) & np.isfinite(scores)
+    values, scores = values[keep], scores[keep]
+    n = len(values)
+
+    order = np.argsort(values, kind='stable')
+    values, scores = values[order], scores[order]
+    warm = scores >= warm_threshold
+
+    # Prefix sums with a leading 0, so index i covers the i lowest values
+    warm_below_at = np.concatenate([[0], np.cumsum(warm)])
+    score_below_at = np.concatenate([[0.0], np.cumsum(scores)])
+
+    thresholds, first = np.unique(values, return_index=True)
+    n_below = first
+    n_above = n - first
+    warm_below = warm_below_at[first]
+    warm_above = warm_below_at[-1] - warm_below
+    score_below = score_below_at[first]
+    score_above = score_below_at[-1] - score_below
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_below = score_below / n_below
+        mean_above = score_above / n_above
+        table = pd.DataFrame({
+            'threshold': thresholds,
+            'n_below': n_below,
+            'n_above': n_above,
+            'warm_rate_below': warm_below / n_below,
+            'warm_rate_above': warm_above / n_above,
+            'accuracy': (warm_above + (n_below - warm_below)) / n,
+            'mean_score_below': mean_below,
+            'mean_score_above': mean_above,
+            'sentiment_gap': mean_above - mean_below,
+        })
+    return table
+
+
+def sweep_frame(df, numerator='afinn_positive_count', denominator='apology_words',
+                score='vader_compound', warm_threshold=WARM_THRESHOLD):
+    """Sweep table for a feature pair of an analysis DataFrame"""
+    values = ratio_feature(df, numerator, denominator)
+    return sweep(values, df.loc[values.index, score], warm_threshold)
+
+
+def best_threshold(table, by='accuracy'):
+    """Row of the sweep with the highest `by`; lowest threshold wins ties. None for an empty sweep"""
+    if table.empty or table[by].isna().all():
+        return None
+    return table.loc[table[by].idxmax()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--numerator', default='afinn_positive_count')
+    parser.add_argument('--denominator', default='apology_words', help="column name, or 'none'")
+    parser.add_argument('--score', default='vader_compound')
+    parser.add_argument('--warm', type=float, default=WARM_THRESHOLD)
+    parser.add_argument('--benchmark', type=int, metavar='ROWS', help='time a sweep over synthetic emails')
+    args = parser.parse_args()
+
+    if args.benchmark:
+        rng = np.random.default_rng(0)
+        apologies = rng.integers(1, 4, args.benchmark)
+        positives = rng.poisson(6, args.benchmark)
+        scores = np.clip(0.1 * positives / apologies + rng.normal(0.4, 0.2, args.benchmark), -1, 1)
+        start = time.perf_counter()
+        table = sweep(positives / apologies, scores, args.warm)
+        print(f"✅ Swept {len(table):,} thresholds over {args.benchmark:,} emails "
+              f"in {time.perf_counter() - start:.2f}s")
+        return
+
+    df = pd.read_csv(REJECTION_ANALYSIS_EXTENDED)
+    df = df[df['status'] != 'ghosted']
+    denominator = None if args.denominator.lower() == 'none' else args.denominator
+    table = sweep_frame(df, args.numerator, denominator, args.score, args.warm)
+
+    label = args.numerator if denominator is None else f"{args.numerator} / {denominator}"
+    print(f"📊 Threshold sweep: {label} vs {args.score} >= {args.warm}")
+    print(table.round(3).to_string(index=False))
+    best = best_threshold(table)
+    if best is None:
+        raise SystemExit(f"❌ No scored emails with {label}, nothing to sweep")
+    print(f"\n✅ Best threshold: {best['threshold']:.2f} "
+          f"(accuracy {best['accuracy']:.0%}, warm rate above {best['warm_rate_above']:.0%}, "
+          f"gap {best['sentiment_gap']:+.3f})")
+
+
+if __name__ == '__main__':
+    main()
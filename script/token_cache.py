@@ -0,0 +1,200 @@
+"""Content-addressed, memory-mapped cache of tokenizer outputs.
+
+Each tokenizer (name, local revision, class, transformers version) gets its
+own directory under data/.cache/tokens/. Token ids, character offsets and
+word ids of every text it has seen are appended to flat int32 files, which are
+memory-mapped for reading. index.tsv maps a hash of each text to its
+(start, length) in those files. Stages tokenizing the same texts with the same
+tokenizer (RoBERTa scoring, embeddings, SHAP) tokenize each text once, across
+runs. Appends take a file lock, so concurrent stages can share a directory.
+
+Usage:
+    python script/token_cache.py        # cache stats per tokenizer
+"""
+import fcntl
+import functools
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+import numpy as np
+
+from paths import TOKEN_CACHE
+
+ARRAYS = {'ids': 1, 'offsets': 2, 'word_ids': 1}  # int32 values per token
+
+
+class Encoding(NamedTuple):
+    ids: np.ndarray       # token ids, no special tokens
+    offsets: np.ndarray   # (tokens, 2) character spans in the text
+    word_ids: np.ndarray  # word index of each token
+
+
+def text_hash(text):
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def tokenizer_key(tokenizer):
+    """What a cached tokenization depends on"""
+    import transformers
+    from pipeline import model_revision
+    name = tokenizer.name_or_path
+    return f'{name}@{model_revision(name)}|{type(tokenizer).__name__}|transformers {transformers.__version__}'
+
+
+class TokenCache:
+    """Tokenizer outputs for one tokenizer, appended once and memory-mapped"""
+
+    def __init__(self, tokenizer, root=TOKEN_CACHE, key=None):
+        if not tokenizer.is_fast:
+            raise TypeError("TokenCache needs a fast tokenizer (for offsets and word ids)")
+        self.tokenizer = tokenizer
+        key = key or tokenizer_key(tokenizer)
+        self.dir = os.path.join(root, hashlib.blake2b(key.encode(), digest_size=8).hexdigest())
+        os.makedirs(self.dir, exist_ok=True)
+        meta = os.path.join(self.dir, 'meta.json')
+        if not os.path.exists(meta):
+            with open(meta, 'w') as f:
+                json.dump({'tokenizer': key}, f)
+        self.index = {}
+        self._index_read = 0
+        self._arrays = None
+        self._mapped = 0
+        self.hits = self.misses = 0
+
+    def _path(self, name):
+        return os.path.join(self.dir, name)
+
+    def _read_index(self):
+        """Pick up entries appended since the last read (by this or another process)"""
+        path = self._path('index.tsv')
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            f.seek(self._index_read)
+            chunk = f.read()
+        end = chunk.rfind(b'\n') + 1  # a partly written last line is read next time
+        for line in chunk[:end].splitlines():
+            h, start, length = line.split(b'\t')
+            self.index[h.decode()] = (int(start), int(length))
+        self._index_read += end
+
+    def _indexed_tokens(self):
+        return max((start + length for start, length in self.index.values()), default=0)
+
+    def _append(self, texts):
+        """Tokenize texts that aren't cached yet and append them under the lock"""
+        encoded = self.tokenizer(texts, add_special_tokens=False, return_offsets_mapping=True)
+        with open(self._path('lock'), 'w') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            self._read_index()
+            # Drop anything a crashed writer left past the last indexed token
+            start = self._indexed_tokens()
+            files = {}
+            for name, width in ARRAYS.items():
+                files[name] = open(self._path(f'{name}.i32'), 'ab')
+                files[name].truncate(start * width * 4)
+            lines = []
+            try:
+                for i, text in enumerate(texts):
+                    h = text_hash(text)
+                    if h in self.index:
+                        continue
+                    ids = np.asarray(encoded['input_ids'][i], dtype=np.int32)
+                    files['ids'].write(ids.tobytes())
+                    files['offsets'].write(np.asarray(encoded['offset_mapping'][i], dtype=np.int32)
+                                           .reshape(-1, 2).tobytes())
+                    word_ids = [-1 if w is None else w for w in encoded.word_ids(i)]
+                    files['word_ids'].write(np.asarray(word_ids, dtype=np.int32).tobytes())
+                    lines.append(f'{h}\t{start}\t{len(ids)}\n')
+                    self.index[h] = (start, len(ids))
+                    start += len(ids)
+            finally:
+                for f in files.values():
+                    f.close()
+            with open(self._path('index.tsv'), 'a') as f:
+                f.write(''.join(lines))
+            self._index_read = os.path.getsize(self._path('index.tsv'))
+
+    def _map(self, tokens):
+        """The arrays up to the last indexed token; bytes past it may be another writer's unfinished append"""
+        if self._mapped < tokens:
+            self._arrays = {name: np.memmap(self._path(f'{name}.i32'), dtype=np.int32, mode='r',
+                                            shape=(tokens, width) if width > 1 else (tokens,))
+                            for name, width in ARRAYS.items()}
+            self._mapped = tokens
+        return self._arrays
+
+    def encode(self, texts):
+        """Encoding per text, tokenizing only the ones not cached yet"""
+        hashes = [text_hash(text) for text in texts]
+        if any(h not in self.index for h in hashes):
+            self._read_index()
+        new = {h: text for h, text in zip(hashes, texts) if h not in self.index}
+        self.misses += len(new)
+        self.hits += sum(h not in new for h in hashes)
+        if new:
+            self._append(list(new.values()))
+        arrays = self._map(self._indexed_tokens())
+        out = []
+        for h in hashes:
+            start, length = self.index[h]
+            if length == 0:
+                out.append(Encoding(np.zeros(0, np.int32), np.zeros((0, 2), np.int32), np.zeros(0, np.int32)))
+                continue
+            end = start + length
+            out.append(Encoding(arrays['ids'][start:end], arrays['offsets'][start:end], arrays['word_ids'][start:end]))
+        return out
+
+    def batch(self, texts, max_length=512, return_tensors='pt'):
+        """Padded model inputs, as tokenizer(texts, truncation=True, max_length=..., padding=True) builds them"""
+        room = max_length - self.tokenizer.num_special_tokens_to_add()
+        input_ids = [self.tokenizer.build_inputs_with_special_tokens(e.ids[:room].tolist())
+                     for e in self.encode(texts)]
+        # pad() warns that calling a fast tokenizer is faster; here the tokenizing is already done
+        warned = self.tokenizer.deprecation_warnings.get('Asking-to-pad-a-fast-tokenizer', False)
+        self.tokenizer.deprecation_warnings['Asking-to-pad-a-fast-tokenizer'] = True
+        try:
+            return self.tokenizer.pad({'input_ids': input_ids}, return_tensors=return_tensors)
+        finally:
+            self.tokenizer.deprecation_warnings['Asking-to-pad-a-fast-tokenizer'] = warned
+
+
+@functools.lru_cache(maxsize=None)
+def token_cache(tokenizer):
+    """The shared TokenCache of a tokenizer object"""
+    return TokenCache(tokenizer)
+
+
+def merge_words(text, encoding, scores):
+    """(word, summed score) per word, from per-token scores aligned with encoding"""
+    words = []
+    last = None
+    for (start, end), word_id, score in zip(encoding.offsets, encoding.word_ids, scores):
+        if word_id >= 0 and word_id == last:
+            words[-1][1] = end
+            words[-1][2] += score
+        else:
+            words.append([start, end, score])
+        last = word_id
+    return [(text[start:end], float(score)) for start, end, score in words]
+
+
+def main():
+    if not os.path.isdir(TOKEN_CACHE):
+        print(f"No token cache at {TOKEN_CACHE} yet")
+        return
+    for name in sorted(os.listdir(TOKEN_CACHE)):
+        path = os.path.join(TOKEN_CACHE, name)
+        with open(os.path.join(path, 'meta.json')) as f:
+            key = json.load(f)['tokenizer']
+        index = os.path.join(path, 'index.tsv')
+        texts = sum(1 for _ in open(index)) if os.path.exists(index) else 0
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"📊 {key}\n   {texts:,} texts, {os.path.getsize(os.path.join(path, 'ids.i32')) // 4:,} tokens, "
+              f"{size / 1024 / 1024:,.1f} MB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Warmth scoring shared by the dashboard and batch tools."""
+import functools
+import re
+
+import numpy as np
+import pandas as pd
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+from doc_term import DocTermMatrix, whitespace_tokens
+
+vader = SentimentIntensityAnalyzer()
+
+# Keyword lists (matched as substrings of lowercased whitespace tokens)
+JOY_KEYWORDS = ['hope', 'happy', 'good', 'luck', 'best', 'wish', 'encourage']
+APOLOGY_KEYWORDS = ['sorry', 'unfortunately', 'regret', 'apologies', 'apologize']
+POSITIVE_KEYWORDS = ['thank', 'appreciate', 'grateful', 'impressed', 'value',
+                     'strong', 'excellent', 'great', 'pleased', 'interested']
+
+KEYWORD_SETS = {
+    'joy': JOY_KEYWORDS,
+    'apology': APOLOGY_KEYWORDS,
+    'positive': POSITIVE_KEYWORDS,
+}
+
+RESULT_COLUMNS = ['score', 'joy', 'apology', 'positive', 'word_count']
+
+# SHAP-derived word substitutions. `rewrites` are (regex, replacements)
+# pairs the rewrite optimizer may apply; an empty replacement drops the match.
+SUBSTITUTIONS = [
+    {
+        'avoid': 'Sorry',
+        'avoid_impact': -0.47,
+        'use': 'Disappointed',
+        'use_impact': -0.17,
+        'improvement': '+64%',
+        'example': 'We\'re disappointed we can\'t move forward',
+        'rewrites': [(r"\bsorry\b", ['disappointed'])]
+    },
+    {
+        'avoid': 'Regret',
+        'avoid_impact': -0.73,
+        'use': 'Disappointing',
+        'use_impact': -0.17,
+        'improvement': '+77%',
+        'example': 'This is disappointing news to share',
+        'rewrites': [(r"\bregret\b", ['find it disappointing', 'are disappointed'])]
+    },
+    {
+        'avoid': 'Unfortunately',
+        'avoid_impact': -0.77,
+        'use': '(Skip it!)',
+        'use_impact': 0.0,
+        'improvement': '+100%',
+        'example': 'We\'ve decided to move forward with another candidate',
+        'rewrites': [(r"\bunfortunately\b,?\s*", [''])]
+    },
+    {
+        'avoid': 'Thanks (generic)',
+        'avoid_impact': -0.16,
+        'use': 'Thank you + specific',
+        'use_impact': +0.42,
+        'improvement': '+163%',
+        'example': 'Thank you for your thoughtful approach to the case study',
+        'rewrites': [(r"\bthanks\b", ['thank you'])]
+    },
+    {
+        'avoid': 'Thank (alone)',
+        'avoid_impact': +0.13,
+        'use': 'Appreciate',
+        'use_impact': +0.54,
+        'improvement': '+315%',
+        'example': 'We appreciate your interest in our team',
+        'rewrites': [(r"\bthank you for your\b", ['we appreciate your']),
+                     (r"\bthank you for\b(?! your\b)", ['we appreciate you'])]
+    },
+    {
+        'avoid': 'Good luck',
+        'avoid_impact': +0.12,
+        'use': 'Wish you the best',
+        'use_impact': +0.23,
+        'improvement': '+92%',
+        'example': 'We wish you the best in your job search',
+        'rewrites': [(r"\bgood luck\b", ['we wish you the best'])]
+    }
+]
+
+JOY_CLOSING = "\n\nWe wish you the best in your job search!"
+APPRECIATION_LINE = "\nWe appreciate the time you invested in your application and were impressed by your background.\n"
+GREETING_WORDS = ['dear', 'hi ', 'hello']
+
+
+@functools.lru_cache(maxsize=None)
+def sentence_scorer():
+    """Shared VADER scorer with a sentence memo (imported lazily: sentence_scoring imports this module)"""
+    from sentence_scoring import SentenceScorer
+    return SentenceScorer(vader)
+
+
+def analyze_text(text):
+    """Analyze email text"""
+    score = sentence_scorer().compound(text)
+    words = text.lower().split()
+
+    joy_count = sum(1 for w in words if any(j in w for j in JOY_KEYWORDS))
+    apology_count = sum(1 for w in words if any(a in w for a in APOLOGY_KEYWORDS))
+    positive_count = sum(1 for w in words if any(p in w for p in POSITIVE_KEYWORDS))
+
+    return {
+        'score': score,
+        'joy': joy_count,
+        'apology': apology_count,
+        'positive': positive_count,
+        'word_count': len(words)
+    }
+
+
+def keyword_flags(vocab):
+    """Boolean keyword-set membership for each token of a vocabulary"""
+    vocab = pd.Index(vocab, dtype=object)
+    return {
+        name: np.asarray(vocab.str.contains('|'.join(map(re.escape, keywords)), regex=True), dtype=bool)
+        for name, keywords in KEYWORD_SETS.items()
+    }
+
+
+def analyze_texts(texts):
+    """Vectorized analyze_text over a Series or list of texts.
+
+    Returns a DataFrame with one row per text and the same values as calling
+    analyze_text row by row. Duplicate texts (templates) are scored once, and
+    keyword matching runs once per distinct token instead of once per word.
+    Missing texts (NaN/None) are scored as the empty string.
+    """
+    texts = texts if isinstance(texts, pd.Series) else pd.Series(list(texts), dtype=object)
+    # factorize codes NaN/None as -1, which would index the last distinct text
+    codes, uniques = pd.factorize(texts.fillna(''))
+    uniques = list(uniques)
+
+    # Shared tokenization of every distinct text; each keyword set is one
+    # weight per vocabulary word applied to the doc-term matrix
+    dtm = DocTermMatrix(uniques, whitespace_tokens)
+    lengths = dtm.lengths
+    flags = keyword_flags(dtm.vocab)
+    totals = dtm.apply(np.column_stack(list(flags.values()))).astype(np.int64)
+    counts = {name: totals[:, j] for j, name in enumerate(flags)}
+
+    # VADER once per distinct text, sharing sentence valences across texts
+    scorer = sentence_scorer()
+    scores = np.fromiter((scorer.compound(text) for text in uniques),
+                         dtype=np.float64, count=len(uniques))
+
+    return pd.DataFrame({
+        'score': scores[codes],
+        'joy': counts['joy'][codes],
+        'apology': counts['apology'][codes],
+        'positive': counts['positive'][codes],
+        'word_count': lengths[codes],
+    }, index=texts.index, columns=RESULT_COLUMNS)
+
+
+def analyze_records(texts):
+    """Batch analysis as a list of plain dicts (for workers and JSON)"""
+    return analyze_texts(texts).to_dict('records')
+
@@ -0,0 +1,114 @@
+"""Parity of the fast scorers with the libraries they replace.
+
+SentenceScorer and IncrementalAnalyzer must give VADER's scores, Polarity
+TextBlob's and Readability textstat's, on every email of data/email.json
+and on the edge cases below.
+
+Usage:
+    python -m pytest tests
+"""
+import json
+import os
+import sys
+
+import pytest
+import textstat
+from textblob import TextBlob
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'script'))
+
+from features import load_emails  # noqa: E402
+from paths import EMAILS  # noqa: E402
+from polarity import polarity  # noqa: E402
+import readability as readability_module  # noqa: E402
+from readability import METRICS, Readability  # noqa: E402
+from sentence_scoring import IncrementalAnalyzer, SentenceScorer  # noqa: E402
+from warmth import analyze_text, analyze_texts  # noqa: E402
+
+with open(os.path.join(ROOT, EMAILS)) as f:
+    CORPUS = [email['email_text'] for email, _ in load_emails(json.load(f)) if email.get('email_text')]
+
+EDGE_CASES = [
+    '',
+    '   \n\n  ',
+    'Thanks :) We will be in touch :-( Best, Sam <3',
+    'Great, another "exciting opportunity" (!)',
+    'Oh sure, we LOVED your application (!) but not enough.',
+    'Dr. Smith and Mr. Jones, e.g. the U.S. team, reviewed it at 9 a.m. today.',
+    'WE ARE SO SORRY!!! Unfortunately the role is filled...',
+    'Not bad at all. It was not a good fit, but really not terrible.',
+    'Dear [Name],\n\nThank you for applying to [Company_X].\n\n\n\nKind regards',
+    'Café naïve résumé 😊 👍',
+    'No',
+]
+TEXTS = CORPUS + EDGE_CASES
+READABILITY = {
+    'flesch_reading': textstat.flesch_reading_ease,
+    'flesch_kincaid_grade': textstat.flesch_kincaid_grade,
+    'gunning_fog': textstat.gunning_fog,
+    'smog_index': textstat.smog_index,
+}
+
+vader = SentimentIntensityAnalyzer()
+scorer = SentenceScorer(vader)
+incremental = IncrementalAnalyzer(scorer)
+readability = Readability(cache_path=None)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_sentence_scorer_matches_vader(text):
+    assert scorer.polarity_scores(text) == vader.polarity_scores(text)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_incremental_matches_analyze_text(text):
+    result = incremental.analyze(text)
+    result.pop('sentences')
+    assert result == analyze_text(text)
+
+
+def test_analyze_texts_matches_analyze_text():
+    batch = analyze_texts(TEXTS + TEXTS[:3]).to_dict('records')
+    assert batch == [analyze_text(text) for text in TEXTS + TEXTS[:3]]
+
+
+def test_analyze_texts_scores_missing_texts_as_empty():
+    batch = analyze_texts(['Thank you so much!', None, float('nan'), 'Sadly, no.']).to_dict('records')
+    texts = ['Thank you so much!', '', '', 'Sadly, no.']
+    assert batch == [analyze_text(text) for text in texts]
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_polarity_matches_textblob(text):
+    assert polarity(text) == pytest.approx(TextBlob(text).sentiment.polarity, abs=1e-12)
+
+
+@pytest.mark.parametrize('text', TEXTS)
+def test_readability_matches_textstat(text):
+    scores = readability.scores(text)
+    assert list(scores) == METRICS
+    for name, reference in READABILITY.items():
+        assert scores[name] == pytest.approx(reference(text), abs=1e-9), name
+
+
+def test_readability_public_api_fallback_matches_textstat(monkeypatch):
+    # The path taken when textstat's private helpers can't be imported
+    monkeypatch.setattr(readability_module, 'get_cmudict', None)
+    monkeypatch.setattr(readability_module, 'get_lang_easy_words', None)
+    monkeypatch.setattr(readability_module, 'textstat', textstat, raising=False)
+    fallback = Readability(cache_path=None)
+    assert fallback.easy_words is None
+    for text in TEXTS:
+        scores = fallback.scores(text)
+        for name, reference in READABILITY.items():
+            assert scores[name] == pytest.approx(reference(text), abs=1e-9), name
+
+
+def test_sentence_memo_is_bounded(monkeypatch):
+    monkeypatch.setattr(readability_module, 'MAX_MEMO', 10)
+    bounded = Readability(cache_path=None)
+    for i in range(50):
+        bounded.count_sentences(f'Sentence number {i} is here.')
+        assert len(bounded._sentence_words) <= 11
@@ -0,0 +1,42 @@
+"""run_stream must deliver every item, and fail rather than hang when a stage raises."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'script'))
+
+from streaming import StreamStage, run_stream  # noqa: E402
+
+
+def double(items):
+    return [item * 2 for item in items]
+
+
+def fail_at_50(items):
+    if 50 in items:
+        raise ValueError('bad item 50')
+    return items
+
+
+def test_every_item_reaches_the_sink():
+    out = {}
+    run_stream(range(300), [StreamStage('double', double, workers=2, batch_size=4)], out.__setitem__, queue_size=4)
+    assert out == {i: i * 2 for i in range(300)}
+
+
+@pytest.mark.parametrize('executor', ['thread', 'process'])
+def test_stage_error_is_raised(executor):
+    stages = [StreamStage('fail', fail_at_50, workers=2, batch_size=2, executor=executor),
+              StreamStage('double', double, workers=2)]
+    with pytest.raises(ValueError, match='bad item 50'):
+        run_stream(range(500), stages, lambda i, output: None, queue_size=4)
+
+
+def test_source_error_is_raised():
+    def source():
+        yield from range(70)
+        raise KeyError('source broke')
+
+    with pytest.raises(KeyError):
+        run_stream(source(), [StreamStage('double', double, workers=2)], lambda i, output: None, queue_size=4)